@@ -5,16 +5,34 @@ Usage:
     agent = AstroAgent()
     response = agent.handle("show my chart", session_id="cli")
 
+    # from an asyncio transport
+    response = await agent.handle_async("show my chart", session_id=phone)
+
 The same agent instance works for CLI, Flask, WhatsApp — only the
-transport layer changes. Session state is keyed by session_id.
+transport layer changes. Session state is keyed by session_id and kept
+in a SessionStore (bounded in-memory LRU by default; pass
+SQLiteSessionStore() to persist sessions across restarts).
+
+Responses of the deterministic intents (handlers.CACHE_ARGS) are served
+from agent/response_cache.py until the person's data or the day changes.
 """
 
+import asyncio
+import os
 import re
-from kundali_engine.agent import handlers
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+from kundali_engine.agent import event_store, handlers
+from kundali_engine.agent.bandit import flush_bandit
+from kundali_engine.agent.response_cache import get_response_cache
+from kundali_engine.agent.session_store import MemorySessionStore
+from kundali_engine.chart.render import FORMATS
 
 # ── Intent patterns (most specific first) ──────────────────────────────────
 
 INTENT_PATTERNS = [
+    ("set_format",     r"^(?:set\s+)?(?:chart\s+)?(?:format|output)\s+(?:to\s+|as\s+)?(?:text|whatsapp|json|html)$"),
     ("create_chart",   r"(?:create|add|make|new|generate)\b.*(?:kundali|chart|horoscope|birth)"),
     ("show_chart",     r"(?:show|display|view|see|open)\b.*(?:chart|kundali|horoscope|planets)"),
     ("list_people",    r"(?:list|who all|show all|everyone|all people|all charts|who do you)"),
@@ -33,6 +51,30 @@ INTENT_PATTERNS = [
 ]
 
 
+def compile_intents(patterns):
+    """
+    Precompile the intent patterns for detect_intent().
+
+    Messages are lowercased before matching and every pattern is written in
+    lowercase, so the patterns are compiled case-sensitively: without
+    IGNORECASE the regex engine can skip ahead on each pattern's literal
+    prefix instead of trying every position.
+    """
+    return [(intent, re.compile(pattern)) for intent, pattern in patterns]
+
+
+_COMPILED_INTENTS = compile_intents(INTENT_PATTERNS)
+
+
+def detect_intent(message):
+    """First intent (in priority order) whose pattern matches, else 'unknown'."""
+    msg_lower = message.lower().strip()
+    for intent, regex in _COMPILED_INTENTS:
+        if regex.search(msg_lower):
+            return intent
+    return "unknown"
+
+
 def _make_session(session_id):
     """Create a fresh session dict."""
     return {
@@ -41,23 +83,31 @@ def _make_session(session_id):
         "active_person_name": None,    # lazy-loaded on first use
         "flow": None,                  # current multi-step flow name
         "flow_data": {},               # partial data for incomplete flow
+        "format": "text",              # chart output: text/whatsapp/json/html
+        "last_event_id": None,         # newest logged event (target for 'rate')
+        "last_variants": None,         # variants_used of that event
     }
 
 
 class AstroAgent:
     """Transport-agnostic conversational agent for Vedic astrology."""
 
-    def __init__(self):
-        self.sessions = {}
+    def __init__(self, session_store=None, max_workers=None):
+        self.sessions = session_store if session_store is not None else MemorySessionStore()
+        self.max_workers = max_workers or min(8, (os.cpu_count() or 1) + 4)
+        self._executor = None
+        self._session_locks = weakref.WeakValueDictionary()
 
     def _get_session(self, session_id):
-        if session_id not in self.sessions:
-            self.sessions[session_id] = _make_session(session_id)
-        return self.sessions[session_id]
+        session = self.sessions.get(session_id)
+        if session is None:
+            session = _make_session(session_id)
+            self.sessions.put(session_id, session)
+        return session
 
     # ── Public entry point ──────────────────────────────────────────────
 
-    def handle(self, message, session_id="cli"):
+    def handle(self, message, session_id="cli", fmt=None):
         """
         Process one user message and return a response string.
 
@@ -68,14 +118,61 @@ class AstroAgent:
         session_id : str
             Unique session key.  CLI uses "cli", WhatsApp could use
             the phone number, web could use a cookie/token.
+        fmt : str, optional
+            Chart output format for this session from now on (one of
+            chart.render.FORMATS); the same as sending "format <fmt>".
 
         Returns
         -------
         str   Plain-text response (works in any transport).
         """
+        if fmt is not None and fmt not in FORMATS:
+            raise ValueError(f"Unknown chart format {fmt!r}, expected one of {FORMATS}")
         session = self._get_session(session_id)
-        message = message.strip()
+        if fmt is not None:
+            session["format"] = fmt
+        try:
+            return self._handle(message.strip(), session)
+        finally:
+            # Handlers mutate the session in place; write it back so
+            # persistent stores see the change.
+            self.sessions.put(session_id, session)
+
+    async def handle_async(self, message, session_id="cli", fmt=None):
+        """
+        Non-blocking variant of handle() for asyncio transports.
+
+        The (blocking) handler work runs on a bounded thread pool so a slow
+        SQLite query or chart computation doesn't stall other users.
+        Messages for the same session_id are processed one at a time, in
+        arrival order; different sessions run concurrently.
+        """
+        lock = self._session_locks.get(session_id)
+        if lock is None:
+            lock = self._session_locks[session_id] = asyncio.Lock()
+        async with lock:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), self.handle, message, session_id, fmt)
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="astro-agent",
+            )
+        return self._executor
+
+    def close(self):
+        """
+        Shut down the worker pool used by handle_async(), write queued
+        events and flush buffered rating increments to variant_stats.
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        event_store.flush_events()
+        flush_bandit()
 
+    def _handle(self, message, session):
         if not message:
             return "I didn't catch that. Type 'help' to see what I can do."
 
@@ -90,11 +187,7 @@ class AstroAgent:
     # ── Intent detection ────────────────────────────────────────────────
 
     def _detect_intent(self, message):
-        msg_lower = message.lower().strip()
-        for intent, pattern in INTENT_PATTERNS:
-            if re.search(pattern, msg_lower, re.IGNORECASE):
-                return intent
-        return "unknown"
+        return detect_intent(message)
 
     # ── Routing ─────────────────────────────────────────────────────────
 
@@ -114,9 +207,17 @@ class AstroAgent:
             "compare":        handlers.handle_compare,
             "interpret":      handlers.handle_interpret,
             "rate":           handlers.handle_rate,
+            "set_format":     handlers.handle_set_format,
         }
         handler = route_map.get(intent)
         if handler:
+            normalize = handlers.CACHE_ARGS.get(intent)
+            args = normalize(message, session) if normalize else None
+            if args is not None:
+                return get_response_cache().respond(
+                    intent, session["active_person_id"], args,
+                    lambda: handler(message, session),
+                )
             return handler(message, session)
 
         return (
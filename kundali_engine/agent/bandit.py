@@ -0,0 +1,256 @@
+"""
+In-process multi-armed bandit for interpretation variant selection.
+
+Each (planet, key_type, key) — e.g. ("Saturn", "house", "10") or
+("Rahu", "rahu_ketu", "7") — is a bandit whose arms are the text variants
+available for it. Per-arm rating sums and counts live in memory, loaded
+from variant_stats, so choosing a variant touches no database.
+
+Strategies:
+  epsilon_greedy  best average rating, random variant with probability
+                  epsilon (arms count once they have MIN_RATINGS ratings)
+  thompson        sample each arm from Beta(1 + s, 1 + f), ratings 1-5
+                  mapped to [0, 1] successes
+  ucb             UCB1 on normalized ratings; untried arms first
+
+log_feedback calls record_feedback(); the increments are buffered and
+written to variant_stats by flush(), which runs at most every
+flush_interval seconds on update and at interpreter exit, and then
+reloads the table so ratings recorded by other processes are picked up.
+"""
+import atexit
+import json
+import math
+import os
+import random
+import threading
+import time
+
+from kundali_engine.core.database.connection import pooled_connection
+
+STRATEGIES = ("epsilon_greedy", "thompson", "ucb")
+DEFAULT_EPSILON = 0.20       # exploration rate for epsilon-greedy
+DEFAULT_VARIANTS = (1, 2, 3)
+MIN_RATINGS = 2              # epsilon-greedy ignores arms with fewer ratings
+FLUSH_INTERVAL = 30.0        # seconds between variant_stats flushes
+
+
+def variant_key(v):
+    """(planet, key_type, key, variant_id) for one variants_used entry."""
+    key_type = v.get("type") or ("house" if "house" in v else "theme")
+    key = v.get("theme") if key_type == "theme" else v.get("house")
+    return v.get("planet"), key_type, str(key), v.get("variant_id", 1)
+
+
+def parse_variants(variants_json):
+    """variants_used JSON → list of variant dicts ([] when absent or invalid)."""
+    try:
+        variants = json.loads(variants_json) if variants_json else []
+    except (json.JSONDecodeError, TypeError):
+        return []
+    return [v for v in variants if isinstance(v, dict)]
+
+
+def _reward(sum_rating, n):
+    """Mean rating mapped from 1-5 onto 0-1."""
+    return (sum_rating / n - 1) / 4
+
+
+class VariantBandit:
+    """Arm statistics per (planet, key_type, key) with pluggable selection."""
+
+    def __init__(self, strategy="epsilon_greedy", epsilon=DEFAULT_EPSILON, ucb_c=1.0,
+                 flush_interval=FLUSH_INTERVAL, rng=None):
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown strategy {strategy!r}, expected one of {STRATEGIES}")
+        self.strategy = strategy
+        self.epsilon = epsilon
+        self.ucb_c = ucb_c
+        self.flush_interval = flush_interval
+        self.rng = rng or random.Random()
+        self.pid = os.getpid()
+        self._arms = {}          # (planet, key_type, key) → {variant_id: [sum_rating, n]}
+        self._pending = {}       # (planet, key_type, key, variant_id) → [sum_rating, n]
+        self._lock = threading.Lock()
+        self._flushed_at = time.monotonic()
+
+    # ── Loading / persistence ─────────────────────────────────────────────
+
+    def load(self, conn=None):
+        """Replace in-memory stats with variant_stats plus unflushed increments."""
+        if conn is None:
+            with pooled_connection() as conn:
+                return self.load(conn)
+        rows = conn.execute(
+            "SELECT planet, key_type, key, variant_id, sum_rating, n FROM variant_stats"
+        ).fetchall()
+        with self._lock:
+            arms = {}
+            for r in rows:
+                arms.setdefault((r[0], r[1], r[2]), {})[r[3]] = [r[4], r[5]]
+            for (planet, key_type, key, vid), (s, n) in self._pending.items():
+                arm = arms.setdefault((planet, key_type, key), {}).setdefault(vid, [0.0, 0])
+                arm[0] += s
+                arm[1] += n
+            self._arms = arms
+        return self
+
+    def flush(self, conn=None, reload=True):
+        """Write buffered increments to variant_stats; returns how many arms were written."""
+        if conn is None:
+            with pooled_connection() as conn:
+                return self.flush(conn, reload)
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._flushed_at = time.monotonic()
+        if pending:
+            try:
+                conn.executemany(
+                    """INSERT INTO variant_stats (planet, key_type, key, variant_id, sum_rating, n)
+                       VALUES (?, ?, ?, ?, ?, ?)
+                       ON CONFLICT(planet, key_type, key, variant_id) DO UPDATE SET
+                           sum_rating = sum_rating + excluded.sum_rating,
+                           n = n + excluded.n""",
+                    [k + tuple(v) for k, v in pending.items()],
+                )
+                conn.commit()
+            except Exception:
+                with self._lock:           # keep the increments for the next flush
+                    for k, (s, n) in pending.items():
+                        p = self._pending.setdefault(k, [0.0, 0])
+                        p[0] += s
+                        p[1] += n
+                raise
+        if reload:
+            self.load(conn)
+        return len(pending)
+
+    def discard_pending(self):
+        """Drop unflushed increments (after variant_stats was rebuilt from history)."""
+        with self._lock:
+            self._pending = {}
+
+    # ── Updates ───────────────────────────────────────────────────────────
+
+    def update(self, planet, key_type, key, variant_id, rating):
+        key = str(key)
+        with self._lock:
+            arm = self._arms.setdefault((planet, key_type, key), {}).setdefault(variant_id, [0.0, 0])
+            arm[0] += rating
+            arm[1] += 1
+            p = self._pending.setdefault((planet, key_type, key, variant_id), [0.0, 0])
+            p[0] += rating
+            p[1] += 1
+            due = time.monotonic() - self._flushed_at >= self.flush_interval
+        if due:
+            self.flush()
+
+    def record_feedback(self, variants, rating):
+        """Apply one rating to every variant used in a response."""
+        for v in variants:
+            self.update(*variant_key(v), rating)
+
+    # ── Selection ─────────────────────────────────────────────────────────
+
+    def scores(self, planet, key_type, key, min_n=MIN_RATINGS):
+        """{variant_id: average rating} for arms with at least min_n ratings."""
+        arms = self._arms.get((planet, key_type, str(key)), {})
+        return {vid: s / n for vid, (s, n) in list(arms.items()) if n >= min_n}
+
+    def choose(self, planet, key_type, key, candidates=DEFAULT_VARIANTS):
+        """Pick a variant_id among `candidates` (the variants that have text)."""
+        candidates = tuple(candidates) or (1,)
+        arms = self._arms.get((planet, key_type, str(key)), {})
+        if self.strategy == "thompson":
+            return self._thompson(arms, candidates)
+        if self.strategy == "ucb":
+            return self._ucb(arms, candidates)
+        return self._epsilon_greedy(arms, candidates)
+
+    def _epsilon_greedy(self, arms, candidates):
+        scores = {vid: arms[vid][0] / arms[vid][1] for vid in candidates
+                  if vid in arms and arms[vid][1] >= MIN_RATINGS}
+        if not scores:
+            return self.rng.choice(candidates)    # no feedback yet — rotate randomly
+        if self.rng.random() < self.epsilon:
+            return self.rng.choice(list(scores))  # explore
+        return max(scores, key=scores.get)        # exploit
+
+    def _thompson(self, arms, candidates):
+        best, best_draw = candidates[0], -1.0
+        for vid in candidates:
+            s, n = arms.get(vid, (0.0, 0))
+            successes = _reward(s, n) * n if n else 0.0
+            draw = self.rng.betavariate(1 + successes, 1 + n - successes)
+            if draw > best_draw:
+                best, best_draw = vid, draw
+        return best
+
+    def _ucb(self, arms, candidates):
+        untried = [vid for vid in candidates if arms.get(vid, (0, 0))[1] == 0]
+        if untried:
+            return self.rng.choice(untried)
+        total = sum(arms[vid][1] for vid in candidates)
+        return max(
+            candidates,
+            key=lambda vid: _reward(*arms[vid])
+            + self.ucb_c * math.sqrt(2 * math.log(total) / arms[vid][1]),
+        )
+
+
+# ── Process-wide instance ─────────────────────────────────────────────────
+
+_bandit = None
+_bandit_lock = threading.Lock()
+_config = {}
+
+
+def get_bandit():
+    """The process-wide bandit, loaded from variant_stats on first use (and after fork)."""
+    global _bandit
+    bandit = _bandit
+    if bandit is None or bandit.pid != os.getpid():
+        with _bandit_lock:
+            if _bandit is None or _bandit.pid != os.getpid():
+                # A forked child starts from the table, not the parent's buffer
+                _bandit = VariantBandit(**_config).load()
+            bandit = _bandit
+    return bandit
+
+
+def configure_bandit(**options):
+    """Set strategy/epsilon/ucb_c/flush_interval for the process-wide bandit."""
+    global _bandit
+    VariantBandit(**options)                   # validate before replacing
+    with _bandit_lock:
+        old, _bandit = _bandit, None
+        _config.clear()
+        _config.update(options)
+    if old is not None and old.pid == os.getpid():
+        old.flush(reload=False)
+
+
+def reload_bandit(discard_pending=False):
+    """Reload this process's bandit (if loaded) from variant_stats."""
+    bandit = _bandit
+    if bandit is not None and bandit.pid == os.getpid():
+        if discard_pending:
+            bandit.discard_pending()
+        bandit.load()
+
+
+def flush_bandit():
+    """Write this process's buffered increments (if a bandit is loaded) now."""
+    bandit = _bandit
+    if bandit is not None and bandit.pid == os.getpid():
+        bandit.flush(reload=False)
+
+
+def _flush_at_exit():
+    try:
+        flush_bandit()
+    except Exception:
+        pass        # database gone at shutdown; ratings remain in event_feedback
+
+
+atexit.register(_flush_at_exit)
@@ -1,6 +1,14 @@
-"""Common city coordinates for birth chart creation."""
+"""
+Common city coordinates for birth chart creation.
 
-# (latitude, longitude, timezone_key)
+CITIES covers the places users name most often. Anything else is looked
+up in the offline gazetteer (agent/gazetteer.py) when its index has been
+built. Timezones are IANA names or aliases from core/timezones.py
+("IST" resolves through Asia/Kolkata).
+"""
+from kundali_engine.agent.gazetteer import get_gazetteer, pick
+
+# (latitude, longitude, timezone)
 CITIES = {
     # --- Major Indian cities ---
     "delhi": (28.6139, 77.2090, "IST"),
@@ -66,24 +74,34 @@ CITIES = {
     "allahabad": (25.4358, 81.8463, "IST"),
     "prayagraj": (25.4358, 81.8463, "IST"),
     # --- Major world cities ---
-    "london": (51.5074, -0.1278, "GMT"),
-    "new york": (40.7128, -74.0060, "EST"),
-    "los angeles": (34.0522, -118.2437, "PST"),
-    "chicago": (41.8781, -87.6298, "CST"),
-    "toronto": (43.6532, -79.3832, "EST"),
-    "sydney": (-33.8688, 151.2093, "AEST"),
-    "singapore": (1.3521, 103.8198, "IST"),  # SGT = UTC+8, but many Indians there
-    "dubai": (25.2048, 55.2708, "GST"),
-    "tokyo": (35.6762, 139.6503, "JST"),
-    "hong kong": (22.3193, 114.1694, "IST"),  # HKT = UTC+8
-    "kathmandu": (27.7172, 85.3240, "IST"),   # NPT close to IST
-    "colombo": (6.9271, 79.8612, "IST"),
-    "dhaka": (23.8103, 90.4125, "IST"),
-    "karachi": (24.8607, 67.0011, "IST"),
-    "lahore": (31.5204, 74.3587, "IST"),
+    "london": (51.5074, -0.1278, "Europe/London"),
+    "new york": (40.7128, -74.0060, "America/New_York"),
+    "los angeles": (34.0522, -118.2437, "America/Los_Angeles"),
+    "chicago": (41.8781, -87.6298, "America/Chicago"),
+    "toronto": (43.6532, -79.3832, "America/Toronto"),
+    "sydney": (-33.8688, 151.2093, "Australia/Sydney"),
+    "singapore": (1.3521, 103.8198, "Asia/Singapore"),
+    "dubai": (25.2048, 55.2708, "Asia/Dubai"),
+    "tokyo": (35.6762, 139.6503, "Asia/Tokyo"),
+    "hong kong": (22.3193, 114.1694, "Asia/Hong_Kong"),
+    "kathmandu": (27.7172, 85.3240, "Asia/Kathmandu"),
+    "colombo": (6.9271, 79.8612, "Asia/Colombo"),
+    "dhaka": (23.8103, 90.4125, "Asia/Dhaka"),
+    "karachi": (24.8607, 67.0011, "Asia/Karachi"),
+    "lahore": (31.5204, 74.3587, "Asia/Karachi"),
 }
 
 
+def search_places(name):
+    """Ranked gazetteer places for a name; [] when no index is built."""
+    gazetteer = get_gazetteer()
+    return gazetteer.search(name) if gazetteer else []
+
+
 def lookup_city(name):
     """Look up city coordinates. Returns (lat, lon, tz) or None."""
-    return CITIES.get(name.strip().lower())
+    city = CITIES.get(name.strip().lower())
+    if city:
+        return city
+    place = pick(search_places(name))
+    return (place.lat, place.lon, place.tz) if place else None
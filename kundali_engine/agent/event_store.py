@@ -3,116 +3,408 @@ Event sourcing for agent interactions.
 
 Every interaction is logged as an immutable event. User feedback
 drives RL-based variant selection in the interpreter.
+
+log_event() does not touch the database: it hands the event to a
+background EventWriter and returns a provisional (negative) event id.
+The writer inserts queued events in batches, one transaction per batch,
+and assigns the real ids. Provisional ids are accepted wherever an event
+id is (log_feedback waits for that event to be written), and
+get_last_event_id() returns a session's queued event before it reaches
+the table. The queue is flushed at interpreter exit; flush_events()
+forces it earlier.
+
+Each batch also records every session's newest event id in
+session_state, so a session's rating target survives a restart without
+scanning event_log.
 """
+import atexit
+import itertools
 import json
-from kundali_engine.core.database.connection import get_connection
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from kundali_engine.core.database.connection import get_connection, pooled_connection
+from kundali_engine.agent.bandit import get_bandit, parse_variants, reload_bandit, variant_key
+
+EVENT_COLUMNS = (
+    "session_id", "person_id", "raw_question", "detected_intent",
+    "detected_themes", "planets_involved", "houses_involved",
+    "chart_snapshot", "variants_used", "response_text",
+)
 
 
 def log_event(session_id, person_id, question, intent, themes=None,
               planets=None, houses=None, chart_snapshot=None,
               variants_used=None, response=None):
-    """Append one event to event_log. Returns event_id."""
-    conn = get_connection()
+    """
+    Queue one event for event_log. Returns its provisional event_id.
+
+    The JSON fields are serialized on the writer thread, so the lists and
+    dicts passed in must not be mutated afterwards.
+    """
+    return get_event_writer().submit({
+        "session_id": session_id,
+        "person_id": person_id,
+        "raw_question": question,
+        "detected_intent": intent,
+        "detected_themes": themes,
+        "planets_involved": planets,
+        "houses_involved": houses,
+        "chart_snapshot": chart_snapshot,
+        "variants_used": variants_used,
+        "response_text": response,
+    })
+
+
+def _event_row(event):
+    return (
+        event["session_id"],
+        event["person_id"],
+        event["raw_question"],
+        event["detected_intent"],
+        json.dumps(event["detected_themes"]) if event["detected_themes"] else None,
+        json.dumps(event["planets_involved"]) if event["planets_involved"] else None,
+        json.dumps(event["houses_involved"]) if event["houses_involved"] else None,
+        json.dumps(event["chart_snapshot"]) if event["chart_snapshot"] else None,
+        json.dumps(event["variants_used"]) if event["variants_used"] else None,
+        event["response_text"],
+    )
+
+
+def write_events(events, conn=None):
+    """
+    Insert events into event_log in one transaction. Returns their ids.
+
+    Ids are assigned here, under BEGIN IMMEDIATE, continuing from the
+    table's AUTOINCREMENT sequence, so one executemany covers the batch.
+    session_state is moved to each session's newest id in the same
+    transaction. Inside a caller's open transaction nothing is committed;
+    the caller commits or rolls back.
+    """
+    if conn is None:
+        with pooled_connection() as conn:
+            return write_events(events, conn)
+
+    rows = [_event_row(e) for e in events]
+    own_tx = not conn.in_transaction
+    if own_tx:
+        conn.execute("BEGIN IMMEDIATE")
     try:
-        cur = conn.execute(
-            """INSERT INTO event_log
-               (session_id, person_id, raw_question, detected_intent,
-                detected_themes, planets_involved, houses_involved,
-                chart_snapshot, variants_used, response_text)
-               VALUES (?,?,?,?,?,?,?,?,?,?)""",
-            (
-                session_id,
-                person_id,
-                question,
-                intent,
-                json.dumps(themes) if themes else None,
-                json.dumps(planets) if planets else None,
-                json.dumps(houses) if houses else None,
-                json.dumps(chart_snapshot) if chart_snapshot else None,
-                json.dumps(variants_used) if variants_used else None,
-                response,
-            ),
+        base = conn.execute(
+            """SELECT MAX(COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'event_log'), 0),
+                          COALESCE((SELECT MAX(id) FROM event_log), 0))"""
+        ).fetchone()[0]
+        ids = list(range(base + 1, base + 1 + len(rows)))
+        conn.executemany(
+            f"INSERT INTO event_log (id, {', '.join(EVENT_COLUMNS)}) "
+            f"VALUES ({', '.join('?' * (len(EVENT_COLUMNS) + 1))})",
+            [(i,) + row for i, row in zip(ids, rows)],
         )
-        conn.commit()
-        return cur.lastrowid
-    finally:
-        conn.close()
+        last = {e["session_id"]: i for i, e in zip(ids, events)}
+        now = time.time()
+        conn.executemany(
+            """INSERT INTO session_state (session_id, last_event_id, updated_at)
+               VALUES (?, ?, ?)
+               ON CONFLICT(session_id) DO UPDATE SET
+                   last_event_id = excluded.last_event_id, updated_at = excluded.updated_at""",
+            [(sid, i, now) for sid, i in last.items()],
+        )
+        if own_tx:
+            conn.commit()
+    except Exception:
+        if own_tx:
+            conn.rollback()
+        raise
+    return ids
 
 
-def log_feedback(event_id, rating, feedback=None):
-    """Record user rating for an event."""
-    conn = get_connection()
-    try:
+# ── Background writer ─────────────────────────────────────────────────────
+
+_STOP = object()
+
+
+class EventWriter:
+    """
+    Batches events onto event_log from a daemon thread.
+
+    The queue holds at most `max_queue` events. When it is full, submit()
+    waits up to `put_timeout` seconds and then writes the event itself
+    (backpressure lands on the caller rather than dropping events). The
+    thread collects up to `batch_size` events, waiting at most `linger`
+    seconds after the first, and writes each batch with write_events().
+    """
+
+    RESOLVED_KEEP = 10_000       # provisional → real id mappings retained
+
+    # Provisional ids start at a random offset so an id kept from another
+    # process or writer (e.g. in a persisted session) never resolves here
+
+    def __init__(self, max_queue=10_000, batch_size=500, linger=0.05, put_timeout=0.5):
+        self.batch_size = batch_size
+        self.linger = linger
+        self.put_timeout = put_timeout
+        self.pid = os.getpid()
+        self._queue = queue.Queue(max_queue)
+        self._ids = itertools.count(random.getrandbits(40) + 1)
+        self._cond = threading.Condition()
+        self._pending = set()            # provisional ids not yet written
+        self._last = {}                  # session_id → newest pending provisional id
+        self._resolved = OrderedDict()   # provisional id → event_log id (None if lost)
+        self.stats = {"queued": 0, "written": 0, "batches": 0, "sync_writes": 0, "failed": 0}
+        self._thread = threading.Thread(target=self._run, name="event-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, event):
+        if not self._thread.is_alive():          # closed (e.g. during shutdown)
+            self.stats["sync_writes"] += 1
+            return write_events([event])[0]
+        with self._cond:
+            provisional = -next(self._ids)
+            self._pending.add(provisional)
+            self._last[event["session_id"]] = provisional
+            self.stats["queued"] += 1
+        try:
+            self._queue.put((provisional, event), timeout=self.put_timeout)
+        except queue.Full:
+            self.stats["sync_writes"] += 1
+            self._write([(provisional, event)])
+        return provisional
+
+    def last_pending(self, session_id):
+        """Provisional id of the session's newest unwritten event, or None."""
+        with self._cond:
+            return self._last.get(session_id)
+
+    def resolve(self, event_id, timeout=30.0):
+        """Real event_log id for a provisional id, waiting for its write."""
+        if event_id is None or event_id > 0:
+            return event_id
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while event_id in self._pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(f"Event {event_id} not written after {timeout}s")
+                self._cond.wait(remaining)
+            return self._resolved.get(event_id)
+
+    def flush(self):
+        """Block until every event queued so far has been written."""
+        if self._thread.is_alive():
+            self._queue.join()
+
+    def close(self):
+        """Write everything queued and stop the thread."""
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join()
+
+    def _write(self, batch):
+        try:
+            ids = write_events([event for _, event in batch])
+        except Exception as e:
+            # The event log is an audit trail, not the response path: report and go on
+            print(f"event_store: failed to write {len(batch)} events: {e}", file=sys.stderr)
+            ids = [None] * len(batch)
+            self.stats["failed"] += len(batch)
+        with self._cond:
+            for (provisional, event), real in zip(batch, ids):
+                self._pending.discard(provisional)
+                self._resolved[provisional] = real
+                if self._last.get(event["session_id"]) == provisional:
+                    del self._last[event["session_id"]]
+            while len(self._resolved) > self.RESOLVED_KEEP:
+                self._resolved.popitem(last=False)
+            self.stats["written"] += len(batch) - ids.count(None)
+            self.stats["batches"] += 1
+            self._cond.notify_all()
+
+    def _run(self):
+        stop = False
+        while not stop:
+            item = self._queue.get()
+            batch = []
+            deadline = time.monotonic() + self.linger
+            while True:
+                if item is _STOP:
+                    stop = True
+                else:
+                    batch.append(item)
+                if stop or len(batch) >= self.batch_size:
+                    break
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            if batch:
+                self._write(batch)
+            for _ in range(len(batch) + stop):
+                self._queue.task_done()
+
+
+_writer = None
+_writer_lock = threading.Lock()
+_writer_config = {}
+
+
+def get_event_writer():
+    """The process-wide EventWriter, started on first use (and after fork)."""
+    global _writer
+    writer = _writer
+    if writer is None or writer.pid != os.getpid():
+        with _writer_lock:
+            if _writer is None or _writer.pid != os.getpid():
+                # A forked child has no writer thread; the parent writes its own queue
+                _writer = EventWriter(**_writer_config)
+            writer = _writer
+    return writer
+
+
+def configure_event_writer(**options):
+    """Set max_queue/batch_size/linger/put_timeout; flushes the current writer."""
+    global _writer
+    with _writer_lock:
+        old, _writer = _writer, None
+        _writer_config.clear()
+        _writer_config.update(options)
+    if old is not None and old.pid == os.getpid():
+        old.close()
+
+
+def flush_events():
+    """Write every queued event now (e.g. before reading event_log)."""
+    writer = _writer
+    if writer is not None and writer.pid == os.getpid():
+        writer.flush()
+
+
+def _close_at_exit():
+    writer = _writer
+    if writer is not None and writer.pid == os.getpid():
+        writer.close()
+
+
+atexit.register(_close_at_exit)
+
+
+def _resolve_event_id(event_id):
+    writer = _writer
+    if event_id is not None and event_id < 0:
+        if writer is None or writer.pid != os.getpid():
+            return None
+        return writer.resolve(event_id)
+    return event_id
+
+
+def log_feedback(event_id, rating, feedback=None, variants=None):
+    """
+    Record user rating for an event and credit the variants it used.
+    Pass the event's `variants` if known to skip reading them back.
+    """
+    event_id = _resolve_event_id(event_id)
+    if event_id is None:
+        raise ValueError("Unknown event: it was never written to event_log")
+    with pooled_connection() as conn:
         conn.execute(
             """INSERT INTO event_feedback (event_id, rating, feedback)
                VALUES (?,?,?)""",
             (event_id, rating, feedback),
         )
         conn.commit()
+        if rating is None:
+            return
+        if variants is None:
+            row = conn.execute(
+                "SELECT variants_used FROM event_log WHERE id = ?", (event_id,)
+            ).fetchone()
+            variants = parse_variants(row["variants_used"] if row else None)
+    # In-memory bandit; increments reach variant_stats on its next flush
+    get_bandit().record_feedback(variants, rating)
+
+
+def rebuild_variant_stats(conn=None):
+    """Recompute variant_stats from event_log + event_feedback. Returns row count."""
+    flush_events()
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
+    try:
+        totals = {}
+        rows = conn.execute(
+            """SELECT el.variants_used, ef.rating
+               FROM event_feedback ef
+               JOIN event_log el ON el.id = ef.event_id
+               WHERE ef.rating IS NOT NULL AND el.variants_used IS NOT NULL"""
+        ).fetchall()
+        for r in rows:
+            for v in parse_variants(r["variants_used"]):
+                t = totals.setdefault(variant_key(v), [0.0, 0])
+                t[0] += r["rating"]
+                t[1] += 1
+        conn.execute("DELETE FROM variant_stats")
+        conn.executemany(
+            """INSERT INTO variant_stats (planet, key_type, key, variant_id, sum_rating, n)
+               VALUES (?, ?, ?, ?, ?, ?)""",
+            [k + tuple(v) for k, v in totals.items()],
+        )
+        conn.commit()
     finally:
-        conn.close()
+        if own_conn:
+            conn.close()
+
+    # History now includes every buffered rating: drop them and reload
+    reload_bandit(discard_pending=True)
+    return len(totals)
 
 
 def get_variant_scores(planet, key, key_type="house"):
     """
-    Get average rating per variant_id for a planet+house or planet+theme combo.
+    Get average rating per variant_id for a planet+house, planet+theme or
+    Rahu/Ketu axis combo (variants with at least 2 ratings).
 
     Returns dict: {variant_id: avg_rating}
     """
-    conn = get_connection()
-    try:
-        if key_type == "house":
-            like_pattern = f'%"planet": "{planet}"%"house": {key}%'
-        else:
-            like_pattern = f'%"planet": "{planet}"%"theme": "{key}"%'
-
+    with pooled_connection() as conn:
         rows = conn.execute(
-            """SELECT j.value AS variant_json, AVG(ef.rating) AS avg_rating,
-                      COUNT(ef.rating) AS cnt
-               FROM event_log el
-               JOIN event_feedback ef ON ef.event_id = el.id
-               JOIN json_each(el.variants_used) j
-               WHERE j.value LIKE ?
-               GROUP BY j.value
-               HAVING cnt >= 2""",
-            (like_pattern,),
+            """SELECT variant_id, sum_rating / n AS avg_rating FROM variant_stats
+               WHERE planet = ? AND key_type = ? AND key = ? AND n >= 2""",
+            (planet, key_type, str(key)),
         ).fetchall()
-
-        scores = {}
-        for row in rows:
-            try:
-                v = json.loads(row["variant_json"])
-                scores[v.get("variant_id", 1)] = row["avg_rating"]
-            except (json.JSONDecodeError, TypeError):
-                continue
-        return scores
-    finally:
-        conn.close()
+        return {row["variant_id"]: row["avg_rating"] for row in rows}
 
 
 def get_last_event_id(session_id):
-    """Get the most recent event_id for a session (for rating)."""
-    conn = get_connection()
-    try:
+    """
+    Most recent event_id for a session; may be provisional. Sessions carry
+    their own pointer (handlers.handle_interpret), so this is the recovery
+    path after a restart: a queued event, else session_state.
+    """
+    writer = _writer
+    if writer is not None and writer.pid == os.getpid():
+        pending = writer.last_pending(session_id)
+        if pending is not None:
+            return pending
+    with pooled_connection() as conn:
         row = conn.execute(
-            "SELECT id FROM event_log WHERE session_id = ? "
-            "ORDER BY id DESC LIMIT 1",
+            "SELECT last_event_id FROM session_state WHERE session_id = ?",
             (session_id,),
         ).fetchone()
-        return row["id"] if row else None
-    finally:
-        conn.close()
+        return row["last_event_id"] if row else None
 
 
 def get_person_history(person_id, limit=50):
     """Recent events for a person — for context/continuity."""
-    conn = get_connection()
-    try:
+    flush_events()
+    with pooled_connection() as conn:
         rows = conn.execute(
             "SELECT * FROM event_log WHERE person_id = ? "
             "ORDER BY id DESC LIMIT ?",
             (person_id, limit),
         ).fetchall()
         return [dict(r) for r in rows]
-    finally:
-        conn.close()
@@ -0,0 +1,383 @@
+"""
+Offline gazetteer: city lookup over a GeoNames dump.
+
+Build once from a GeoNames export (cities500.txt / cities1000.zip /
+allCountries.txt from download.geonames.org/export/dump), then look up:
+
+    python -m kundali_engine.agent.gazetteer build cities500.zip
+    python -m kundali_engine.agent.gazetteer search "hyderabad"
+    python -m kundali_engine.agent.gazetteer search "springfield" --country US
+
+    get_gazetteer().search("banglore")    # ranked Place tuples
+    pick(get_gazetteer().search(q))       # the clear winner, or None
+
+The index is a directory of .npy files opened with mmap_mode="r", so
+every worker process shares the same pages and loading is instant:
+
+    keys.npy        sorted fixed-width ASCII keys (folded, lower-case)
+                    for each place's name, ASCII name and Latin alternates
+    key_place.npy   place row per key
+    places.npy      name, country, lat, lon, population, timezone index
+    timezones.npy   IANA zone names
+    typo_hash.npy   sorted crc32 of each primary key (plus alternates of
+    typo_key.npy    big cities) and its one-letter deletions, with the
+                    key row each came from
+
+Lookups are binary searches (np.searchsorted) on those arrays:
+
+  exact   the key range equal to the query
+  prefix  the key range starting with the query
+  typo    one insertion, deletion, substitution or swap: the query and
+          its deletions are hashed and searched in typo_hash (symmetric
+          delete), and candidates are verified in Python
+
+Exact matches rank first, then prefix and typo matches together (typos
+are only tried when nothing matches exactly); within each group a
+country hint ("Hyderabad, PK" or country="PK") filters when it matches
+anything, and population orders the rest.
+
+Keys are truncated to KEY_WIDTH bytes; longer names still match on their
+first KEY_WIDTH characters.
+"""
+import argparse
+import io
+import os
+import re
+import threading
+import unicodedata
+import zipfile
+import zlib
+from collections import namedtuple
+from pathlib import Path
+
+import numpy as np
+
+GAZETTEER_DIR = Path(__file__).resolve().parents[2] / "gazetteer"
+
+KEY_WIDTH = 32
+NAME_WIDTH = 64
+DEFAULT_LIMIT = 5
+MIN_TYPO_LENGTH = 4      # shorter queries only match exactly or by prefix
+AMBIGUITY_RATIO = 0.25   # a runner-up this populous in another country is a tie
+TYPO_ALTERNATES_MIN_POPULATION = 100_000   # alternate names also typo-indexed above this
+
+PLACE_DTYPE = np.dtype([
+    ("name", f"S{NAME_WIDTH}"),      # UTF-8
+    ("country", "S2"),
+    ("lat", "f4"),
+    ("lon", "f4"),
+    ("population", "u4"),
+    ("tz", "u2"),
+])
+
+# GeoNames dump columns used here
+_NAME, _ASCII, _ALTERNATES, _LAT, _LON, _CLASS = 1, 2, 3, 4, 5, 6
+_COUNTRY, _POPULATION, _TIMEZONE = 8, 14, 17
+
+# Country names users type after a comma, besides ISO codes
+COUNTRY_ALIASES = {
+    "india": "IN", "bharat": "IN", "pakistan": "PK", "bangladesh": "BD",
+    "nepal": "NP", "sri lanka": "LK", "usa": "US", "us": "US",
+    "united states": "US", "america": "US", "uk": "GB", "england": "GB",
+    "united kingdom": "GB", "canada": "CA", "australia": "AU",
+    "uae": "AE", "singapore": "SG", "germany": "DE", "france": "FR",
+}
+
+Place = namedtuple("Place", "name country lat lon population tz match")
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def normalize(text):
+    """ASCII-folded, lower-case words: 'São Paulo' → 'sao paulo'."""
+    text = unicodedata.normalize("NFKD", text or "")
+    text = text.encode("ascii", "ignore").decode().lower()
+    return " ".join(_WORD.findall(text))
+
+
+def _key(text):
+    return normalize(text).encode()[:KEY_WIDTH]
+
+
+def _deletions(key):
+    return {key[:i] + key[i + 1:] for i in range(len(key))}
+
+
+def _within_one_edit(a, b):
+    """True when a and b differ by at most one insert, delete, substitution or swap."""
+    if a == b:
+        return True
+    la, lb = len(a), len(b)
+    if abs(la - lb) > 1:
+        return False
+    i = 0
+    while i < la and i < lb and a[i] == b[i]:
+        i += 1
+    if la > lb:
+        return a[i + 1:] == b[i:]
+    if lb > la:
+        return a[i:] == b[i + 1:]
+    if a[i + 1:] == b[i + 1:]:
+        return True
+    return a[i:i + 2] == b[i:i + 2][::-1] and a[i + 2:] == b[i + 2:]
+
+
+def _split_country(query):
+    """'Hyderabad, PK' → ('Hyderabad', 'PK'); no recognised suffix → (query, None)."""
+    head, sep, tail = (query or "").rpartition(",")
+    if not sep:
+        return query, None
+    tail = normalize(tail)
+    if tail in COUNTRY_ALIASES:
+        return head, COUNTRY_ALIASES[tail]
+    if len(tail) == 2 and tail.isalpha():
+        return head, tail.upper()
+    return query, None
+
+
+# ── Build ───────────────────────────────────────────────────────────────────
+
+def _open_dump(path):
+    path = Path(path)
+    if path.suffix == ".zip":
+        archive = zipfile.ZipFile(path)
+        member = next(n for n in archive.namelist() if n.endswith(".txt"))
+        return io.TextIOWrapper(archive.open(member), encoding="utf-8")
+    return open(path, encoding="utf-8")
+
+
+def _save(out_dir, name, array):
+    """Write via a temp file and rename, so mapped readers keep the old file."""
+    tmp = out_dir / f".{name}.tmp.npy"
+    np.save(tmp, array)
+    os.replace(tmp, out_dir / f"{name}.npy")
+
+
+def build_index(source, out_dir=GAZETTEER_DIR, min_population=0, alternates=True):
+    """
+    Build the index directory from a GeoNames dump (.txt or .zip).
+    Only populated places (feature class P) are kept. Returns the number
+    of places written.
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    places, keys, key_place, typo_keys = [], [], [], set()
+    tz_index = {}
+    with _open_dump(source) as f:
+        for line in f:
+            cols = line.rstrip("\n").split("\t")
+            if len(cols) <= _TIMEZONE or cols[_CLASS] != "P":
+                continue
+            population = int(cols[_POPULATION] or 0)
+            if population < min_population:
+                continue
+            row = len(places)
+            tz = tz_index.setdefault(cols[_TIMEZONE], len(tz_index))
+            places.append((cols[_NAME].encode()[:NAME_WIDTH], cols[_COUNTRY].encode(),
+                           float(cols[_LAT]), float(cols[_LON]), min(population, 2**32 - 1), tz))
+
+            names = {_key(cols[_NAME]), _key(cols[_ASCII])}
+            typo_keys.update(names)
+            if alternates and cols[_ALTERNATES]:
+                for alt in cols[_ALTERNATES].split(","):
+                    # Skip postal/airport codes; non-Latin scripts fold to nothing
+                    if any(c.isdigit() for c in alt) or (alt.isupper() and len(alt) <= 4):
+                        continue
+                    names.add(_key(alt))
+                if population >= TYPO_ALTERNATES_MIN_POPULATION:
+                    typo_keys.update(names)
+            for key in names:
+                if len(key) >= 2:
+                    keys.append(key)
+                    key_place.append(row)
+
+    keys = np.array(keys, dtype=f"S{KEY_WIDTH}")
+    order = np.argsort(keys, kind="stable")
+    keys, key_place = keys[order], np.asarray(key_place, dtype=np.int32)[order]
+
+    # Symmetric-delete typo index over primary names (and alternates of
+    # big cities): each distinct key and its one-letter deletions, hashed;
+    # the key row is its first occurrence.
+    first = np.searchsorted(keys, np.unique(keys))
+    hashes, rows = [], []
+    for row in first.tolist():
+        key = keys[row]
+        if len(key) < MIN_TYPO_LENGTH or key not in typo_keys:
+            continue
+        for variant in _deletions(key) | {key}:
+            hashes.append(zlib.crc32(variant))
+            rows.append(row)
+    hashes = np.array(hashes, dtype=np.uint32)
+    order = np.argsort(hashes, kind="stable")
+
+    _save(out_dir, "places", np.array(places, dtype=PLACE_DTYPE))
+    _save(out_dir, "timezones", np.array(sorted(tz_index, key=tz_index.get)))
+    _save(out_dir, "key_place", key_place)
+    _save(out_dir, "typo_hash", hashes[order])
+    _save(out_dir, "typo_key", np.array(rows, dtype=np.int32)[order])
+    _save(out_dir, "keys", keys)
+    return len(places)
+
+
+# ── Lookup ──────────────────────────────────────────────────────────────────
+
+class Gazetteer:
+    """Memory-mapped gazetteer index (see module docstring)."""
+
+    def __init__(self, path=GAZETTEER_DIR):
+        path = Path(path)
+
+        def load(name):
+            # Plain ndarray views of the mapping: np.memmap indexing is slow
+            return np.asarray(np.load(path / f"{name}.npy", mmap_mode="r"))
+
+        self.keys = load("keys")
+        self.key_place = load("key_place")
+        self.places = load("places")
+        self.name = self.places["name"]
+        self.country = self.places["country"]
+        self.lat = self.places["lat"]
+        self.lon = self.places["lon"]
+        self.population = self.places["population"]
+        self.tz = self.places["tz"]
+        self.timezones = load("timezones").tolist()
+        self.typo_hash = load("typo_hash")
+        self.typo_key = load("typo_key")
+
+    def __len__(self):
+        return len(self.places)
+
+    def _place(self, row, match):
+        return Place(self.name[row].decode("utf-8", "replace"), self.country[row].decode(),
+                     round(float(self.lat[row]), 4), round(float(self.lon[row]), 4),
+                     int(self.population[row]), self.timezones[self.tz[row]], match)
+
+    def _exact_rows(self, key):
+        lo = np.searchsorted(self.keys, key, side="left")
+        hi = np.searchsorted(self.keys, key, side="right")
+        return self.key_place[lo:hi]
+
+    def _prefix_rows(self, key):
+        if len(key) >= KEY_WIDTH:
+            return self._exact_rows(key)
+        lo = np.searchsorted(self.keys, key, side="left")
+        hi = np.searchsorted(self.keys, key + b"\xff", side="left")
+        return self.key_place[lo:hi]
+
+    def _typo_rows(self, key):
+        if len(key) < MIN_TYPO_LENGTH:
+            return self.key_place[:0]
+        probes = np.array(sorted({zlib.crc32(v) for v in _deletions(key) | {key}}), dtype=np.uint32)
+        lo = np.searchsorted(self.typo_hash, probes, side="left")
+        hi = np.searchsorted(self.typo_hash, probes, side="right")
+        candidates = {int(r) for a, b in zip(lo, hi) for r in self.typo_key[a:b]}
+        rows = []
+        for r in candidates:
+            k = self.keys[r]
+            if _within_one_edit(key, k):
+                rows.extend(self._exact_rows(k).tolist())
+        return np.array(rows, dtype=np.int32)
+
+    def _best(self, rows, country, limit, exclude):
+        """Up to `limit` distinct rows by population, country hint first."""
+        if country and len(rows):
+            in_country = rows[self.country[rows] == country.encode()]
+            if len(in_country):
+                rows = in_country
+        # A place can own several matching keys (name, ASCII name, alternates),
+        # so keep a margin before removing duplicates
+        keep = limit * 8
+        if len(rows) > keep:
+            rows = rows[np.argpartition(-self.population[rows].astype(np.int64), keep - 1)[:keep]]
+        distinct = set(rows.tolist()) - exclude
+        return sorted(distinct, key=lambda r: -int(self.population[r]))[:limit]
+
+    def search(self, query, country=None, limit=DEFAULT_LIMIT):
+        """Ranked places for a query ('Paris', 'paris, fr', 'Banglore')."""
+        query, hint = _split_country(query)
+        country = (country or hint or "").upper() or None
+        key = _key(query)
+        if not key:
+            return []
+
+        exact = self._best(self._exact_rows(key), country, limit, set())
+        results = [self._place(r, "exact") for r in exact]
+        if len(results) < limit:
+            seen = set(exact)
+            prefix = self._best(self._prefix_rows(key), country, limit, seen)
+            typo = [] if exact else self._best(self._typo_rows(key), country, limit, seen | set(prefix))
+            near = [(r, "prefix") for r in prefix] + [(r, "typo") for r in typo]
+            near.sort(key=lambda item: -int(self.population[item[0]]))
+            results += [self._place(r, match) for r, match in near[:limit - len(results)]]
+        if country and any(p.country == country for p in results):
+            results = [p for p in results if p.country == country]
+        return results
+
+    def lookup(self, query, country=None):
+        """The clear best place for a query, or None (see pick())."""
+        return pick(self.search(query, country))
+
+
+def pick(places):
+    """
+    The top place unless another country has a comparable place (population
+    at least AMBIGUITY_RATIO of the top one) in the same match group; then
+    None so the caller can ask for a country. Exact matches are only
+    compared with exact matches. Within one country the most
+    populous place wins.
+    """
+    if not places:
+        return None
+    top = places[0]
+    exact = top.match == "exact"
+    for other in places[1:]:
+        if (other.match == "exact") != exact:
+            continue
+        if other.country != top.country and other.population >= AMBIGUITY_RATIO * top.population:
+            return None
+    return top
+
+
+_gazetteer = None
+_gazetteer_lock = threading.Lock()
+
+
+def get_gazetteer(path=GAZETTEER_DIR):
+    """The process-wide Gazetteer, or None when no index has been built."""
+    global _gazetteer
+    with _gazetteer_lock:
+        if _gazetteer is None and (Path(path) / "keys.npy").exists():
+            _gazetteer = Gazetteer(path)
+        return _gazetteer
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline GeoNames gazetteer")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="build the index from a GeoNames dump")
+    build.add_argument("source")
+    build.add_argument("--out", default=str(GAZETTEER_DIR))
+    build.add_argument("--min-population", type=int, default=0)
+    build.add_argument("--no-alternates", action="store_true", help="index primary names only")
+    search = sub.add_parser("search", help="look up a place")
+    search.add_argument("query")
+    search.add_argument("--country")
+    search.add_argument("--limit", type=int, default=DEFAULT_LIMIT)
+    search.add_argument("--index", default=str(GAZETTEER_DIR))
+    args = parser.parse_args()
+
+    if args.command == "build":
+        n = build_index(args.source, args.out, args.min_population, not args.no_alternates)
+        print(f"Indexed {n} places into {args.out}")
+        return
+    gazetteer = get_gazetteer(args.index)
+    if gazetteer is None:
+        parser.error(f"no gazetteer index in {args.index}; run 'build' first")
+    for p in gazetteer.search(args.query, args.country, args.limit):
+        print(f"  {p.name:<30} {p.country}  {p.lat:>9.4f} {p.lon:>9.4f}  "
+              f"pop {p.population:>9}  {p.tz:<22} {p.match}")
+
+
+if __name__ == "__main__":
+    main()
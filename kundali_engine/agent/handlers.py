@@ -8,8 +8,12 @@ They return plain text suitable for CLI, WhatsApp, or web.
 import re
 from datetime import datetime, date
 
-from kundali_engine.core.database.connection import get_connection, DB_PATH
-from kundali_engine.agent.cities import lookup_city, CITIES
+from kundali_engine.core.database.connection import pooled_connection
+from kundali_engine.core.database.person_search import best_match, search_persons
+from kundali_engine.core.database.reference import get_reference_data
+from kundali_engine.agent.cities import search_places, CITIES
+from kundali_engine.agent.gazetteer import pick
+from kundali_engine.agent.response_cache import invalidate_person
 from kundali_engine.agent import event_store
 
 # ── Help text (reused in greeting + unknown intent) ─────────────────────────
@@ -29,8 +33,9 @@ Here's what I can do:
   Sector advice   - "which sectors are good?" or "should I buy gold?"
   Planet info     - "tell me about Saturn"
   Switch person   - "switch to Priyanka"
-  Compare charts  - "compare me with Priyanka"
+  Compare charts  - "compare me with Priyanka" or "best matches for me"
   Rate a response - "rate 4" or "5 stars" (helps me learn)
+  Chart format    - "format whatsapp" (text, whatsapp, json or html)
 
 Type 'cancel' during any multi-step flow to abort."""
 
@@ -49,6 +54,16 @@ def handle_help(message, session):
     return HELP_TEXT
 
 
+def handle_set_format(message, session):
+    from kundali_engine.chart.render import FORMATS
+
+    fmt = message.lower().split()[-1]
+    if fmt not in FORMATS:
+        return f"Unknown format. Choose one of: {', '.join(FORMATS)}."
+    session["format"] = fmt
+    return f"Charts will be shown as {fmt}."
+
+
 # ═════════════════════════════════════════════════════════════════════════════
 # CREATE CHART  (inline or multi-step conversational flow)
 # ═════════════════════════════════════════════════════════════════════════════
@@ -94,7 +109,9 @@ def continue_create_chart_flow(message, session):
 
     if step == "place":
         place = message.strip()
-        city = lookup_city(place)
+        city, label, question = _resolve_place(place)
+        if question:
+            return question
         if not city:
             data["place"] = place
             data["_step"] = "coords"
@@ -103,7 +120,7 @@ def continue_create_chart_flow(message, session):
                 "Please provide latitude and longitude (e.g. 28.61, 77.20)"
             )
         lat, lon, tz = city
-        data["place"] = place.title()
+        data["place"] = label
         data["lat"] = lat
         data["lon"] = lon
         data["tz"] = tz
@@ -125,6 +142,29 @@ def continue_create_chart_flow(message, session):
     return "Something went wrong. Say 'create kundali' to start again."
 
 
+def _resolve_place(place):
+    """
+    (city, label, question) for a place name. city is (lat, lon, tz) from
+    CITIES or the gazetteer, or None. question is set when the gazetteer
+    has comparable places in several countries and the user must pick.
+    """
+    city = CITIES.get(place.strip().lower())
+    if city:
+        return city, place.strip().title(), None
+    candidates = search_places(place)
+    best = pick(candidates)
+    if best:
+        return (best.lat, best.lon, best.tz), f"{best.name}, {best.country}", None
+    if not candidates:
+        return None, place, None
+    options = "\n".join(f"  {p.name}, {p.country}  (pop {p.population:,})" for p in candidates)
+    example = f"{candidates[0].name}, {candidates[0].country}"
+    return None, place, (
+        f"There are several places called '{place}':\n{options}\n"
+        f"Which one? Add the country, e.g. '{example}'"
+    )
+
+
 def _ask_next_create_field(session):
     data = session["flow_data"]
     if "name" not in data:
@@ -148,21 +188,26 @@ def _execute_create_chart(data, session):
     """Compute planetary positions, store in DB, return formatted result."""
     # Resolve city coordinates if missing
     if "lat" not in data:
-        city = lookup_city(data.get("place", ""))
+        city, label, question = _resolve_place(data.get("place", ""))
         if not city:
             session["flow"] = "create_chart"
             session["flow_data"] = data
-            session["flow_data"]["_step"] = "coords"
+            if question:
+                data["_step"] = "place"
+                return question
+            data["_step"] = "coords"
             return (
                 f"I don't have coordinates for '{data.get('place', '')}'.\n"
                 "Please provide latitude and longitude (e.g. 28.61, 77.20)"
             )
         data["lat"], data["lon"], data["tz"] = city
+        data["place"] = label
 
     try:
         from kundali_engine.create_kundali import (
             compute_planetary_positions, store_kundali,
         )
+        from kundali_engine.chart.render import Chart
 
         tz = data.get("tz", "IST")
         lagna_sign, lagna_degree, planets = compute_planetary_positions(
@@ -179,39 +224,18 @@ def _execute_create_chart(data, session):
             "tz": tz,
         }
         person_id = store_kundali(person_data, lagna_sign, lagna_degree, planets)
+        # data_version triggers already retire cached responses; free them now
+        invalidate_person(person_id)
 
         session["active_person_id"] = person_id
         session["active_person_name"] = data["name"]
 
-        lines = [
-            f"Chart created for {data['name']} (ID: {person_id})",
-            "",
-            f"Lagna: {lagna_sign} ({lagna_degree:.1f} deg)",
-            "",
-        ]
-
-        sun  = next(p for p in planets if p["planet"] == "Sun")
-        moon = next(p for p in planets if p["planet"] == "Moon")
-        lines.append(f"Sun Sign:  {sun['sign']}  |  Moon Sign: {moon['sign']}")
-        lines.append(f"Moon Nakshatra: {moon['nakshatra']} (Pada {moon['nakshatra_pada']})")
-        lines.append("")
-
-        lines.append(
-            f"{'Planet':<10} {'Sign':<12} {'House':>5} {'Degree':>8} "
-            f"{'Nakshatra':<16} {'Dignity':<12} {'R':>2}"
+        chart = Chart.from_computed(person_id, person_data, lagna_sign, lagna_degree, planets)
+        return (
+            f"Chart created for {data['name']} (ID: {person_id})\n\n"
+            + chart.render(session.get("format") or "text", header=False)
+            + f"\n\nActive person is now {data['name']}."
         )
-        lines.append("-" * 72)
-        for p in planets:
-            retro = "R" if p["is_retrograde"] else ""
-            lines.append(
-                f"{p['planet']:<10} {p['sign']:<12} {p['house']:>5} "
-                f"{p['degree_in_sign']:>7.1f}  {p['nakshatra']:<16} "
-                f"{p.get('dignity', ''):<12} {retro:>2}"
-            )
-
-        lines.append("")
-        lines.append(f"Active person is now {data['name']}.")
-        return "\n".join(lines)
 
     except Exception as e:
         return f"Error computing chart: {e}"
@@ -222,20 +246,27 @@ def _execute_create_chart(data, session):
 # ═════════════════════════════════════════════════════════════════════════════
 
 def handle_show_chart(message, session):
+    from kundali_engine.chart.render import find_person, get_chart_cache
+
     person_name = _extract_person_name(message)
+    fmt = session.get("format") or "text"
 
-    conn = get_connection()
-    try:
-        if person_name:
-            row = conn.execute(
-                "SELECT * FROM person WHERE LOWER(name) LIKE ?",
-                (f"%{person_name.lower()}%",),
-            ).fetchone()
+    with pooled_connection() as conn:
+        if person_name and person_name.isdigit():
+            row = find_person(conn, int(person_name))
+        elif person_name:
+            row = find_person(conn, name=person_name)
         else:
-            row = conn.execute(
-                "SELECT * FROM person WHERE id = ?",
-                (session["active_person_id"],),
-            ).fetchone()
+            row = find_person(conn, session["active_person_id"])
+
+        # Several equally good matches — let the user pick
+        candidates = search_persons(conn, person_name) if person_name and not row else []
+        if candidates:
+            lines = ["Which one did you mean?"]
+            for c in candidates:
+                lines.append(f"  {c['id']}: {c['name']}")
+            lines.append("\nSay 'show chart for [ID]' to pick one.")
+            return "\n".join(lines)
 
         if not row:
             return (
@@ -243,74 +274,25 @@ def handle_show_chart(message, session):
                 "Use 'list people' to see stored charts."
             )
 
-        person_id = row["id"]
-        planets = conn.execute(
-            "SELECT * FROM natal_planet WHERE person_id = ? "
-            "ORDER BY sidereal_longitude",
-            (person_id,),
-        ).fetchall()
-
-        lines = [f"Chart for {row['name']} (ID: {person_id})"]
-        lines.append(
-            f"Born: {row['dob']} at {row['tob']}, "
-            f"{row['place_name'] or ''}"
-        )
-        lines.append(
-            f"Lagna: {row['lagna_sign'] or 'N/A'} "
-            f"({row['lagna_degree'] or 0:.1f} deg)"
-        )
-        lines.append("")
-
-        if planets:
-            # Sun / Moon summary
-            sun  = next((p for p in planets if p["planet"] == "Sun"), None)
-            moon = next((p for p in planets if p["planet"] == "Moon"), None)
-            if sun and moon:
-                lines.append(
-                    f"Sun Sign:  {sun['sign']}  |  Moon Sign: {moon['sign']}"
-                )
-                lines.append(
-                    f"Moon Nakshatra: {moon['nakshatra'] or 'N/A'} "
-                    f"(Pada {moon['nakshatra_pada'] or '?'})"
-                )
-                lines.append("")
-
-            lines.append(
-                f"{'Planet':<10} {'Sign':<12} {'House':>5} {'Degree':>8} "
-                f"{'Nakshatra':<16} {'Dignity':<12} {'R':>2}"
-            )
-            lines.append("-" * 72)
-            for p in planets:
-                retro = "R" if p["is_retrograde"] else ""
-                lines.append(
-                    f"{p['planet']:<10} {p['sign']:<12} "
-                    f"{p['house'] or '':>5} "
-                    f"{p['degree_in_sign'] or 0:>7.1f}  "
-                    f"{p['nakshatra'] or '':<16} "
-                    f"{p['dignity'] or '':<12} {retro:>2}"
-                )
-        else:
-            lines.append("No planetary data computed yet.")
+        # Cached per (person, chart version); planets are read only on a miss
+        chart = get_chart_cache().get(conn, row)
+        text = chart.render(fmt)
 
         # ── Interpretation sections ──────────────────────────────────────
-        if planets:
+        if chart.planets and fmt in ("text", "whatsapp"):
             try:
                 from kundali_engine.agent.interpreter import ChartInterpreter
-                interpreter = ChartInterpreter(person_id)
+                interpreter = ChartInterpreter(chart.person_id, chart=chart)
                 try:
                     summary = interpreter.chart_summary()
                     if summary:
-                        lines.append("")
-                        lines.append("=" * 72)
-                        lines.append(summary)
+                        text += "\n\n" + "=" * 72 + "\n" + summary
                 finally:
                     interpreter.close()
             except Exception:
                 pass  # interpretation is a bonus; don't break show_chart
 
-        return "\n".join(lines)
-    finally:
-        conn.close()
+        return text
 
 
 # ═════════════════════════════════════════════════════════════════════════════
@@ -318,8 +300,7 @@ def handle_show_chart(message, session):
 # ═════════════════════════════════════════════════════════════════════════════
 
 def handle_list_people(message, session):
-    conn = get_connection()
-    try:
+    with pooled_connection() as conn:
         rows = conn.execute(
             "SELECT id, name, dob, place_name FROM person ORDER BY id"
         ).fetchall()
@@ -337,8 +318,6 @@ def handle_list_people(message, session):
                 f"{r['dob'] or '':<12} {r['place_name'] or '':<20}{marker}"
             )
         return "\n".join(lines)
-    finally:
-        conn.close()
 
 
 # ═════════════════════════════════════════════════════════════════════════════
@@ -346,8 +325,7 @@ def handle_list_people(message, session):
 # ═════════════════════════════════════════════════════════════════════════════
 
 def handle_dasha_info(message, session):
-    conn = get_connection()
-    try:
+    with pooled_connection() as conn:
         person_id = session["active_person_id"]
         name = _get_active_person_name(session)
         today = date.today().isoformat()
@@ -415,155 +393,77 @@ def handle_dasha_info(message, session):
                 )
 
         return "\n".join(lines)
-    finally:
-        conn.close()
 
 
 # ═════════════════════════════════════════════════════════════════════════════
-# TODAY GUIDANCE  (dasha-based; transit scoring not yet built)
+# TODAY GUIDANCE  (precomputed nightly by engine/daily_batch.py)
 # ═════════════════════════════════════════════════════════════════════════════
 
-_GUIDANCE = {
-    "Sun": {
-        "theme": "Authority, career, government matters, father",
-        "do": "Take leadership roles, pursue recognition, deal with authorities",
-        "avoid": "Ego conflicts, unnecessary confrontations with bosses",
-        "health": "Watch heart, eyes, bones — stay hydrated",
-    },
-    "Moon": {
-        "theme": "Mind, emotions, mother, public dealings",
-        "do": "Trust intuition, nurture relationships, connect with people",
-        "avoid": "Emotional decisions, overthinking, irregular sleep",
-        "health": "Watch stress, water intake, mental peace",
-    },
-    "Mars": {
-        "theme": "Energy, action, property, siblings, courage",
-        "do": "Physical exercise, bold initiatives, technical work",
-        "avoid": "Arguments, haste, risky driving, anger",
-        "health": "Watch blood pressure, injuries, inflammation",
-    },
-    "Mercury": {
-        "theme": "Communication, intellect, business, learning",
-        "do": "Study, write, negotiate, learn new skills, analyse data",
-        "avoid": "Miscommunication, signing without reading, gossip",
-        "health": "Watch skin, nervous system, digestion",
-    },
-    "Jupiter": {
-        "theme": "Wisdom, expansion, teaching, finance, spirituality",
-        "do": "Learn, teach, invest wisely, spiritual practice, charity",
-        "avoid": "Overcommitment, overindulgence, blind optimism",
-        "health": "Watch liver, weight, sugar levels",
-    },
-    "Venus": {
-        "theme": "Relationships, luxury, arts, vehicles, comfort",
-        "do": "Enjoy beauty, strengthen relationships, creative pursuits",
-        "avoid": "Overspending, overindulgence, relationship drama",
-        "health": "Watch kidneys, reproductive health, diabetes",
-    },
-    "Saturn": {
-        "theme": "Discipline, karma, hard work, delays, structure",
-        "do": "Be patient, work systematically, serve others, build slowly",
-        "avoid": "Shortcuts, laziness, ignoring responsibilities",
-        "health": "Watch joints, teeth, chronic conditions — regular checkups",
-    },
-    "Rahu": {
-        "theme": "Ambition, unconventional paths, foreign connections, technology",
-        "do": "Explore new opportunities, technology, foreign dealings",
-        "avoid": "Deception, addictions, get-rich-quick schemes, confusion",
-        "health": "Watch mental health, mysterious ailments, toxins",
-    },
-    "Ketu": {
-        "theme": "Spirituality, detachment, research, past-life karma",
-        "do": "Meditate, research deeply, let go of attachments",
-        "avoid": "Confusion, aimlessness, ignoring practical matters",
-        "health": "Watch infections, allergies, unexplained symptoms",
-    },
-}
-
-
 def handle_today_guidance(message, session):
-    conn = get_connection()
-    try:
-        person_id = session["active_person_id"]
-        name = _get_active_person_name(session)
-        today = date.today().isoformat()
-
-        maha = conn.execute(
-            "SELECT planet FROM dasha WHERE person_id = ? AND level = 'maha' "
-            "AND start_date <= ? AND end_date >= ?",
-            (person_id, today, today),
-        ).fetchone()
-
-        antar = None
-        if maha:
-            antar = conn.execute(
-                "SELECT d.planet FROM dasha d JOIN dasha m "
-                "ON d.parent_dasha_id = m.id "
-                "WHERE d.person_id = ? AND d.level = 'antar' "
-                "AND m.level = 'maha' AND m.planet = ? "
-                "AND d.start_date <= ? AND d.end_date >= ?",
-                (person_id, maha["planet"], today, today),
-            ).fetchone()
-
-        if not maha:
-            return (
-                f"No dasha data for {name or 'active person'} — "
-                "can't generate guidance yet."
-            )
+    from kundali_engine.engine.daily_batch import (
+        GUIDANCE, STRONG_DIGNITIES, WEAK_DIGNITIES, get_daily_guidance,
+    )
 
-        maha_planet = maha["planet"]
-        antar_planet = antar["planet"] if antar else None
+    person_id = session["active_person_id"]
+    name = _get_active_person_name(session)
+    rows = get_daily_guidance(person_id)
 
-        natal = conn.execute(
-            "SELECT * FROM natal_planet WHERE person_id = ? AND planet = ?",
-            (person_id, maha_planet),
-        ).fetchone()
+    if not rows:
+        return (
+            f"No dasha data for {name or 'active person'} — "
+            "can't generate guidance yet."
+        )
 
-        lines = [
-            f"Daily guidance for {name or 'you'} — "
-            f"{date.today().strftime('%d %b %Y')}",
-            "",
-            f"Current period: {maha_planet}"
-            + (f" / {antar_planet}" if antar_planet else ""),
-            "",
-        ]
+    factors = rows[0]["source_factors"]
+    maha_planet = factors["maha"]
+    antar_planet = factors.get("antar")
+    advice = {(r["category"], r["action_type"]): r["recommendation"] for r in rows}
+
+    lines = [
+        f"Daily guidance for {name or 'you'} — "
+        f"{date.today().strftime('%d %b %Y')}",
+        "",
+        f"Current period: {maha_planet}"
+        + (f" / {antar_planet}" if antar_planet else ""),
+        "",
+    ]
 
-        info = _GUIDANCE.get(maha_planet, {})
-        lines.append(f"Theme:  {info.get('theme', 'General period')}")
+    info = GUIDANCE.get(maha_planet, {})
+    lines.append(f"Theme:  {info.get('theme', 'General period')}")
 
-        if natal and natal["dignity"]:
-            d = natal["dignity"]
-            if d in ("exalted", "moolatrikona", "own"):
-                lines.append(
-                    f"{maha_planet} is strong in your chart ({d}) "
-                    "— positive results likely."
-                )
-            elif d in ("debilitated", "enemy"):
-                lines.append(
-                    f"{maha_planet} is challenged in your chart ({d}) "
-                    "— extra care needed."
-                )
-
-        lines.append("")
-        lines.append(f"Do:     {info.get('do', 'Stay balanced')}")
-        lines.append(f"Avoid:  {info.get('avoid', 'Excess of any kind')}")
-        lines.append(f"Health: {info.get('health', 'Maintain routine')}")
+    d = factors.get("dignity")
+    if d in STRONG_DIGNITIES:
+        lines.append(
+            f"{maha_planet} is strong in your chart ({d}) "
+            "— positive results likely."
+        )
+    elif d in WEAK_DIGNITIES:
+        lines.append(
+            f"{maha_planet} is challenged in your chart ({d}) "
+            "— extra care needed."
+        )
 
-        if antar_planet and antar_planet != maha_planet:
-            antar_info = _GUIDANCE.get(antar_planet, {})
-            lines.append("")
-            lines.append(
-                f"Sub-period ({antar_planet}) adds: "
-                f"{antar_info.get('theme', 'mixed influences')}"
-            )
+    lines.append("")
+    lines.append(f"Do:     {advice.get(('general', 'do'), 'Stay balanced')}")
+    lines.append(f"Avoid:  {advice.get(('general', 'avoid'), 'Excess of any kind')}")
+    lines.append(f"Health: {advice.get(('health', 'avoid'), 'Maintain routine')}")
 
+    if antar_planet and antar_planet != maha_planet:
+        antar_info = GUIDANCE.get(antar_planet, {})
         lines.append("")
         lines.append(
-            "(Transit-based scoring coming soon for more precise daily guidance.)"
+            f"Sub-period ({antar_planet}) adds: "
+            f"{antar_info.get('theme', 'mixed influences')}"
         )
-        return "\n".join(lines)
-    finally:
-        conn.close()
+
+    lines.append("")
+    score = factors.get("transit_score")
+    if score is None:
+        lines.append("(No transit data for today yet — guidance is dasha-based.)")
+    else:
+        outlook = "supportive" if score > 2 else "challenging" if score < -2 else "mixed"
+        lines.append(f"Transits from your Moon: {score:+.1f} on a -10..+10 scale ({outlook}).")
+    return "\n".join(lines)
 
 
 # ═════════════════════════════════════════════════════════════════════════════
@@ -572,12 +472,9 @@ def handle_today_guidance(message, session):
 
 def handle_trading_regime(message, session):
     try:
-        from kundali_engine.engine.astro_regime import compute_astro_regime
+        from kundali_engine.engine.astro_regime import get_astro_regime
 
-        regime = compute_astro_regime(
-            db=str(DB_PATH),
-            person_id=session["active_person_id"],
-        )
+        regime = get_astro_regime(session["active_person_id"])
 
         lines = [
             "Market Regime (Astro-based):",
@@ -608,9 +505,20 @@ def handle_trading_regime(message, session):
 # SECTOR ADVICE
 # ═════════════════════════════════════════════════════════════════════════════
 
+_COMMODITY_KEYWORDS = [
+    ("gold", "Gold"), ("silver", "Silver"),
+    ("crude", "Crude Oil"), ("copper", "Copper"),
+]
+
+
+def _mentioned_commodities(message):
+    """Commodities the message asks about, in _COMMODITY_KEYWORDS order."""
+    msg_lower = message.lower()
+    return tuple(c for keyword, c in _COMMODITY_KEYWORDS if keyword in msg_lower)
+
+
 def handle_sector_advice(message, session):
-    conn = get_connection()
-    try:
+    with pooled_connection() as conn:
         person_id = session["active_person_id"]
         today = date.today().isoformat()
 
@@ -625,17 +533,9 @@ def handle_sector_advice(message, session):
 
         planet = maha["planet"]
 
-        sectors = conn.execute(
-            "SELECT sector, affinity FROM ref_planet_sector "
-            "WHERE planet = ?",
-            (planet,),
-        ).fetchall()
-
-        commodities = conn.execute(
-            "SELECT commodity, affinity FROM ref_planet_commodity "
-            "WHERE planet = ?",
-            (planet,),
-        ).fetchall()
+        ref = get_reference_data(conn)
+        sectors = ref.planet_sectors.get(planet, ())
+        commodities = ref.planet_commodities.get(planet, ())
 
         lines = [
             f"Sector/commodity guidance (based on {planet} Mahadasha):",
@@ -659,51 +559,43 @@ def handle_sector_advice(message, session):
             )
 
         # Did user ask about a specific commodity?
-        msg_lower = message.lower()
-        specific = [
-            ("gold", "Gold"), ("silver", "Silver"),
-            ("crude", "Crude Oil"), ("copper", "Copper"),
-        ]
-        for keyword, commodity in specific:
-            if keyword in msg_lower:
-                row = conn.execute(
-                    "SELECT * FROM ref_planet_commodity WHERE commodity = ?",
-                    (commodity,),
-                ).fetchone()
-                if row:
-                    lines.append("")
-                    lines.append(
-                        f"{commodity}: Ruled by {row['planet']} "
-                        f"({row['affinity']})"
-                    )
+        for commodity in _mentioned_commodities(message):
+            row = ref.commodities.get(commodity)
+            if row:
+                lines.append("")
+                lines.append(
+                    f"{commodity}: Ruled by {row['planet']} "
+                    f"({row['affinity']})"
+                )
 
         return "\n".join(lines)
-    finally:
-        conn.close()
 
 
 # ═════════════════════════════════════════════════════════════════════════════
 # PLANET INFO
 # ═════════════════════════════════════════════════════════════════════════════
 
-def handle_planet_info(message, session):
-    planet_name = None
+def _extract_planet(message):
+    """First planet named in the message, or None."""
+    msg_lower = message.lower()
     for p in [
         "Sun", "Moon", "Mars", "Mercury",
         "Jupiter", "Venus", "Saturn", "Rahu", "Ketu",
     ]:
-        if p.lower() in message.lower():
-            planet_name = p
-            break
+        if p.lower() in msg_lower:
+            return p
+    return None
+
+
+def handle_planet_info(message, session):
+    planet_name = _extract_planet(message)
 
     if not planet_name:
         return "Which planet? Say 'tell me about Saturn' or 'what is Rahu'."
 
-    conn = get_connection()
-    try:
-        ref = conn.execute(
-            "SELECT * FROM ref_planet WHERE name = ?", (planet_name,)
-        ).fetchone()
+    with pooled_connection() as conn:
+        ref_data = get_reference_data(conn)
+        ref = ref_data.planets.get(planet_name)
 
         lines = [f"About {planet_name}:", ""]
 
@@ -716,9 +608,7 @@ def handle_planet_info(message, session):
             lines.append(f"Dig bala house:   {ref['dig_bala_house']}")
 
         # Dignity info
-        dignities = conn.execute(
-            "SELECT * FROM ref_dignity WHERE planet = ?", (planet_name,)
-        ).fetchall()
+        dignities = ref_data.dignities.get(planet_name, ())
         if dignities:
             lines.append("")
             for d in dignities:
@@ -728,11 +618,7 @@ def handle_planet_info(message, session):
                 )
 
         # Relationships
-        rels = conn.execute(
-            "SELECT other_planet, relationship "
-            "FROM ref_natural_relationship WHERE planet = ?",
-            (planet_name,),
-        ).fetchall()
+        rels = ref_data.relationships.get(planet_name, ())
         if rels:
             friends = [r["other_planet"] for r in rels if r["relationship"] == "Friend"]
             enemies = [r["other_planet"] for r in rels if r["relationship"] == "Enemy"]
@@ -762,14 +648,15 @@ def handle_planet_info(message, session):
             lines.append(f"In {name or 'your'}'s chart: {placement}")
 
         return "\n".join(lines)
-    finally:
-        conn.close()
 
 
 # ═════════════════════════════════════════════════════════════════════════════
 # SWITCH PERSON
 # ═════════════════════════════════════════════════════════════════════════════
 
+SWITCH_LIST_LIMIT = 20
+
+
 def handle_switch_person(message, session):
     msg_lower = message.lower()
 
@@ -787,18 +674,19 @@ def handle_switch_person(message, session):
     # Check for bare ID
     id_match = re.search(r"\b(\d+)\b", message)
 
-    conn = get_connection()
-    try:
-        row = None
+    with pooled_connection() as conn:
+        row, candidates = None, []
         if name_match:
             clean = re.sub(
                 r"\b(person|chart|kundali|profile)\b", "", name_match
             ).strip()
             if clean:
-                row = conn.execute(
-                    "SELECT * FROM person WHERE LOWER(name) LIKE ?",
-                    (f"%{clean}%",),
-                ).fetchone()
+                candidates = search_persons(conn, clean)
+                match = best_match(candidates)
+                if match:
+                    row = conn.execute(
+                        "SELECT * FROM person WHERE id = ?", (match["id"],)
+                    ).fetchone()
         if not row and id_match:
             row = conn.execute(
                 "SELECT * FROM person WHERE id = ?",
@@ -813,40 +701,166 @@ def handle_switch_person(message, session):
                 "All queries will now use this chart."
             )
 
-        # Not found — show list
+        # Several equally good matches — let the user pick
+        if candidates:
+            lines = ["Which one did you mean?"]
+            for c in candidates:
+                lines.append(f"  {c['id']}: {c['name']}")
+            lines.append("\nSay 'switch to [ID]' to pick one.")
+            return "\n".join(lines)
+
+        # Not found — show the first few charts
         rows = conn.execute(
-            "SELECT id, name FROM person ORDER BY id"
+            "SELECT id, name FROM person ORDER BY id LIMIT ?", (SWITCH_LIST_LIMIT,)
         ).fetchall()
         lines = ["Couldn't find that person. Available charts:"]
         for r in rows:
             lines.append(f"  {r['id']}: {r['name']}")
+        if len(rows) == SWITCH_LIST_LIMIT:
+            lines.append("  ... ('list people' shows everyone)")
         lines.append("\nSay 'switch to [name]' or 'switch to [ID]'.")
         return "\n".join(lines)
-    finally:
-        conn.close()
 
 
 # ═════════════════════════════════════════════════════════════════════════════
-# COMPARE  (placeholder)
+# COMPARE
 # ═════════════════════════════════════════════════════════════════════════════
 
+_COMPARE_BETWEEN = re.compile(r"between\s+(.+?)\s+and\s+(.+?)\s*[?.!]*$")
+_COMPARE_WITH = re.compile(r"\b(?:with|and|to|vs\.?|versus)\s+(.+?)\s*[?.!]*$")
+_COMPARE_LEAD = re.compile(
+    r"^.*?\b(?:compare|compatibility|compatible|match(?:ing)?)\b(?:\s+(?:of|for|is|are|am|i))*\s*"
+)
+_TOP_MATCHES = re.compile(r"\b(?:best|top|good|find|who)\b.*\bmatch")
+_SELF_WORDS = ("me", "my", "mine", "myself", "my chart")
+
+
+def _resolve_compare_person(conn, text, session):
+    """Person row for a name, an ID or 'me' in a compare message."""
+    from kundali_engine.chart.render import find_person
+
+    text = re.sub(r"(?:'s)?\s+(?:chart|kundali|horoscope)$", "", text.strip()).strip()
+    if text in _SELF_WORDS:
+        return find_person(conn, session["active_person_id"])
+    if text.isdigit():
+        return find_person(conn, int(text))
+    return find_person(conn, name=text) if text else None
+
+
 def handle_compare(message, session):
-    return (
-        "Chart comparison is coming soon!\n"
-        "For now, 'switch to [name]' and view charts individually."
-    )
+    from kundali_engine.engine.compatibility import KOOTAS, KOOTA_POINTS, MAX_GUNAS, get_compatibility_index
+
+    msg_lower = message.lower().strip()
+    with pooled_connection() as conn:
+        index = get_compatibility_index(conn)
+
+        if _TOP_MATCHES.search(msg_lower):
+            person_id = session["active_person_id"]
+            name = _get_active_person_name(session) or f"Person {person_id}"
+            k = re.search(r"\b(\d{1,2})\b", msg_lower)
+            try:
+                matches = index.top_k(person_id, min(int(k.group(1)) if k else 5, 20))
+            except KeyError:
+                return f"No chart data for {name} yet."
+            if not matches:
+                return f"No compatible charts found for {name} (is the Moon computed?)."
+            lines = [f"Best matches for {name} (Ashtakoota gunas + chart overlay):", ""]
+            for i, m in enumerate(matches, 1):
+                lines.append(
+                    f"  {i}. {m['name'] or 'Person ' + str(m['person_id'])} (ID {m['person_id']}): "
+                    f"{m['gunas']:.1f}/{MAX_GUNAS} gunas, overlay {m['overlay']:+.1f} — {m['verdict']}"
+                )
+            lines.append("\nSay 'compare me with [name]' for the koota-by-koota breakdown.")
+            return "\n".join(lines)
+
+        m = _COMPARE_BETWEEN.search(msg_lower)
+        if m:
+            first = _resolve_compare_person(conn, m.group(1), session)
+            other_text = m.group(2)
+        else:
+            m = _COMPARE_WITH.search(msg_lower)
+            other_text = m.group(1) if m else ""
+            # "compare P2 and P3": the text before the connector names the
+            # first person; nothing there (or "me") means the active person
+            first_text = _COMPARE_LEAD.sub("", msg_lower[:m.start()] if m else "").strip()
+            if first_text and first_text not in _SELF_WORDS:
+                first = _resolve_compare_person(conn, first_text, session)
+                if not first:
+                    return (
+                        f"Couldn't find {first_text.title()}. Who should I compare? "
+                        "Try 'compare Nitin with Priyanka' or 'list people'."
+                    )
+            else:
+                first = _resolve_compare_person(conn, "me", session)
+        if not other_text:
+            return (
+                "Who should I compare? Try 'compare me with Priyanka', "
+                "'compatibility between Nitin and Priyanka' or 'best matches for me'."
+            )
+        other = _resolve_compare_person(conn, other_text, session)
+        if not first or not other:
+            return (
+                f"Couldn't find {other_text.title() if first else 'the first person'}. "
+                "Use 'list people' to see stored charts."
+            )
+        if first["id"] == other["id"]:
+            return "That's the same chart — pick someone else to compare with."
+
+        try:
+            r = index.compare(first["id"], other["id"])
+        except (KeyError, ValueError):
+            return "Both charts need computed planets (including the Moon) to compare."
+
+    a, b = first["name"], other["name"]
+    lines = [
+        f"Compatibility: {a} x {b}",
+        f"Moons: {r['moon_a']['sign']} ({r['moon_a']['nakshatra']} pada {r['moon_a']['pada']})"
+        f" x {r['moon_b']['sign']} ({r['moon_b']['nakshatra']} pada {r['moon_b']['pada']})",
+        "",
+        f"{'Koota':<14} {'Points':>9}",
+        "-" * 26,
+    ]
+    for koota in KOOTAS:
+        lines.append(f"{koota.replace('_', ' ').title():<14} {r['kootas'][koota]:>5.1f} / {KOOTA_POINTS[koota]}")
+    lines.append("-" * 26)
+    lines.append(f"{'Total':<14} {r['gunas']:>5.1f} / {MAX_GUNAS}  — {r['verdict']}")
+    if r["doshas"]:
+        lines.append(f"Doshas: {', '.join(d.title() for d in r['doshas'])} (0 points)")
+
+    lines.append("")
+    lines.append(f"Chart overlay: {r['overlay']:+.1f} (combined score {r['total']:.1f})")
+    for pa, aspect, pb, tone in r["aspects"]:
+        lines.append(f"  {'+' if tone > 0 else '-'} {a}'s {pa} {aspect} {b}'s {pb}")
+    return "\n".join(lines)
 
 
 # ═════════════════════════════════════════════════════════════════════════════
 # INTERNAL HELPERS
 # ═════════════════════════════════════════════════════════════════════════════
 
+def _show_chart_cache_args(message, session):
+    if _extract_person_name(message):
+        return None          # lookups by name go through the chart cache only
+    return (session.get("format") or "text",)
+
+
+# Intents whose response depends only on the active person, the date, the
+# data versions and these normalized arguments (agent/response_cache.py);
+# None from a normalizer means "don't cache this message"
+CACHE_ARGS = {
+    "show_chart":     _show_chart_cache_args,
+    "planet_info":    lambda message, session: (_extract_planet(message),),
+    "sector_advice":  lambda message, session: _mentioned_commodities(message),
+    "dasha_info":     lambda message, session: (),
+    "today_guidance": lambda message, session: (),
+}
+
+
 def _get_active_person_name(session):
     """Lazy-load active person name from DB."""
     if session["active_person_name"]:
         return session["active_person_name"]
-    conn = get_connection()
-    try:
+    with pooled_connection() as conn:
         row = conn.execute(
             "SELECT name FROM person WHERE id = ?",
             (session["active_person_id"],),
@@ -854,8 +868,6 @@ def _get_active_person_name(session):
         if row:
             session["active_person_name"] = row["name"]
             return row["name"]
-    finally:
-        conn.close()
     return None
 
 
@@ -1008,9 +1020,10 @@ def handle_interpret(message, session):
         else:
             response = interpreter.interpret(message)
 
-        # Log the event
+        # Log the event; the session keeps it as the target for 'rate'
         themes = interpreter._detect_themes(message)
-        event_store.log_event(
+        session["last_variants"] = interpreter.variants_used or None
+        session["last_event_id"] = event_store.log_event(
             session_id=session["session_id"],
             person_id=person_id,
             question=message,
@@ -1031,6 +1044,25 @@ def handle_interpret(message, session):
 # RATE  (user feedback for RL variant selection)
 # ═════════════════════════════════════════════════════════════════════════════
 
+def _record_rating(session, rating, feedback_text):
+    """Rate the session's last event; False if it has none."""
+    # The session carries its last event id; session_state has it after a restart
+    event_id = session.get("last_event_id")
+    if event_id is not None:
+        try:
+            event_store.log_feedback(event_id, rating, feedback_text,
+                                     variants=session.get("last_variants"))
+            return True
+        except ValueError:
+            pass        # a queued id from before a restart
+    recovered = event_store.get_last_event_id(session["session_id"])
+    if not recovered or recovered == event_id:
+        return False
+    session["last_event_id"], session["last_variants"] = recovered, None
+    event_store.log_feedback(recovered, rating, feedback_text)
+    return True
+
+
 def handle_rate(message, session):
     """Record user rating for the last response."""
     # Extract rating number
@@ -1047,16 +1079,13 @@ def handle_rate(message, session):
     else:
         rating = int(m.group(1))
 
-    last_event_id = event_store.get_last_event_id(session["session_id"])
-    if not last_event_id:
-        return "Nothing to rate yet. Ask me a question first!"
-
     # Extract optional text feedback
     feedback_text = re.sub(
         r"\b(?:rate|rating|stars?|thumbs|[1-5])\b", "", message, flags=re.IGNORECASE
     ).strip() or None
 
-    event_store.log_feedback(last_event_id, rating, feedback_text)
+    if not _record_rating(session, rating, feedback_text):
+        return "Nothing to rate yet. Ask me a question first!"
 
     stars = "*" * rating + "." * (5 - rating)
     return f"Thanks! Recorded your rating: [{stars}] ({rating}/5)\nThis helps me give better readings."
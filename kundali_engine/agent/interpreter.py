@@ -3,37 +3,59 @@ Chart Interpretation Engine — Vedic Life Coach.
 
 Pure rule-based interpretation: no LLM. Maps life themes through a
 person's natal chart and generates personalized coaching text.
-Multiple text variants per rule; RL (epsilon-greedy) selects the best
-variant based on accumulated user feedback.
+Multiple text variants per rule; a multi-armed bandit (epsilon-greedy by
+default) selects the best variant based on accumulated user feedback.
 """
-import json
-import random
-import re
 from datetime import date
 
-from kundali_engine.core.database.connection import get_connection
-from kundali_engine.agent import event_store
+from kundali_engine.core.database.connection import get_pool
+from kundali_engine.core.database.reference import get_reference_data
+from kundali_engine.agent.bandit import DEFAULT_VARIANTS, get_bandit
+from kundali_engine.agent.themes import get_theme_detector
 
 
 class ChartInterpreter:
     """Reads a person's chart and produces personalized interpretations."""
 
-    EPSILON = 0.20  # exploration rate for variant selection
-
-    def __init__(self, person_id):
+    def __init__(self, person_id, chart=None):
+        """`chart` (chart.render.Chart) supplies person and planets already loaded."""
         self.person_id = person_id
-        self.conn = get_connection()
+        # Pooled, and held until close(): helpers that check out a connection
+        # on this thread (event_store) reuse it instead of opening another.
+        self._pool = get_pool()
+        self.conn = self._pool.acquire()
+        try:
+            self._load(person_id, chart)
+        except BaseException:
+            self.close()
+            raise
 
-        # Load person
-        self.person = self.conn.execute(
-            "SELECT * FROM person WHERE id = ?", (person_id,)
-        ).fetchone()
+        # Track which variants we select (for event logging)
+        self.variants_used = []
+        self._themes = None          # (question, themes) of the last detection
+
+    def close(self):
+        if self.conn is not None:
+            self._pool.release(self.conn)
+            self.conn = None
+
+    def _load(self, person_id, chart=None):
+        self.ref = get_reference_data(self.conn)
 
-        # Load natal planets (dict keyed by planet name)
-        rows = self.conn.execute(
-            "SELECT * FROM natal_planet WHERE person_id = ?", (person_id,)
-        ).fetchall()
-        self.planets = {r["planet"]: dict(r) for r in rows}
+        if chart is not None:
+            self.person = chart.person
+            self.planets = chart.by_planet
+        else:
+            # Load person
+            self.person = self.conn.execute(
+                "SELECT * FROM person WHERE id = ?", (person_id,)
+            ).fetchone()
+
+            # Load natal planets (dict keyed by planet name)
+            rows = self.conn.execute(
+                "SELECT * FROM natal_planet WHERE person_id = ?", (person_id,)
+            ).fetchall()
+            self.planets = {r["planet"]: dict(r) for r in rows}
 
         # Load current dasha
         today = date.today().isoformat()
@@ -51,12 +73,6 @@ class ChartInterpreter:
                 (person_id, self.maha["id"], today, today),
             ).fetchone()
 
-        # Track which variants we select (for event logging)
-        self.variants_used = []
-
-    def close(self):
-        self.conn.close()
-
     # ── Main entry points ─────────────────────────────────────────────────
 
     def interpret(self, question):
@@ -126,10 +142,7 @@ class ChartInterpreter:
         crowded = [(h, ps) for h, ps in house_counts.items() if len(ps) >= 3]
         if crowded:
             for h, ps in crowded:
-                house_info = self.conn.execute(
-                    "SELECT english_name, core_domain FROM ref_house WHERE house_number = ?",
-                    (h,)
-                ).fetchone()
+                house_info = self.ref.houses.get(h)
                 domain = house_info["core_domain"] if house_info else f"House {h}"
                 sections.append(
                     f"ENERGY CONCENTRATION\n"
@@ -157,9 +170,7 @@ class ChartInterpreter:
 
         # Lagna personality
         if lagna:
-            lagna_info = self.conn.execute(
-                "SELECT * FROM ref_sign WHERE name = ?", (lagna,)
-            ).fetchone()
+            lagna_info = self.ref.signs.get(lagna)
             if lagna_info:
                 sections.append(
                     f"PERSONALITY FOUNDATION ({lagna} Rising)\n"
@@ -243,9 +254,7 @@ class ChartInterpreter:
         # 1. Personality snapshot: Lagna element/ruler, Moon emotional nature, Sun identity
         lagna = self.person["lagna_sign"]
         if lagna:
-            lagna_info = self.conn.execute(
-                "SELECT * FROM ref_sign WHERE name = ?", (lagna,)
-            ).fetchone()
+            lagna_info = self.ref.signs.get(lagna)
             if lagna_info:
                 element_trait = {
                     "Fire": "initiative, courage, and directness",
@@ -298,15 +307,9 @@ class ChartInterpreter:
         if rahu:
             rh = rahu["house"]
             vid = self._pick_variant("Rahu", rh, "rahu_ketu")
-            axis = self.conn.execute(
-                "SELECT * FROM ref_rahu_ketu_axis WHERE rahu_house = ? AND variant_id = ?",
-                (rh, vid),
-            ).fetchone()
+            axis = self.ref.rahu_ketu_axis.get((rh, vid))
             if not axis:
-                axis = self.conn.execute(
-                    "SELECT * FROM ref_rahu_ketu_axis WHERE rahu_house = ? AND variant_id = 1",
-                    (rh,),
-                ).fetchone()
+                axis = self.ref.rahu_ketu_axis.get((rh, 1))
             if axis:
                 ketu = self.planets.get("Ketu")
                 kh = ketu["house"] if ketu else "?"
@@ -342,104 +345,22 @@ class ChartInterpreter:
 
     def _detect_themes(self, question):
         """Match question keywords against ref_life_theme rows."""
-        q_lower = question.lower()
-        rows = self.conn.execute(
-            "SELECT theme, display_name FROM ref_life_theme"
-        ).fetchall()
-
-        # Build keyword map from theme names and display names
-        matches = []
-        for row in rows:
-            theme = row["theme"]
-            display = row["display_name"].lower()
-
-            # Check theme key (underscores -> spaces too)
-            theme_words = theme.replace("_", " ").split()
-            display_words = display.split()
-
-            score = 0
-            for w in theme_words + display_words:
-                if len(w) > 2 and w in q_lower:
-                    score += 1
-
-            if score > 0:
-                matches.append((score, theme))
-
-        # Also check specific keyword mappings for natural language
-        keyword_map = {
-            "job": "career", "work": "career", "promotion": "career",
-            "fired": "job_loss", "layoff": "job_loss", "laid off": "job_loss",
-            "ai": "technology_ai", "automation": "technology_ai", "tech": "technology_ai",
-            "love": "relationships", "partner": "relationships", "dating": "relationships",
-            "wife": "marriage", "husband": "marriage", "married": "marriage", "marry": "marriage",
-            "sick": "health", "disease": "health", "doctor": "health", "body": "health",
-            "anxiety": "mental_health", "stress": "mental_health", "depress": "mental_health",
-            "worry": "mental_health", "peace": "mental_health",
-            "money": "wealth", "rich": "wealth", "earn": "wealth", "income": "wealth",
-            "invest": "investment", "stock": "finance_markets", "mutual fund": "investment",
-            "gold": "commodities_gold", "silver": "commodities_silver",
-            "crude": "commodities_crude", "oil": "commodities_crude",
-            "house": "real_estate", "flat": "real_estate", "property": "real_estate",
-            "land": "real_estate", "apartment": "real_estate",
-            "meditat": "spirituality", "spiritual": "spirituality", "dharma": "spirituality",
-            "god": "spirituality", "pray": "spirituality", "soul": "spirituality",
-            "child": "children", "son": "children", "daughter": "children", "kid": "children",
-            "study": "education", "learn": "education", "exam": "education", "degree": "education",
-            "travel": "foreign_travel", "abroad": "foreign_travel", "visa": "foreign_travel",
-            "strength": "strengths", "strong": "strengths", "talent": "strengths",
-            "weakness": "weaknesses", "flaw": "weaknesses", "blind spot": "weaknesses",
-            "personality": "personality", "trait": "personality", "character": "personality",
-            "who am i": "personality", "what am i": "personality",
-            "purpose": "life_purpose", "why am i": "life_purpose", "meaning": "life_purpose",
-            "karma": "karma", "past life": "karma",
-            "universe": "karma",  # "what is the universe telling me"
-            "courage": "courage", "confidence": "courage", "fear": "courage",
-            "enemy": "enemies", "rival": "enemies", "competition": "enemies",
-            "reputation": "reputation", "respect": "reputation", "image": "reputation",
-            "business": "business", "startup": "business", "entrepreneur": "business",
-            "leader": "leadership", "manage": "leadership",
-            "debt": "debt", "loan": "debt", "emi": "debt",
-            "father": "family", "mother": "family", "parent": "family",
-            "sibling": "family", "brother": "family", "sister": "family",
-            "transform": "transformation", "change": "transformation",
-            "crisis": "transformation",
-            "emotion": "emotional_nature", "feeling": "emotional_nature",
-            "vehicle": "vehicle", "bike": "vehicle",
-            "court": "legal", "lawsuit": "legal", "legal": "legal",
-            "inheritance": "inheritance", "ancestral": "inheritance",
-            "workplace": "career",
-            "prepare": "career",  # "how should I prepare"
-        }
-
-        for keyword, theme in keyword_map.items():
-            # Use word boundary check to avoid "car" matching "career" etc.
-            if re.search(r'\b' + re.escape(keyword), q_lower) and not any(t == theme for _, t in matches):
-                matches.append((1, theme))
-
-        # Sort by score, deduplicate
-        matches.sort(key=lambda x: -x[0])
-        seen = set()
-        result = []
-        for _, theme in matches:
-            if theme not in seen:
-                seen.add(theme)
-                result.append(theme)
-
-        return result
+        # Memoized: handle_interpret asks again for the same question when logging
+        if self._themes is None or self._themes[0] != question:
+            self._themes = (question, get_theme_detector(self.ref).detect(question))
+        return list(self._themes[1])
 
     # ── Theme interpretation ──────────────────────────────────────────────
 
     def _interpret_theme(self, theme):
         """For a theme, find relevant planets/houses, read chart, assemble text."""
-        theme_row = self.conn.execute(
-            "SELECT * FROM ref_life_theme WHERE theme = ?", (theme,)
-        ).fetchone()
+        theme_row = self.ref.life_themes.get(theme)
         if not theme_row:
             return None
 
         display_name = theme_row["display_name"]
-        relevant_planets = json.loads(theme_row["relevant_planets"])
-        relevant_houses = json.loads(theme_row["relevant_houses"])
+        relevant_planets = theme_row["relevant_planets"]
+        relevant_houses = theme_row["relevant_houses"]
 
         lines = [f"{display_name.upper()}"]
         interpretations = []
@@ -493,17 +414,11 @@ class ChartInterpreter:
         rahu_house = rahu["house"]
         variant_id = self._pick_variant("Rahu", rahu_house, "rahu_ketu")
 
-        axis = self.conn.execute(
-            "SELECT * FROM ref_rahu_ketu_axis WHERE rahu_house = ? AND variant_id = ?",
-            (rahu_house, variant_id),
-        ).fetchone()
+        axis = self.ref.rahu_ketu_axis.get((rahu_house, variant_id))
 
         if not axis:
             # Fallback to variant 1
-            axis = self.conn.execute(
-                "SELECT * FROM ref_rahu_ketu_axis WHERE rahu_house = ? AND variant_id = 1",
-                (rahu_house,),
-            ).fetchone()
+            axis = self.ref.rahu_ketu_axis.get((rahu_house, 1))
             variant_id = 1
 
         if not axis:
@@ -544,12 +459,9 @@ class ChartInterpreter:
         # Check if dasha planet is relevant to any detected themes
         if themes:
             for theme in themes[:2]:
-                theme_row = self.conn.execute(
-                    "SELECT relevant_planets FROM ref_life_theme WHERE theme = ?",
-                    (theme,)
-                ).fetchone()
+                theme_row = self.ref.life_themes.get(theme)
                 if theme_row:
-                    relevant = json.loads(theme_row["relevant_planets"])
+                    relevant = theme_row["relevant_planets"]
                     if maha_planet in relevant:
                         lines.append(
                             f"  Your {maha_planet} mahadasha directly activates "
@@ -589,20 +501,11 @@ class ChartInterpreter:
 
     def _pick_variant(self, planet, key, key_type="house"):
         """
-        RL: select best variant based on past feedback scores.
-        Epsilon-greedy: 20% exploration, 80% exploitation.
+        RL: select a variant with the in-process bandit (agent/bandit.py),
+        among the variants that have text for this planet and key.
         """
-        scores = event_store.get_variant_scores(planet, key, key_type)
-
-        if not scores:
-            return random.choice([1, 2, 3])  # no feedback yet — rotate randomly
-
-        if random.random() < self.EPSILON:
-            # Explore: random variant
-            return random.choice(list(scores.keys()))
-
-        # Exploit: best-rated variant
-        return max(scores, key=scores.get)
+        candidates = self.ref.variant_ids(key_type, planet, key) or DEFAULT_VARIANTS
+        return get_bandit().choose(planet, key_type, key, candidates)
 
     # ── DB lookups with variant selection ─────────────────────────────────
 
@@ -610,19 +513,11 @@ class ChartInterpreter:
         """Look up planet-house meaning, selecting best variant."""
         variant_id = self._pick_variant(planet, house, "house")
 
-        row = self.conn.execute(
-            "SELECT * FROM ref_planet_house_meaning "
-            "WHERE planet = ? AND house = ? AND variant_id = ?",
-            (planet, house, variant_id),
-        ).fetchone()
+        row = self.ref.planet_house_meaning.get((planet, house, variant_id))
 
         if not row:
             # Fallback to variant 1
-            row = self.conn.execute(
-                "SELECT * FROM ref_planet_house_meaning "
-                "WHERE planet = ? AND house = ? AND variant_id = 1",
-                (planet, house),
-            ).fetchone()
+            row = self.ref.planet_house_meaning.get((planet, house, 1))
             variant_id = 1
 
         if row:
@@ -637,18 +532,10 @@ class ChartInterpreter:
         """Look up planet-theme meaning, selecting best variant."""
         variant_id = self._pick_variant(planet, theme, "theme")
 
-        row = self.conn.execute(
-            "SELECT * FROM ref_planet_theme_meaning "
-            "WHERE planet = ? AND theme = ? AND variant_id = ?",
-            (planet, theme, variant_id),
-        ).fetchone()
+        row = self.ref.planet_theme_meaning.get((planet, theme, variant_id))
 
         if not row:
-            row = self.conn.execute(
-                "SELECT * FROM ref_planet_theme_meaning "
-                "WHERE planet = ? AND theme = ? AND variant_id = 1",
-                (planet, theme),
-            ).fetchone()
+            row = self.ref.planet_theme_meaning.get((planet, theme, 1))
             variant_id = 1
 
         if row:
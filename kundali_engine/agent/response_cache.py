@@ -0,0 +1,127 @@
+"""
+Whole-response cache for deterministic agent intents.
+
+show_chart, planet_info, sector_advice, dasha_info and today_guidance
+produce the same text for a person on a given day until that person's
+data or the reference tables change. Their responses are memoized under
+
+    (intent, person_id, date, normalized args, data versions)
+
+where the data versions are the person's 'chart', 'dasha' and
+'guidance' counters from data_version (bumped by triggers on person,
+natal_planet and dasha, and by daily_batch.write_chunk), the global
+'transit' counter (bumped by TransitTable.store) and the reference data
+version. One indexed read of data_version decides a hit, so a guidance
+answer given before the day's transits were stored is not served after
+they are. The agent's chart creation also calls invalidate_person() to
+drop stale entries right away.
+
+Entries for earlier days are dropped when the date changes. metrics()
+reports hits, misses and hit rate overall and per intent.
+"""
+import threading
+from collections import OrderedDict
+from datetime import date
+
+from kundali_engine.core.database.connection import pooled_connection
+from kundali_engine.core.database.reference import get_reference_data
+
+DEFAULT_MAX_RESPONSES = 10_000
+
+
+def read_data_versions(conn, person_id):
+    """
+    (chart, dasha, guidance, transit) versions for a person; 0 when never
+    written. transit is global (stored under person_id 0).
+    """
+    return tuple(conn.execute(
+        """SELECT COALESCE(MAX(CASE kind WHEN 'chart' THEN version END), 0),
+                  COALESCE(MAX(CASE kind WHEN 'dasha' THEN version END), 0),
+                  COALESCE(MAX(CASE kind WHEN 'guidance' THEN version END), 0),
+                  COALESCE(MAX(CASE WHEN person_id = 0 AND kind = 'transit' THEN version END), 0)
+           FROM data_version WHERE person_id IN (?, 0)""",
+        (person_id,),
+    ).fetchone())
+
+
+class ResponseCache:
+    """LRU of response strings with per-intent hit/miss counters."""
+
+    def __init__(self, max_size=DEFAULT_MAX_RESPONSES):
+        self.max_size = max_size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._day = None
+        self._counts = {}            # intent → [hits, misses]
+        self.evictions = 0
+
+    def respond(self, intent, person_id, args, compute):
+        """Cached response for the key, else compute() and cache it."""
+        today = date.today().isoformat()
+        with pooled_connection() as conn:
+            versions = read_data_versions(conn, person_id)
+            ref_version = get_reference_data(conn).version
+        key = (intent, person_id, today, args, versions, ref_version)
+
+        with self._lock:
+            if self._day != today:
+                self._data.clear()           # yesterday's guidance never hits again
+                self._day = today
+            counts = self._counts.setdefault(intent, [0, 0])
+            response = self._data.get(key)
+            if response is not None:
+                self._data.move_to_end(key)
+                counts[0] += 1
+                return response
+            counts[1] += 1
+
+        # A concurrent write makes the versions read above stale; the entry
+        # is then stored under a key no later request builds
+        response = compute()
+        with self._lock:
+            self._data[key] = response
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+        return response
+
+    def invalidate_person(self, person_id):
+        """Drop every cached response for a person; returns how many."""
+        with self._lock:
+            stale = [k for k in self._data if k[1] == person_id]
+            for k in stale:
+                del self._data[k]
+        return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def metrics(self):
+        with self._lock:
+            hits = sum(h for h, _ in self._counts.values())
+            misses = sum(m for _, m in self._counts.values())
+            return {
+                "size": len(self._data),
+                "max_size": self.max_size,
+                "hits": hits,
+                "misses": misses,
+                "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+                "evictions": self.evictions,
+                "intents": {
+                    intent: {"hits": h, "misses": m, "hit_rate": h / (h + m) if h + m else 0.0}
+                    for intent, (h, m) in sorted(self._counts.items())
+                },
+            }
+
+
+_cache = ResponseCache()
+
+
+def get_response_cache():
+    return _cache
+
+
+def invalidate_person(person_id):
+    """Drop a person's cached responses (call after writing their chart or dashas)."""
+    return _cache.invalidate_person(person_id)
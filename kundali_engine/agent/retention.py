@@ -0,0 +1,252 @@
+"""
+Retention for the agent event log.
+
+Events older than --days are:
+
+  1. rolled into event_daily_rollup (per day and intent: event, session,
+     person and rating counts), once per day
+  2. written, as raw rows, to a compressed NDJSON segment file
+     (zstd when the `zstandard` package is installed, gzip otherwise)
+  3. deleted from event_log in small batches, one short transaction each
+
+Events that have feedback stay in event_log so ratings keep pointing at
+queryable rows. Freed pages are returned with PRAGMA incremental_vacuum
+in steps (databases created by init_db use auto_vacuum=INCREMENTAL; run
+once with --enable-auto-vacuum to convert an older file — that one
+VACUUM does take an exclusive lock).
+
+Run:
+  python -m kundali_engine.agent.retention --days 90
+  python -m kundali_engine.agent.retention --days 30 --archive-dir /data/events --dry-run
+
+Segments are named event_log-<first day>_<last day>-<first id>.ndjson.zst
+(or .ndjson.gz); read them back with iter_segment().
+"""
+import argparse
+import gzip
+import json
+import os
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+from kundali_engine.core.database import connection
+from kundali_engine.core.database.connection import get_connection
+
+try:
+    import zstandard
+except ImportError:          # optional: fall back to gzip segments
+    zstandard = None
+
+DEFAULT_DAYS = 90
+BATCH_SIZE = 2000            # rows per delete transaction
+VACUUM_PAGES = 1000          # pages per incremental_vacuum step
+
+
+def default_archive_dir():
+    return Path(connection.DB_PATH).parent / "archive" / "event_log"
+
+
+# ── Rollup ────────────────────────────────────────────────────────────────
+
+def rollup_events(conn, cutoff):
+    """Aggregate every not-yet-rolled day before `cutoff` (YYYY-MM-DD). Returns rows written."""
+    cur = conn.execute(
+        """INSERT INTO event_daily_rollup
+               (day, detected_intent, events, sessions, persons,
+                rated_events, ratings, sum_rating)
+           SELECT date(el.timestamp), COALESCE(el.detected_intent, 'unknown'),
+                  COUNT(*), COUNT(DISTINCT el.session_id), COUNT(DISTINCT el.person_id),
+                  COUNT(f.event_id), COALESCE(SUM(f.n), 0), COALESCE(SUM(f.total), 0)
+           FROM event_log el
+           LEFT JOIN (SELECT event_id, COUNT(rating) AS n, SUM(rating) AS total
+                      FROM event_feedback GROUP BY event_id) f ON f.event_id = el.id
+           WHERE el.timestamp < ?
+             AND date(el.timestamp) NOT IN (SELECT DISTINCT day FROM event_daily_rollup)
+           GROUP BY 1, 2""",
+        (cutoff,),
+    )
+    conn.commit()
+    return cur.rowcount
+
+
+# ── Segments ──────────────────────────────────────────────────────────────
+
+def _segment_suffix():
+    return ".ndjson.zst" if zstandard is not None else ".ndjson.gz"
+
+
+def _open_segment(path):
+    raw = open(path, "wb")
+    if zstandard is not None:
+        return raw, zstandard.ZstdCompressor(level=10).stream_writer(raw, closefd=False)
+    return raw, gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=6)
+
+
+def iter_segment(path):
+    """Yield the event dicts stored in one segment file."""
+    path = Path(path)
+    if path.name.endswith(".zst"):
+        if zstandard is None:
+            raise RuntimeError(f"{path.name} needs the 'zstandard' package")
+        with open(path, "rb") as f, zstandard.ZstdDecompressor().stream_reader(f) as reader:
+            buffer = b""
+            for chunk in iter(lambda: reader.read(1 << 16), b""):
+                buffer += chunk
+                *lines, buffer = buffer.split(b"\n")
+                for line in lines:
+                    if line:
+                        yield json.loads(line)
+            if buffer.strip():
+                yield json.loads(buffer)
+    else:
+        with gzip.open(path, "rb") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def archive_events(conn, cutoff, archive_dir):
+    """
+    Write events before `cutoff` that have no feedback to a new segment.
+    Returns (segment path or None, [archived ids]). The file is complete
+    and fsynced before this returns; nothing is deleted here.
+    """
+    rows = conn.execute(
+        """SELECT * FROM event_log el
+           WHERE el.timestamp < ?
+             AND NOT EXISTS (SELECT 1 FROM event_feedback ef WHERE ef.event_id = el.id)
+           ORDER BY el.id""",
+        (cutoff,),
+    )
+    archive_dir = Path(archive_dir)
+    archive_dir.mkdir(parents=True, exist_ok=True)
+    tmp = archive_dir / f".segment-{os.getpid()}.tmp"
+
+    ids, first_day, last_day = [], None, None
+    raw, writer = _open_segment(tmp)
+    try:
+        for row in rows:
+            event = dict(row)
+            ids.append(event["id"])
+            day = event["timestamp"][:10]
+            first_day = min(first_day or day, day)
+            last_day = max(last_day or day, day)
+            writer.write(json.dumps(event, ensure_ascii=False).encode("utf-8") + b"\n")
+        writer.close()
+        raw.flush()
+        os.fsync(raw.fileno())
+    finally:
+        raw.close()
+
+    if not ids:
+        tmp.unlink()
+        return None, []
+    path = archive_dir / f"event_log-{first_day}_{last_day}-{ids[0]}{_segment_suffix()}"
+    os.replace(tmp, path)
+    return path, ids
+
+
+# ── Deletion and space reclaim ────────────────────────────────────────────
+
+def delete_events(conn, ids, batch_size=BATCH_SIZE):
+    """Delete event_log rows by id, committing every batch_size rows."""
+    for start in range(0, len(ids), batch_size):
+        # Re-check feedback: an event rated after it was archived stays
+        conn.executemany(
+            """DELETE FROM event_log WHERE id = ?1
+               AND NOT EXISTS (SELECT 1 FROM event_feedback WHERE event_id = ?1)""",
+            [(i,) for i in ids[start:start + batch_size]],
+        )
+        conn.commit()
+        time.sleep(0)        # let waiting writers take the lock between batches
+
+
+def reclaim_space(conn, pages=VACUUM_PAGES, max_steps=None):
+    """Free-list pages returned to the OS in incremental steps. Returns pages freed."""
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:     # 2 = INCREMENTAL
+        return 0
+    freed, steps = 0, 0
+    while max_steps is None or steps < max_steps:
+        free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        if not free:
+            break
+        # executescript steps the pragma to completion (execute() frees one page)
+        conn.executescript(f"PRAGMA incremental_vacuum({int(pages)});")
+        freed += free - conn.execute("PRAGMA freelist_count").fetchone()[0]
+        steps += 1
+        time.sleep(0)
+    return freed
+
+
+def enable_auto_vacuum(conn):
+    """Switch an existing database to auto_vacuum=INCREMENTAL (runs a full VACUUM)."""
+    conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    conn.execute("VACUUM")
+
+
+# ── Driver ────────────────────────────────────────────────────────────────
+
+def run_retention(days=DEFAULT_DAYS, archive_dir=None, batch_size=BATCH_SIZE,
+                  vacuum_pages=VACUUM_PAGES, dry_run=False, conn=None):
+    """Roll up, archive and delete events older than `days`. Returns a summary dict."""
+    cutoff = (date.today() - timedelta(days=days)).isoformat()
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
+    try:
+        if dry_run:
+            total, keep = conn.execute(
+                """SELECT COUNT(*), COUNT(ef.event_id) FROM event_log el
+                   LEFT JOIN (SELECT DISTINCT event_id FROM event_feedback) ef
+                          ON ef.event_id = el.id
+                   WHERE el.timestamp < ?""",
+                (cutoff,),
+            ).fetchone()
+            return {"cutoff": cutoff, "eligible": total, "kept_for_feedback": keep,
+                    "archived": 0, "segment": None, "rollup_rows": 0, "pages_freed": 0}
+
+        rollup_rows = rollup_events(conn, cutoff)
+        segment, ids = archive_events(conn, cutoff, archive_dir or default_archive_dir())
+        delete_events(conn, ids, batch_size)
+        # Rating pointers of sessions idle since before the cutoff
+        conn.execute("DELETE FROM session_state WHERE updated_at < CAST(strftime('%s', ?) AS REAL)", (cutoff,))
+        conn.commit()
+        freed = reclaim_space(conn, vacuum_pages)
+        return {"cutoff": cutoff, "archived": len(ids), "segment": str(segment) if segment else None,
+                "rollup_rows": rollup_rows, "pages_freed": freed}
+    finally:
+        if own_conn:
+            conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Event log retention")
+    parser.add_argument("--days", type=int, default=DEFAULT_DAYS, help="keep raw events this many days")
+    parser.add_argument("--archive-dir", type=Path, help="segment directory")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--vacuum-pages", type=int, default=VACUUM_PAGES)
+    parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument("--enable-auto-vacuum", action="store_true",
+                        help="convert the database to auto_vacuum=INCREMENTAL first (full VACUUM)")
+    args = parser.parse_args()
+
+    if args.enable_auto_vacuum:
+        conn = get_connection()
+        try:
+            enable_auto_vacuum(conn)
+        finally:
+            conn.close()
+
+    r = run_retention(args.days, args.archive_dir, args.batch_size, args.vacuum_pages, args.dry_run)
+    if args.dry_run:
+        print(f"Events before {r['cutoff']}: {r['eligible']} "
+              f"({r['kept_for_feedback']} kept for feedback)")
+        return
+    print(f"Events before {r['cutoff']}: {r['archived']} archived"
+          + (f" to {r['segment']}" if r["segment"] else ""))
+    print(f"  rollup rows written: {r['rollup_rows']}, pages freed: {r['pages_freed']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+"""
+Session storage for AstroAgent.
+
+A store maps session_id → session dict (see agent._make_session). Two
+backends:
+
+  MemorySessionStore  in-process LRU with idle TTL; bounded memory for
+                      long-running workers (WhatsApp, web).
+  SQLiteSessionStore  sessions serialized to the agent_session table so
+                      they survive restarts and can be shared by workers.
+
+Both expose the same small interface (get / put / delete / len) plus
+metrics() with size, hits, misses, evictions and expirations.
+"""
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from kundali_engine.core.database.connection import pooled_connection
+
+DEFAULT_MAX_SESSIONS = 10_000
+DEFAULT_TTL = 24 * 3600          # seconds of inactivity before a session expires
+
+
+class SessionStore:
+    """Interface for session backends."""
+
+    def get(self, session_id):
+        """Session dict, or None if unknown or expired."""
+        raise NotImplementedError
+
+    def put(self, session_id, session):
+        raise NotImplementedError
+
+    def delete(self, session_id):
+        raise NotImplementedError
+
+    def __len__(self):
+        raise NotImplementedError
+
+    def metrics(self):
+        raise NotImplementedError
+
+
+class _Counters:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def as_dict(self, size, max_size, ttl):
+        lookups = self.hits + self.misses
+        return {
+            "size": size,
+            "max_size": max_size,
+            "ttl": ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+# ── In-process LRU + TTL ──────────────────────────────────────────────────
+
+class MemorySessionStore(SessionStore):
+    """
+    Sessions in an OrderedDict kept in least-recently-used order.
+
+    get() refreshes a session's position and idle timer; put() evicts the
+    least recently used sessions once max_size is exceeded. Expired
+    sessions are dropped lazily on access and in bulk by purge_expired().
+    """
+
+    def __init__(self, max_size=DEFAULT_MAX_SESSIONS, ttl=DEFAULT_TTL, clock=time.monotonic):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._clock = clock
+        self._data = OrderedDict()        # session_id → (session, last_access)
+        self._lock = threading.Lock()
+        self._counters = _Counters()
+
+    def get(self, session_id):
+        now = self._clock()
+        with self._lock:
+            entry = self._data.get(session_id)
+            if entry is None:
+                self._counters.misses += 1
+                return None
+            session, last_access = entry
+            if self.ttl and now - last_access > self.ttl:
+                del self._data[session_id]
+                self._counters.expirations += 1
+                self._counters.misses += 1
+                return None
+            self._data[session_id] = (session, now)
+            self._data.move_to_end(session_id)
+            self._counters.hits += 1
+            return session
+
+    def put(self, session_id, session):
+        now = self._clock()
+        with self._lock:
+            self._data[session_id] = (session, now)
+            self._data.move_to_end(session_id)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self._counters.evictions += 1
+
+    def delete(self, session_id):
+        with self._lock:
+            self._data.pop(session_id, None)
+
+    def purge_expired(self):
+        """Drop every expired session; returns how many were removed."""
+        if not self.ttl:
+            return 0
+        cutoff = self._clock() - self.ttl
+        removed = 0
+        with self._lock:
+            # Oldest first: stop at the first session still alive
+            while self._data:
+                session_id, (_, last_access) = next(iter(self._data.items()))
+                if last_access >= cutoff:
+                    break
+                del self._data[session_id]
+                removed += 1
+            self._counters.expirations += removed
+        return removed
+
+    def __len__(self):
+        return len(self._data)
+
+    def metrics(self):
+        with self._lock:
+            return self._counters.as_dict(len(self._data), self.max_size, self.ttl)
+
+
+# ── SQLite-backed ─────────────────────────────────────────────────────────
+
+class SQLiteSessionStore(SessionStore):
+    """
+    Sessions stored as JSON in agent_session.
+
+    Expired rows are removed lazily on get() and in bulk every
+    `purge_every` writes, when the oldest rows beyond max_size are also
+    evicted.
+    """
+
+    def __init__(self, max_size=DEFAULT_MAX_SESSIONS, ttl=DEFAULT_TTL, purge_every=500):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.purge_every = purge_every
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._counters = _Counters()
+
+    def get(self, session_id):
+        with pooled_connection() as conn:
+            row = conn.execute(
+                "SELECT data, updated_at FROM agent_session WHERE session_id = ?",
+                (session_id,),
+            ).fetchone()
+            if row is None:
+                self._count("misses")
+                return None
+            if self.ttl and time.time() - row["updated_at"] > self.ttl:
+                conn.execute("DELETE FROM agent_session WHERE session_id = ?", (session_id,))
+                conn.commit()
+                self._count("expirations", "misses")
+                return None
+            self._count("hits")
+            return json.loads(row["data"])
+
+    def put(self, session_id, session):
+        with pooled_connection() as conn:
+            conn.execute(
+                """INSERT INTO agent_session (session_id, data, updated_at)
+                   VALUES (?, ?, ?)
+                   ON CONFLICT(session_id) DO UPDATE SET
+                       data = excluded.data, updated_at = excluded.updated_at""",
+                (session_id, json.dumps(session, default=str), time.time()),
+            )
+            conn.commit()
+
+        with self._lock:
+            self._writes += 1
+            due = self._writes % self.purge_every == 0
+        if due:
+            self.purge_expired()
+
+    def delete(self, session_id):
+        with pooled_connection() as conn:
+            conn.execute("DELETE FROM agent_session WHERE session_id = ?", (session_id,))
+            conn.commit()
+
+    def purge_expired(self):
+        """Delete expired rows and evict the oldest beyond max_size."""
+        with pooled_connection() as conn:
+            expired = 0
+            if self.ttl:
+                expired = conn.execute(
+                    "DELETE FROM agent_session WHERE updated_at < ?",
+                    (time.time() - self.ttl,),
+                ).rowcount
+            evicted = conn.execute(
+                """DELETE FROM agent_session WHERE session_id IN (
+                       SELECT session_id FROM agent_session
+                       ORDER BY updated_at DESC LIMIT -1 OFFSET ?)""",
+                (self.max_size,),
+            ).rowcount
+            conn.commit()
+        with self._lock:
+            self._counters.expirations += expired
+            self._counters.evictions += evicted
+        return expired + evicted
+
+    def _count(self, *names):
+        with self._lock:
+            for name in names:
+                setattr(self._counters, name, getattr(self._counters, name) + 1)
+
+    def __len__(self):
+        with pooled_connection() as conn:
+            return conn.execute("SELECT COUNT(*) FROM agent_session").fetchone()[0]
+
+    def metrics(self):
+        size = len(self)
+        with self._lock:
+            return self._counters.as_dict(size, self.max_size, self.ttl)
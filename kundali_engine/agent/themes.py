@@ -0,0 +1,169 @@
+"""
+Life-theme detection for interpretation questions.
+
+A ThemeDetector is built once from the ref_life_theme rows plus
+KEYWORD_THEMES and scores a question in two regex scans:
+
+  theme words    every word (len > 2) of a theme key or display name,
+                 matched as a substring anywhere in the question; a theme
+                 scores one point per matching word
+  keywords       natural-language cues matched at a word start ("car"
+                 must not match inside "scar"); each adds its theme with
+                 score 1 unless the theme already matched
+
+Both vocabularies are compiled into one trie-shaped regex each, run as a
+zero-width lookahead at every position so overlapping words are found.
+At a given position the regex reports the longest word; shorter words
+that are substrings (theme words) or prefixes (keywords) of it are added
+from tables precomputed at build time.
+
+Results match the original per-keyword loop: themes ordered by score,
+ties in ref_life_theme order followed by keyword order.
+"""
+import re
+
+KEYWORD_THEMES = {
+    "job": "career", "work": "career", "promotion": "career",
+    "fired": "job_loss", "layoff": "job_loss", "laid off": "job_loss",
+    "ai": "technology_ai", "automation": "technology_ai", "tech": "technology_ai",
+    "love": "relationships", "partner": "relationships", "dating": "relationships",
+    "wife": "marriage", "husband": "marriage", "married": "marriage", "marry": "marriage",
+    "sick": "health", "disease": "health", "doctor": "health", "body": "health",
+    "anxiety": "mental_health", "stress": "mental_health", "depress": "mental_health",
+    "worry": "mental_health", "peace": "mental_health",
+    "money": "wealth", "rich": "wealth", "earn": "wealth", "income": "wealth",
+    "invest": "investment", "stock": "finance_markets", "mutual fund": "investment",
+    "gold": "commodities_gold", "silver": "commodities_silver",
+    "crude": "commodities_crude", "oil": "commodities_crude",
+    "house": "real_estate", "flat": "real_estate", "property": "real_estate",
+    "land": "real_estate", "apartment": "real_estate",
+    "meditat": "spirituality", "spiritual": "spirituality", "dharma": "spirituality",
+    "god": "spirituality", "pray": "spirituality", "soul": "spirituality",
+    "child": "children", "son": "children", "daughter": "children", "kid": "children",
+    "study": "education", "learn": "education", "exam": "education", "degree": "education",
+    "travel": "foreign_travel", "abroad": "foreign_travel", "visa": "foreign_travel",
+    "strength": "strengths", "strong": "strengths", "talent": "strengths",
+    "weakness": "weaknesses", "flaw": "weaknesses", "blind spot": "weaknesses",
+    "personality": "personality", "trait": "personality", "character": "personality",
+    "who am i": "personality", "what am i": "personality",
+    "purpose": "life_purpose", "why am i": "life_purpose", "meaning": "life_purpose",
+    "karma": "karma", "past life": "karma",
+    "universe": "karma",  # "what is the universe telling me"
+    "courage": "courage", "confidence": "courage", "fear": "courage",
+    "enemy": "enemies", "rival": "enemies", "competition": "enemies",
+    "reputation": "reputation", "respect": "reputation", "image": "reputation",
+    "business": "business", "startup": "business", "entrepreneur": "business",
+    "leader": "leadership", "manage": "leadership",
+    "debt": "debt", "loan": "debt", "emi": "debt",
+    "father": "family", "mother": "family", "parent": "family",
+    "sibling": "family", "brother": "family", "sister": "family",
+    "transform": "transformation", "change": "transformation",
+    "crisis": "transformation",
+    "emotion": "emotional_nature", "feeling": "emotional_nature",
+    "vehicle": "vehicle", "bike": "vehicle",
+    "court": "legal", "lawsuit": "legal", "legal": "legal",
+    "inheritance": "inheritance", "ancestral": "inheritance",
+    "workplace": "career",
+    "prepare": "career",  # "how should I prepare"
+}
+
+
+def trie_regex(words):
+    """
+    Regex source matching any of `words`, factored as a prefix trie
+    ("car", "care", "career" → "car(?:e(?:er)?)?"), so each position is
+    tested character by character rather than word by word.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node):
+        end = "" in node
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if end:
+            # Greedy optional: the longest word wins at each position
+            return f"(?:{body})?"
+        return body
+
+    return build(trie)
+
+
+class ThemeDetector:
+    """Scores questions against life themes; build once, call detect() per question."""
+
+    def __init__(self, life_themes, keyword_map=KEYWORD_THEMES):
+        # life_themes: rows with "theme" and "display_name", in ref_life_theme order
+        self.themes = [r["theme"] for r in life_themes]
+
+        # word → [(theme index, occurrences)]; a word can repeat across the
+        # key and the display name and then scores once per occurrence
+        weights = {}
+        for i, row in enumerate(life_themes):
+            words = row["theme"].replace("_", " ").split() + row["display_name"].lower().split()
+            for w in words:
+                if len(w) > 2:
+                    counts = weights.setdefault(w, {})
+                    counts[i] = counts.get(i, 0) + 1
+        self._word_weights = {w: tuple(c.items()) for w, c in weights.items()}
+        vocab = list(weights)
+        self._word_re = re.compile(f"(?=({trie_regex(vocab)}))") if vocab else None
+        # Words contained in each word: found whenever the longer one is
+        self._word_closure = {w: tuple(v for v in vocab if v in w) for w in vocab}
+
+        self.keywords = list(keyword_map.items())
+        self._keyword_order = {kw: n for n, (kw, _) in enumerate(self.keywords)}
+        kws = [kw for kw, _ in self.keywords]
+        self._keyword_re = re.compile(rf"\b(?=({trie_regex(kws)}))") if kws else None
+        # Keywords that are prefixes of each keyword: match at the same word start
+        self._keyword_closure = {k: tuple(v for v in kws if k.startswith(v)) for k in kws}
+
+    def scored(self, question):
+        """[(score, theme)] for every matching theme, best first."""
+        q = question.lower()
+
+        found = set()
+        if self._word_re is not None:
+            for m in self._word_re.finditer(q):
+                found.update(self._word_closure[m.group(1)])
+        scores = [0] * len(self.themes)
+        for w in found:
+            for i, n in self._word_weights[w]:
+                scores[i] += n
+        matches = [(s, self.themes[i]) for i, s in enumerate(scores) if s > 0]
+
+        if self._keyword_re is not None:
+            hits = set()
+            for m in self._keyword_re.finditer(q):
+                hits.update(self._keyword_closure[m.group(1)])
+            seen = {t for _, t in matches}
+            for n in sorted(self._keyword_order[kw] for kw in hits):
+                theme = self.keywords[n][1]
+                if theme not in seen:
+                    seen.add(theme)
+                    matches.append((1, theme))
+
+        matches.sort(key=lambda x: -x[0])
+        return matches
+
+    def detect(self, question):
+        """Matching themes, best first."""
+        return [theme for _, theme in self.scored(question)]
+
+
+_detector = None          # (ReferenceData, ThemeDetector)
+
+
+def get_theme_detector(ref):
+    """Detector for the given ReferenceData, rebuilt when the reference data is reloaded."""
+    global _detector
+    cached = _detector
+    if cached is None or cached[0] is not ref:
+        cached = _detector = (ref, ThemeDetector(list(ref.life_themes.values())))
+    return cached[1]
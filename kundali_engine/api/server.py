@@ -0,0 +1,356 @@
+"""
+HTTP API for the AstroLogic agent (stdlib asyncio, no framework).
+
+Run:
+  python -m kundali_engine.api.server --port 8080
+  python -m kundali_engine.api.server --port 8080 --workers 4
+
+Endpoints (all JSON):
+  POST /agent           {"message": "...", "session_id": "..."} → {"response": "..."}
+                        optional "format": text/whatsapp/json/html sets the
+                        session's chart format
+  GET  /chart/{id}      person + natal planets
+  GET  /dasha/{id}      active maha/antar/pratyantar and the maha sequence
+                        (?date=YYYY-MM-DD, default today)
+  GET  /regime/{id}     trading regime, served from astro_regime_snapshot
+                        (?date=YYYY-MM-DD, default today)
+  GET  /health         status plus response/chart cache metrics
+
+HTTP/1.1 with keep-alive; responses are gzip-compressed when the client
+sends Accept-Encoding: gzip. Blocking DB/ephemeris work runs on a
+bounded thread pool drawing on the shared SQLite connection pool.
+
+With --workers N the parent imports the handlers, loads the ephemeris
+and binds the socket once, then forks N workers that accept on the
+shared socket. Workers keep agent sessions in SQLite (agent_session) so
+a conversation can land on any worker.
+
+On SIGTERM or SIGINT every worker stops accepting, writes its queued
+events and buffered rating increments, and exits.
+"""
+import argparse
+import asyncio
+import gzip
+import json
+import os
+import re
+import signal
+import socket
+import sys
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
+from datetime import date
+from urllib.parse import urlsplit, parse_qs
+
+from kundali_engine.agent.agent import AstroAgent
+from kundali_engine.agent.response_cache import get_response_cache
+from kundali_engine.agent.session_store import MemorySessionStore, SQLiteSessionStore
+from kundali_engine.chart.render import FORMATS, get_chart_cache
+from kundali_engine.core.database.connection import configure_pool, pooled_connection
+
+KEEPALIVE_TIMEOUT = 15        # seconds an idle keep-alive connection is held
+MAX_HEADER_LINES = 100
+MAX_BODY = 64 * 1024
+GZIP_MIN_BYTES = 512
+
+STATUS_TEXT = {
+    200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+    411: "Length Required", 413: "Payload Too Large", 500: "Internal Server Error",
+}
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+# ── Data endpoints ──────────────────────────────────────────────────────────
+
+def _day(query):
+    value = query.get("date", [None])[0]
+    if value is None:
+        return date.today().isoformat()
+    try:
+        return date.fromisoformat(value).isoformat()
+    except ValueError:
+        raise HttpError(400, f"Bad date {value!r}, expected YYYY-MM-DD")
+
+
+def chart_payload(conn, person_id, query):
+    person = conn.execute("SELECT * FROM person WHERE id = ?", (person_id,)).fetchone()
+    if not person:
+        raise HttpError(404, f"No person with id {person_id}")
+    planets = conn.execute(
+        "SELECT * FROM natal_planet WHERE person_id = ? ORDER BY sidereal_longitude",
+        (person_id,),
+    ).fetchall()
+    return {"person": dict(person), "planets": [dict(p) for p in planets]}
+
+
+def dasha_payload(conn, person_id, query):
+    day = _day(query)
+    current = conn.execute(
+        "SELECT level, planet, start_date, end_date FROM dasha "
+        "WHERE person_id = ? AND start_date <= ? AND end_date >= ?",
+        (person_id, day, day),
+    ).fetchall()
+    maha = conn.execute(
+        "SELECT planet, start_date, end_date FROM dasha "
+        "WHERE person_id = ? AND level = 'maha' ORDER BY start_date",
+        (person_id,),
+    ).fetchall()
+    if not maha:
+        raise HttpError(404, f"No dasha data for person {person_id}")
+    return {
+        "person_id": person_id,
+        "date": day,
+        "current": {r["level"]: {"planet": r["planet"], "start": r["start_date"],
+                                 "end": r["end_date"]} for r in current},
+        "maha": [dict(r) for r in maha],
+    }
+
+
+def regime_payload(conn, person_id, query):
+    from kundali_engine.engine.astro_regime import get_astro_regime
+
+    day = _day(query)
+    try:
+        regime = get_astro_regime(person_id, day, conn)
+    except ValueError as e:
+        raise HttpError(404, str(e))
+    return {"person_id": person_id, "date": day, **asdict(regime)}
+
+
+ROUTES = [
+    ("GET", re.compile(r"^/chart/(\d+)$"), chart_payload),
+    ("GET", re.compile(r"^/dasha/(\d+)$"), dasha_payload),
+    ("GET", re.compile(r"^/regime/(\d+)$"), regime_payload),
+]
+
+
+# ── Server ──────────────────────────────────────────────────────────────────
+
+class ApiServer:
+    """Request dispatch and connection handling for one worker process."""
+
+    def __init__(self, agent=None, max_workers=8):
+        self.agent = agent or AstroAgent(max_workers=max_workers)
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="astro-api")
+
+    def _query(self, fn, person_id, query):
+        with pooled_connection() as conn:
+            return fn(conn, person_id, query)
+
+    async def dispatch(self, method, path, query, body):
+        if path == "/health":
+            return {"status": "ok", "pid": os.getpid(),
+                    "response_cache": get_response_cache().metrics(),
+                    "chart_cache": get_chart_cache().metrics()}
+
+        if path == "/agent":
+            if method != "POST":
+                raise HttpError(405, "Use POST /agent")
+            try:
+                data = json.loads(body or b"{}")
+            except ValueError:
+                raise HttpError(400, "Body must be JSON")
+            message = data.get("message")
+            if not isinstance(message, str):
+                raise HttpError(400, "'message' is required")
+            fmt = data.get("format")
+            if fmt is not None and fmt not in FORMATS:
+                raise HttpError(400, f"'format' must be one of {', '.join(FORMATS)}")
+            session_id = str(data.get("session_id") or "http")
+            response = await self.agent.handle_async(message, session_id, fmt)
+            return {"session_id": session_id, "response": response}
+
+        for route_method, pattern, fn in ROUTES:
+            m = pattern.match(path)
+            if m:
+                if method != route_method:
+                    raise HttpError(405, f"Use {route_method} {path}")
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(self.pool, self._query, fn, int(m.group(1)), query)
+
+        raise HttpError(404, f"No route for {path}")
+
+    async def handle_client(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(_read_request(reader), KEEPALIVE_TIMEOUT)
+                except HttpError as e:
+                    writer.write(_response(e.status, {"error": e.message}, False, False))
+                    break
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+                    break
+                if request is None:
+                    break
+
+                method, target, headers, body, keep_alive = request
+                url = urlsplit(target)
+                try:
+                    status, payload = 200, await self.dispatch(
+                        method, url.path, parse_qs(url.query), body)
+                except HttpError as e:
+                    status, payload = e.status, {"error": e.message}
+                except Exception:
+                    # Details go to the server log, not to the client
+                    print(f"api: {method} {url.path} failed", file=sys.stderr)
+                    traceback.print_exc()
+                    status, payload = 500, {"error": "Internal server error"}
+
+                gzip_ok = "gzip" in headers.get("accept-encoding", "")
+                writer.write(_response(status, payload, keep_alive, gzip_ok))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        finally:
+            writer.close()
+
+    def close(self):
+        self.agent.close()
+        self.pool.shutdown(wait=True)
+
+
+async def _read_request(reader):
+    """Parse one HTTP/1.x request; None when the client closed the connection."""
+    line = await reader.readline()
+    if not line:
+        return None
+    try:
+        method, target, version = line.decode("latin-1").split()
+    except ValueError:
+        raise HttpError(400, "Malformed request line")
+
+    headers = {}
+    for _ in range(MAX_HEADER_LINES):
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    else:
+        raise HttpError(400, "Too many headers")
+
+    body = b""
+    if "transfer-encoding" in headers:
+        raise HttpError(411, "Chunked request bodies are not supported")
+    try:
+        length = int(headers.get("content-length") or 0)
+    except ValueError:
+        length = -1
+    if length < 0:
+        raise HttpError(400, "Bad Content-Length")
+    if length > MAX_BODY:
+        raise HttpError(413, "Request body too large")
+    if length:
+        body = await reader.readexactly(length)
+
+    connection = headers.get("connection", "").lower()
+    if version == "HTTP/1.0":
+        keep_alive = connection == "keep-alive"
+    else:
+        keep_alive = connection != "close"
+    return method.upper(), target, headers, body, keep_alive
+
+
+def _response(status, payload, keep_alive, gzip_ok):
+    body = json.dumps(payload, default=str).encode("utf-8")
+    headers = [
+        f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}",
+        "Content-Type: application/json; charset=utf-8",
+        "Vary: Accept-Encoding",
+    ]
+    if gzip_ok and len(body) >= GZIP_MIN_BYTES:
+        body = gzip.compress(body, compresslevel=5)
+        headers.append("Content-Encoding: gzip")
+    headers.append(f"Content-Length: {len(body)}")
+    if keep_alive:
+        headers.append(f"Keep-Alive: timeout={KEEPALIVE_TIMEOUT}")
+    headers.append("Connection: " + ("keep-alive" if keep_alive else "close"))
+    return ("\r\n".join(headers) + "\r\n\r\n").encode("latin-1") + body
+
+
+# ── Process model ───────────────────────────────────────────────────────────
+
+def warm():
+    """Import-time work done once in the parent before forking."""
+    from kundali_engine.agent import handlers, interpreter  # noqa: F401
+    from kundali_engine.engine import astro_regime  # noqa: F401
+    try:
+        from kundali_engine.create_kundali import _get_ephemeris
+        _get_ephemeris()
+    except Exception as e:
+        print(f"Ephemeris not preloaded ({e}); chart creation will load it on demand")
+
+
+async def _run_worker(sock, session_store, max_workers):
+    # Agent threads and data-endpoint threads each hold at most one connection
+    configure_pool(size=2 * max_workers)
+    app = ApiServer(AstroAgent(session_store, max_workers=max_workers), max_workers)
+    server = await asyncio.start_server(app.handle_client, sock=sock, backlog=1024)
+    # SIGTERM (from the parent) and SIGINT (Ctrl-C reaches the whole
+    # process group) stop accepting and return normally, so queued
+    # events and rating increments are written before the process exits
+    stopped = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stopped.set)
+    try:
+        async with server:
+            await stopped.wait()
+    finally:
+        app.close()
+
+
+def serve(host="127.0.0.1", port=8080, workers=1, max_workers=8):
+    warm()
+    sock = socket.create_server((host, port), backlog=1024)
+    print(f"AstroLogic API on http://{host}:{port} ({workers} worker(s))")
+
+    if workers <= 1 or not hasattr(os, "fork"):
+        asyncio.run(_run_worker(sock, MemorySessionStore(), max_workers))
+        return
+
+    children = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            status = 1
+            try:
+                asyncio.run(_run_worker(sock, SQLiteSessionStore(), max_workers))
+                status = 0
+            finally:
+                # Only after app.close() has flushed; skips the parent's atexit hooks
+                os._exit(status)
+        children.append(pid)
+
+    def stop(signum, frame):
+        for child in children:
+            try:
+                os.kill(child, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for child in children:
+        os.waitpid(child, 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AstroLogic HTTP API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=1, help="worker processes (forked)")
+    parser.add_argument("--threads", type=int, default=8, help="blocking-work threads per worker")
+    args = parser.parse_args()
+    serve(args.host, args.port, args.workers, args.threads)
+
+
+if __name__ == "__main__":
+    main()
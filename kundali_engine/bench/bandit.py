@@ -0,0 +1,57 @@
+"""
+Micro-benchmark: interpretation variant selection.
+
+Compares a variant_stats point lookup per selection (what
+ChartInterpreter._pick_variant did before the bandit) with
+VariantBandit.choose for each strategy, over every (planet, key_type,
+key) that has text variants.
+
+Run:  python -m kundali_engine.bench.bandit [--repeat R]
+"""
+import argparse
+import random
+import time
+
+from kundali_engine.agent.bandit import STRATEGIES, VariantBandit
+from kundali_engine.agent.event_store import get_variant_scores
+from kundali_engine.core.database.reference import get_reference_data
+
+
+def db_pick(planet, key_type, key, candidates):
+    scores = get_variant_scores(planet, key, key_type)
+    if not scores:
+        return random.choice(candidates)
+    if random.random() < 0.2:
+        return random.choice(list(scores))
+    return max(scores, key=scores.get)
+
+
+def _time(fn, keys, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for (key_type, planet, key), candidates in keys:
+            fn(planet, key_type, key, candidates)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    keys = list(get_reference_data().variants.items())
+    n = len(keys)
+    baseline = _time(db_pick, keys, args.repeat)
+    print(f"{n} variant keys, best of {args.repeat}")
+    print(f"  variant_stats lookup : {baseline / n * 1e6:8.2f} µs/selection")
+    for strategy in STRATEGIES:
+        bandit = VariantBandit(strategy).load()
+        elapsed = _time(bandit.choose, keys, args.repeat)
+        print(f"  {strategy:<20} : {elapsed / n * 1e6:8.2f} µs/selection  "
+              f"({baseline / elapsed:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Micro-benchmark: compatibility matching against a large population.
+
+Scores one person against N synthetic profiles (random sidereal
+longitudes) two ways: CompatibilityIndex.compare() per candidate, as a
+loop over pairs would, and CompatibilityIndex.top_k() (one 108 x 108
+table gather plus the vectorized overlay, then argpartition). Also times
+an N x M cohort score matrix.
+
+Run:  python -m kundali_engine.bench.compatibility [--profiles N] [--k K] [--repeat R]
+
+The pair loop is timed on the first --pair-sample candidates and
+extrapolated. The top-k results must match a full sort of scores().
+"""
+import argparse
+import time
+
+import numpy as np
+
+from kundali_engine.engine.compatibility import CompatibilityIndex
+
+
+def _best(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--profiles", type=int, default=50_000)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--cohort", type=int, default=1000, help="rows of the N x M cohort run")
+    parser.add_argument("--pair-sample", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(7)
+    ids = np.arange(1, args.profiles + 1)
+    index = CompatibilityIndex(ids, rng.uniform(0, 360, (args.profiles, 9)))
+    me = int(ids[0])
+
+    sample = ids[1:args.pair_sample + 1]
+    pair_time, _ = _best(lambda: [index.compare(me, int(p)) for p in sample], 1)
+    pair_time *= (args.profiles - 1) / len(sample)
+    topk_time, matches = _best(lambda: index.top_k(me, args.k), args.repeat)
+
+    full = index.scores([me])["total"][0]
+    full[0] = -np.inf
+    expected = np.sort(full)[::-1][:args.k]
+    assert np.allclose([m["total"] for m in matches], expected, atol=0.01)
+
+    cohort = ids[:args.cohort]
+    cohort_time, _ = _best(lambda: index.scores(cohort, ids), 1)
+
+    rows = [
+        ("compare() per pair", f"{pair_time * 1e3:9.1f} ms (extrapolated)"),
+        (f"top_k(k={args.k})", f"{topk_time * 1e3:9.1f} ms  ({pair_time / topk_time:.0f}x)"),
+        (f"scores {args.cohort} x {args.profiles}",
+         f"{cohort_time:9.2f} s   ({args.cohort * args.profiles / cohort_time / 1e6:.1f}M pairs/s)"),
+    ]
+    print(f"{args.profiles} profiles, best of {args.repeat}")
+    for label, value in rows:
+        print(f"  {label:<22} : {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Benchmark: SQLite connection overhead per agent turn.
+
+Replays a set of agent messages twice through AstroAgent.handle:
+
+  unpooled  a fresh connection per checkout, closed on release (the
+            behaviour before connections were pooled)
+  pooled    the process-wide ConnectionPool with DEFAULT_PRAGMAS
+
+and reports time per turn plus connections opened and checkouts per
+turn for each.
+
+Run:  python -m kundali_engine.bench.connection [--repeat R] [--person-id N]
+
+Needs a populated database (at least one person with a chart).
+"""
+import argparse
+import time
+
+from kundali_engine.agent.agent import AstroAgent
+from kundali_engine.core.database import connection
+from kundali_engine.core.database.connection import ConnectionPool
+
+MESSAGES = [
+    "show my chart", "what dasha am I in?", "tell me about Saturn",
+    "what are my strengths?", "tell me about my career", "rate 4",
+    "who all do you have?", "how's today?",
+]
+
+
+class UnpooledConnections(ConnectionPool):
+    """Opens a new connection on every checkout and closes it on release."""
+
+    def __init__(self):
+        super().__init__(pragmas={"foreign_keys": "ON"})
+
+    def acquire(self):
+        self.stats["checkouts"] += 1
+        self.stats["created"] += 1
+        return self._open()
+
+    def release(self, conn):
+        conn.close()
+
+
+def _install(pool):
+    with connection._pool_lock:
+        old, connection._pool = connection._pool, pool
+    if old is not None:
+        old.close()
+    return pool
+
+
+def run(pool, person_id, repeat):
+    _install(pool)
+    agent = AstroAgent()
+    session = agent._get_session("bench")
+    session["active_person_id"] = person_id
+
+    for message in MESSAGES:            # warm-up: imports, page cache, pool
+        agent.handle(message, "bench")
+    before = dict(pool.stats)
+
+    turns = 0
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for message in MESSAGES:
+            agent.handle(message, "bench")
+            turns += 1
+    elapsed = time.perf_counter() - start
+    agent.close()
+
+    return {
+        "turns": turns,
+        "us_per_turn": elapsed / turns * 1e6,
+        "opened_per_turn": (pool.stats["created"] - before["created"]) / turns,
+        "checkouts_per_turn": (pool.stats["checkouts"] - before["checkouts"]) / turns,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Connection overhead per agent turn")
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--person-id", type=int, default=1)
+    args = parser.parse_args()
+
+    results = {
+        "unpooled": run(UnpooledConnections(), args.person_id, args.repeat),
+        "pooled": run(ConnectionPool(), args.person_id, args.repeat),
+    }
+    print(f"{len(MESSAGES)} messages x {args.repeat}")
+    for name, r in results.items():
+        print(f"  {name:9s} {r['us_per_turn']:9.1f} µs/turn   "
+              f"{r['opened_per_turn']:5.2f} opened/turn   "
+              f"{r['checkouts_per_turn']:5.2f} checkouts/turn")
+    saved = results["unpooled"]["us_per_turn"] - results["pooled"]["us_per_turn"]
+    print(f"  saved     {saved:9.1f} µs/turn")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Micro-benchmark: gazetteer lookups over a large synthetic place list.
+
+Writes a GeoNames-format dump of N synthetic places (syllable names,
+random countries, log-normal populations) to a temporary directory,
+builds the memory-mapped index from it, and times exact, prefix and
+one-typo lookups against a linear scan over the same names.
+
+Run:  python -m kundali_engine.bench.gazetteer [--places N] [--queries Q]
+
+Every exact query must find its source place and every typo query must
+find something; the share of typo queries whose intended place is among
+the results is reported (synthetic names have many one-edit neighbours).
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from kundali_engine.agent.gazetteer import Gazetteer, build_index, normalize
+
+SYLLABLES = ("ka", "ra", "pur", "na", "ga", "bad", "li", "vi", "sha", "to",
+             "mo", "dan", "ber", "ston", "ville", "ham", "el", "or", "su", "ki")
+COUNTRIES = ("IN", "US", "GB", "PK", "NP", "DE", "FR", "BR", "CA", "AU")
+
+
+def _write_dump(path, n, rng):
+    names = []
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(n):
+            parts = rng.integers(0, len(SYLLABLES), rng.integers(2, 5))
+            name = "".join(SYLLABLES[p] for p in parts).title()
+            names.append(name)
+            country = COUNTRIES[int(rng.integers(len(COUNTRIES)))]
+            population = int(rng.lognormal(8, 2))
+            cols = [str(i + 1), name, name, "", f"{rng.uniform(-60, 70):.5f}",
+                    f"{rng.uniform(-180, 180):.5f}", "P", "PPL", country, "", "", "", "", "",
+                    str(population), "", "", "Asia/Kolkata", "2024-01-01"]
+            f.write("\t".join(cols) + "\n")
+    return names
+
+
+def _typo(name, rng):
+    i = int(rng.integers(1, len(name) - 1))
+    return name[:i] + ("x" if name[i] != "x" else "y") + name[i + 1:]
+
+
+def _per_lookup(fn, queries):
+    start = time.perf_counter()
+    results = [fn(q) for q in queries]
+    return (time.perf_counter() - start) / len(queries), results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--places", type=int, default=250_000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--scan-queries", type=int, default=50)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(11)
+    with tempfile.TemporaryDirectory() as tmp:
+        dump = Path(tmp) / "places.txt"
+        names = _write_dump(dump, args.places, rng)
+        start = time.perf_counter()
+        build_index(dump, Path(tmp) / "index")
+        build_time = time.perf_counter() - start
+        start = time.perf_counter()
+        gazetteer = Gazetteer(Path(tmp) / "index")
+        load_time = time.perf_counter() - start
+
+        picks = rng.integers(0, len(names), args.queries)
+        exact = [names[i] for i in picks]
+        prefix = [n[:4] for n in exact]
+        typo = [_typo(n, rng) for n in exact]
+
+        exact_time, found = _per_lookup(gazetteer.search, exact)
+        assert all(any(p.name == q for p in r) for q, r in zip(exact, found))
+        prefix_time, _ = _per_lookup(gazetteer.search, prefix)
+        typo_time, found = _per_lookup(gazetteer.search, typo)
+        assert all(found)
+        # A typo can be one edit from a bigger place too; count how often
+        # the intended place is still among the results
+        recall = np.mean([any(p.name == n for p in r) for n, r in zip(exact, found)])
+
+        folded = [normalize(n) for n in names]
+        scan_time, _ = _per_lookup(
+            lambda q: [i for i, n in enumerate(folded) if n.startswith(normalize(q))],
+            prefix[:args.scan_queries],
+        )
+
+    rows = [
+        ("build index", f"{build_time:9.2f} s"),
+        ("load (mmap)", f"{load_time * 1e3:9.2f} ms"),
+        ("exact", f"{exact_time * 1e6:9.1f} us"),
+        ("prefix (4 letters)", f"{prefix_time * 1e6:9.1f} us"),
+        ("one typo", f"{typo_time * 1e6:9.1f} us  (intended place found {recall:.1%})"),
+        ("linear prefix scan", f"{scan_time * 1e6:9.1f} us"),
+    ]
+    print(f"{args.places} places, {args.queries} queries per kind")
+    for label, value in rows:
+        print(f"  {label:<20} : {value}")
+
+
+if __name__ == "__main__":
+    main()
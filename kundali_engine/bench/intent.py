@@ -0,0 +1,95 @@
+"""
+Micro-benchmark: intent detection over real questions.
+
+Compares the original per-call re.search(pattern, msg, IGNORECASE) loop,
+a single combined regex (one lookahead branch per intent, anchored at the
+start), and agent.agent.detect_intent (precompiled, case-sensitive).
+
+Run:  python -m kundali_engine.bench.intent [--limit N] [--repeat R]
+
+Messages come from event_log.raw_question; a small built-in sample is
+used when the log is empty. Both classifiers must agree on every message.
+"""
+import argparse
+import re
+import time
+
+from kundali_engine.agent.agent import INTENT_PATTERNS, detect_intent
+from kundali_engine.core.database.connection import get_connection
+
+SAMPLE = [
+    "hello", "help", "show my chart", "show Priyanka's chart",
+    "create kundali for Ravi born 15 Jun 1990 14:30 Delhi",
+    "who all do you have?", "what dasha am I in?", "how's today?",
+    "should I trade today?", "which sectors are good?", "should I buy gold?",
+    "tell me about Saturn", "switch to Priyanka", "compare me with Priyanka",
+    "rate 4", "5 stars", "what are my strengths?", "how does AI impact me?",
+    "tell me about my career", "what is the universe telling me?",
+    "I feel stressed about money and my job", "asdfgh",
+]
+
+
+def legacy_detect(message):
+    msg_lower = message.lower().strip()
+    for intent, pattern in INTENT_PATTERNS:
+        if re.search(pattern, msg_lower, re.IGNORECASE):
+            return intent
+    return "unknown"
+
+
+_COMBINED = re.compile(
+    "|".join(f"(?=(?s:.*?)(?P<{intent}>{pattern}))" for intent, pattern in INTENT_PATTERNS)
+)
+
+
+def combined_detect(message):
+    m = _COMBINED.match(message.lower().strip())
+    return m.lastgroup if m else "unknown"
+
+
+def load_messages(limit=None):
+    conn = get_connection()
+    try:
+        sql = "SELECT raw_question FROM event_log"
+        rows = conn.execute(sql + (f" LIMIT {int(limit)}" if limit else "")).fetchall()
+    except Exception:
+        rows = []
+    finally:
+        conn.close()
+    return [r[0] for r in rows if r[0]] or SAMPLE
+
+
+def _time(fn, messages, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for m in messages:
+            fn(m)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--limit", type=int, help="max messages to read from event_log")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    messages = load_messages(args.limit)
+    mismatches = [m for m in messages
+                  if not legacy_detect(m) == combined_detect(m) == detect_intent(m)]
+    if mismatches:
+        raise SystemExit(f"Classifiers disagree on {len(mismatches)} messages, e.g. {mismatches[0]!r}")
+
+    legacy = _time(legacy_detect, messages, args.repeat)
+    n = len(messages)
+    print(f"{n} messages, best of {args.repeat}")
+    print(f"  re.search loop (original) : {legacy / n * 1e6:8.2f} µs/message")
+    for label, fn in (("combined regex", combined_detect), ("detect_intent", detect_intent)):
+        elapsed = _time(fn, messages, args.repeat)
+        print(f"  {label:<25} : {elapsed / n * 1e6:8.2f} µs/message  "
+              f"({legacy / elapsed:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
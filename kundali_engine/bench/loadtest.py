@@ -0,0 +1,131 @@
+"""
+Load test for the HTTP API (kundali_engine.api.server).
+
+Run:
+  python -m kundali_engine.bench.loadtest --url http://127.0.0.1:8080 \\
+      --path /chart/1 --path /regime/1 --concurrency 32 --duration 10
+  python -m kundali_engine.bench.loadtest --agent "how's today?" --concurrency 16
+
+Each of --concurrency clients holds one keep-alive connection and sends
+requests back to back, cycling through the given paths (GET) and agent
+messages (POST /agent, one session per client). Reports requests per
+second and p50/p90/p99/max latency. A connection the server closes is
+counted under "closed" in the errors and reopened.
+"""
+import argparse
+import asyncio
+import json
+import time
+from urllib.parse import urlsplit
+
+
+async def _request(reader, writer, host, method, path, body=b""):
+    """Send one request and read the response; its status, or None if the connection closed."""
+    head = (
+        f"{method} {path} HTTP/1.1\r\nHost: {host}\r\n"
+        "Accept-Encoding: gzip\r\nConnection: keep-alive\r\n"
+        f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n"
+    )
+    writer.write(head.encode("latin-1") + body)
+    await writer.drain()
+
+    status_line = await reader.readline()
+    if not status_line:
+        return None                      # server closed the connection
+    status = int(status_line.split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+
+async def _client(n, host, port, requests, deadline, latencies, errors):
+    reader, writer = await asyncio.open_connection(host, port)
+    i = n
+    try:
+        while time.perf_counter() < deadline:
+            method, path, body = requests[i % len(requests)]
+            if body is not None:
+                body = json.dumps({**body, "session_id": f"load-{n}"}).encode()
+            start = time.perf_counter()
+            try:
+                status = await _request(reader, writer, host, method, path, body or b"")
+            except (ConnectionError, asyncio.IncompleteReadError):
+                status = None
+            i += 1
+            if status is None:
+                # Counted as an error; carry on over a new connection
+                errors["closed"] = errors.get("closed", 0) + 1
+                writer.close()
+                reader, writer = await asyncio.open_connection(host, port)
+                continue
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                errors[status] = errors.get(status, 0) + 1
+    finally:
+        writer.close()
+
+
+def _percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+async def run(url, paths, messages, concurrency, duration):
+    parts = urlsplit(url)
+    host, port = parts.hostname, parts.port or 80
+    requests = [("GET", p, None) for p in paths]
+    requests += [("POST", "/agent", {"message": m}) for m in messages]
+    if not requests:
+        requests = [("GET", "/health", None)]
+
+    latencies, errors = [], {}
+    started = time.perf_counter()
+    deadline = started + duration
+    await asyncio.gather(*(
+        _client(n, host, port, requests, deadline, latencies, errors)
+        for n in range(concurrency)
+    ))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "seconds": elapsed,
+        "rps": len(latencies) / elapsed,
+        "p50_ms": _percentile(latencies, 0.50) * 1000,
+        "p90_ms": _percentile(latencies, 0.90) * 1000,
+        "p99_ms": _percentile(latencies, 0.99) * 1000,
+        "max_ms": (latencies[-1] if latencies else 0.0) * 1000,
+        "errors": errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the AstroLogic HTTP API")
+    parser.add_argument("--url", default="http://127.0.0.1:8080")
+    parser.add_argument("--path", action="append", default=[], help="GET path (repeatable)")
+    parser.add_argument("--agent", action="append", default=[], help="agent message (repeatable)")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds")
+    args = parser.parse_args()
+
+    r = asyncio.run(run(args.url, args.path, args.agent, args.concurrency, args.duration))
+    print(f"{r['requests']} requests in {r['seconds']:.1f}s "
+          f"with {args.concurrency} connections")
+    print(f"  throughput : {r['rps']:.0f} req/s")
+    print(f"  latency    : p50 {r['p50_ms']:.2f} ms  p90 {r['p90_ms']:.2f} ms  "
+          f"p99 {r['p99_ms']:.2f} ms  max {r['max_ms']:.2f} ms")
+    if r["errors"]:
+        print(f"  non-200    : {r['errors']}")
+
+
+if __name__ == "__main__":
+    main()
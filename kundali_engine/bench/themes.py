@@ -0,0 +1,115 @@
+"""
+Micro-benchmark: life-theme detection over logged questions.
+
+Compares the original ChartInterpreter._detect_themes (ref_life_theme
+query, substring loop, then one re.search per keyword) with
+agent.themes.ThemeDetector (built once, two regex scans per question).
+
+Run:  python -m kundali_engine.bench.themes [--limit N] [--repeat R]
+
+Questions come from event_log.raw_question; a small built-in sample is
+used when the log is empty. Both detectors must return the same themes
+in the same order for every question.
+"""
+import argparse
+import re
+import time
+
+from kundali_engine.agent.themes import KEYWORD_THEMES, ThemeDetector
+from kundali_engine.core.database.connection import get_connection
+
+SAMPLE = [
+    "tell me about my career", "will I get a promotion this year?",
+    "I was laid off last week, what now?", "how does AI impact my job?",
+    "when will I get married?", "my husband and I keep fighting",
+    "I feel stressed about money and my job", "should I buy a house or a flat?",
+    "is it a good time to invest in gold or silver?", "what are my strengths?",
+    "what is my life purpose?", "how is my health looking?",
+    "will my son do well in his exams?", "should I start a business?",
+    "I want to travel abroad for studies", "what is the universe telling me?",
+    "my past life karma", "how can I build confidence and overcome fear?",
+    "legal trouble with an inheritance", "emotional ups and downs",
+]
+
+
+def legacy_detect(question, conn):
+    q_lower = question.lower()
+    rows = conn.execute("SELECT theme, display_name FROM ref_life_theme").fetchall()
+    matches = []
+    for row in rows:
+        theme = row["theme"]
+        display = row["display_name"].lower()
+        score = 0
+        for w in theme.replace("_", " ").split() + display.split():
+            if len(w) > 2 and w in q_lower:
+                score += 1
+        if score > 0:
+            matches.append((score, theme))
+
+    keyword_map = dict(KEYWORD_THEMES)         # the original rebuilt its literal per call
+    for keyword, theme in keyword_map.items():
+        if re.search(r'\b' + re.escape(keyword), q_lower) and not any(t == theme for _, t in matches):
+            matches.append((1, theme))
+
+    matches.sort(key=lambda x: -x[0])
+    seen, result = set(), []
+    for _, theme in matches:
+        if theme not in seen:
+            seen.add(theme)
+            result.append(theme)
+    return result
+
+
+def load_questions(conn, limit=None):
+    try:
+        sql = "SELECT raw_question FROM event_log"
+        rows = conn.execute(sql + (f" LIMIT {int(limit)}" if limit else "")).fetchall()
+    except Exception:
+        rows = []
+    return [r[0] for r in rows if r[0]] or SAMPLE
+
+
+def _time(fn, questions, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for q in questions:
+            fn(q)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--limit", type=int, help="max questions to read from event_log")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    conn = get_connection()
+    try:
+        questions = load_questions(conn, args.limit)
+        rows = conn.execute("SELECT theme, display_name FROM ref_life_theme").fetchall()
+
+        start = time.perf_counter()
+        detector = ThemeDetector(rows)
+        build = time.perf_counter() - start
+
+        mismatches = [q for q in questions if legacy_detect(q, conn) != detector.detect(q)]
+        if mismatches:
+            q = mismatches[0]
+            raise SystemExit(f"Detectors disagree on {len(mismatches)} questions, e.g. {q!r}: "
+                             f"{legacy_detect(q, conn)} vs {detector.detect(q)}")
+
+        legacy = _time(lambda q: legacy_detect(q, conn), questions, args.repeat)
+        fast = _time(detector.detect, questions, args.repeat)
+    finally:
+        conn.close()
+
+    n = len(questions)
+    print(f"{n} questions, best of {args.repeat} (detector built in {build * 1e3:.1f} ms)")
+    print(f"  original _detect_themes : {legacy / n * 1e6:8.2f} µs/question")
+    print(f"  ThemeDetector.detect    : {fast / n * 1e6:8.2f} µs/question  ({legacy / fast:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
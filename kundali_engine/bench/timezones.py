@@ -0,0 +1,66 @@
+"""
+Micro-benchmark: local birth time → UTC conversion in bulk.
+
+Generates N random births (1900-2025, random minute of day) spread over
+a handful of zones and converts them with core.timezones.to_utc per row
+(ZoneInfo.utcoffset, what a loop over records does) and with
+to_utc_batch on the whole array, cold (zone-year tables built during the
+call) and warm.
+
+Run:  python -m kundali_engine.bench.timezones [--births N] [--loop-sample S]
+
+The per-row loop is timed on the first --loop-sample births and
+extrapolated. Both must agree on that sample.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from kundali_engine.core.timezones import to_utc, to_utc_batch
+
+ZONES = ("IST", "Asia/Kolkata", "America/New_York", "Europe/London",
+         "Asia/Singapore", "Asia/Kathmandu", "Australia/Sydney", "UTC+05:30")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--births", type=int, default=1_000_000)
+    parser.add_argument("--loop-sample", type=int, default=50_000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(3)
+    start = np.datetime64("1900-01-01T00:00:00").astype(np.int64)
+    end = np.datetime64("2025-01-01T00:00:00").astype(np.int64)
+    local = (rng.integers(start, end, args.births) // 60 * 60).astype("datetime64[s]")
+    zones = np.array(ZONES, dtype=object)[rng.integers(0, len(ZONES), args.births)]
+
+    sample = min(args.loop_sample, args.births)
+    rows = [(local[i].item(), zones[i]) for i in range(sample)]
+    scale = args.births / sample
+
+    t0 = time.perf_counter()
+    per_row = [to_utc(dt, z) for dt, z in rows]
+    loop_time = (time.perf_counter() - t0) * scale
+
+    t0 = time.perf_counter()
+    utc = to_utc_batch(local, zones)
+    cold_time = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    to_utc_batch(local, zones)
+    warm_time = time.perf_counter() - t0
+
+    assert per_row == utc[:sample].astype(object).tolist()
+
+    rows = [
+        ("to_utc per row", f"{loop_time:8.2f} s (extrapolated)"),
+        ("to_utc_batch cold", f"{cold_time:8.2f} s  ({loop_time / cold_time:.0f}x)"),
+        ("to_utc_batch warm", f"{warm_time:8.2f} s  ({loop_time / warm_time:.0f}x)"),
+    ]
+    print(f"{args.births} births, {len(ZONES)} zones")
+    for label, value in rows:
+        print(f"  {label:<18} : {value}")
+
+
+if __name__ == "__main__":
+    main()
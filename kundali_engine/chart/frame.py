@@ -0,0 +1,145 @@
+"""
+Columnar chart arrays for population-level rule evaluation.
+
+A ChartFrame holds one row per person and one column per planet (in
+PLANETS order). Categorical fields are integer-coded so that rule
+predicates compile to plain NumPy comparisons over the whole population
+instead of one `kundali.get_planet` call per chart.
+
+Missing values: sign/dignity/nakshatra = -1, house = 0, degree = NaN.
+"""
+import numpy as np
+
+from kundali_engine.core.database.connection import get_connection
+
+PLANETS = ["Sun", "Moon", "Mars", "Mercury", "Jupiter", "Venus", "Saturn", "Rahu", "Ketu"]
+
+SIGNS = [
+    "Aries", "Taurus", "Gemini", "Cancer", "Leo", "Virgo",
+    "Libra", "Scorpio", "Sagittarius", "Capricorn", "Aquarius", "Pisces",
+]
+
+DIGNITIES = ["exalted", "moolatrikona", "own", "friendly", "neutral", "enemy", "debilitated"]
+
+NAKSHATRAS = [
+    "Ashwini", "Bharani", "Krittika", "Rohini", "Mrigashira", "Ardra",
+    "Punarvasu", "Pushya", "Ashlesha", "Magha", "Purva Phalguni", "Uttara Phalguni",
+    "Hasta", "Chitra", "Swati", "Vishakha", "Anuradha", "Jyeshtha",
+    "Mula", "Purva Ashada", "Uttara Ashada", "Shravana", "Dhanishta", "Shatabhisha",
+    "Purva Bhadrapada", "Uttara Bhadrapada", "Revati",
+]
+
+PLANET_INDEX = {p: i for i, p in enumerate(PLANETS)}
+SIGN_INDEX = {s: i for i, s in enumerate(SIGNS)}
+DIGNITY_INDEX = {d: i for i, d in enumerate(DIGNITIES)}
+NAKSHATRA_INDEX = {n: i for i, n in enumerate(NAKSHATRAS)}
+
+
+class ChartFrame:
+    """Natal charts for a population, stored as (n_persons, 9) arrays."""
+
+    def __init__(self, person_ids):
+        n = len(person_ids)
+        shape = (n, len(PLANETS))
+        self.person_ids = np.asarray(person_ids, dtype=np.int64)
+        self.lagna = np.full(n, -1, dtype=np.int8)
+        self.sign = np.full(shape, -1, dtype=np.int8)
+        self.house = np.zeros(shape, dtype=np.int8)
+        self.dignity = np.full(shape, -1, dtype=np.int8)
+        self.nakshatra = np.full(shape, -1, dtype=np.int8)
+        self.degree = np.full(shape, np.nan, dtype=np.float32)
+        self.retrograde = np.zeros(shape, dtype=bool)
+        self.combust = np.zeros(shape, dtype=bool)
+
+    def __len__(self):
+        return len(self.person_ids)
+
+    def row(self, person_id):
+        """Row index for a person_id (raises KeyError if absent)."""
+        idx = np.flatnonzero(self.person_ids == person_id)
+        if not len(idx):
+            raise KeyError(person_id)
+        return int(idx[0])
+
+    # ── Constructors ──────────────────────────────────────────────────────
+
+    @classmethod
+    def from_db(cls, person_ids=None, conn=None):
+        """Load natal charts for the given persons (default: everyone)."""
+        own_conn = conn is None
+        if own_conn:
+            conn = get_connection()
+        try:
+            if person_ids is None:
+                people = conn.execute(
+                    "SELECT id, lagna_sign FROM person ORDER BY id"
+                ).fetchall()
+                planets = conn.execute(
+                    "SELECT person_id, planet, sign, house, dignity, nakshatra, "
+                    "degree_in_sign, is_retrograde, is_combust FROM natal_planet"
+                ).fetchall()
+            else:
+                ids = sorted({int(p) for p in person_ids})
+                marks = ",".join("?" * len(ids))
+                people = conn.execute(
+                    f"SELECT id, lagna_sign FROM person WHERE id IN ({marks}) ORDER BY id",
+                    ids,
+                ).fetchall()
+                planets = conn.execute(
+                    "SELECT person_id, planet, sign, house, dignity, nakshatra, "
+                    "degree_in_sign, is_retrograde, is_combust FROM natal_planet "
+                    f"WHERE person_id IN ({marks})",
+                    ids,
+                ).fetchall()
+        finally:
+            if own_conn:
+                conn.close()
+
+        frame = cls([r[0] for r in people])
+        frame.lagna[:] = [SIGN_INDEX.get(r[1], -1) for r in people]
+        frame._fill(planets)
+        return frame
+
+    @classmethod
+    def from_planets(cls, planets, lagna_sign=None, person_id=0):
+        """Single-row frame from compute_planetary_positions() style dicts."""
+        frame = cls([person_id])
+        frame.lagna[0] = SIGN_INDEX.get(lagna_sign, -1)
+        frame._fill(
+            (person_id, p["planet"], p.get("sign"), p.get("house"),
+             p.get("dignity"), p.get("nakshatra"), p.get("degree_in_sign"),
+             p.get("is_retrograde"), p.get("is_combust"))
+            for p in planets
+        )
+        return frame
+
+    @classmethod
+    def from_kundali(cls, kundali, person_id=0):
+        """Single-row frame from a chart.kundali.Kundali object."""
+        frame = cls([person_id])
+        frame.lagna[0] = SIGN_INDEX.get(kundali.lagna, -1)
+        frame._fill(
+            (person_id, p.name, p.sign, p.house,
+             getattr(p, "dignity", None), p.nakshatra,
+             None, getattr(p, "retrograde", False), getattr(p, "is_combust", False))
+            for p in kundali.planets.values()
+        )
+        return frame
+
+    def _fill(self, rows):
+        """Scatter (person_id, planet, sign, house, dignity, nakshatra,
+        degree, retrograde, combust) tuples into the arrays."""
+        row_of = {int(pid): i for i, pid in enumerate(self.person_ids)}
+        for pid, planet, sign, house, dignity, nak, deg, retro, combust in rows:
+            i = row_of.get(pid)
+            j = PLANET_INDEX.get(planet)
+            if i is None or j is None:
+                continue
+            self.sign[i, j] = SIGN_INDEX.get(sign, -1)
+            self.house[i, j] = house or 0
+            self.dignity[i, j] = DIGNITY_INDEX.get(dignity, -1)
+            self.nakshatra[i, j] = NAKSHATRA_INDEX.get(nak, -1)
+            if deg is not None:
+                self.degree[i, j] = deg
+            self.retrograde[i, j] = bool(retro)
+            self.combust[i, j] = bool(combust)
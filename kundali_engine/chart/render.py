@@ -0,0 +1,346 @@
+"""
+Chart rendering for the agent, the CLI and the API.
+
+    chart = get_chart(person_id)             # cached per chart version
+    chart.render("text")                     # or "whatsapp", "json", "html"
+
+A Chart holds one person's natal chart: the person fields and the
+planets in display order, with Sun and Moon looked up once. Rendering
+goes through format strings and row templates compiled at import time;
+each planet row is formatted once per chart.
+
+Charts are cached per process, keyed by (person_id, version), and each
+chart memoizes its rendered formats, so a repeated "show my chart" is a
+dictionary hit. The version comes from data_version, which triggers on
+person and natal_planet bump on every change.
+"""
+import html
+import json
+import threading
+from collections import OrderedDict
+
+from kundali_engine.core.database.connection import pooled_connection
+from kundali_engine.core.database.person_search import best_match, search_persons
+
+FORMATS = ("text", "whatsapp", "json", "html")
+DEFAULT_MAX_CHARTS = 1024
+
+# ── Templates ─────────────────────────────────────────────────────────────
+
+_TEXT_HEADER = "Chart for {name} (ID: {id})\nBorn: {dob} at {tob}, {place}".format
+_TEXT_LAGNA = "Lagna: {lagna_sign} ({lagna_degree:.1f} deg)".format
+_TEXT_LUMINARIES = (
+    "Sun Sign:  {sun_sign}  |  Moon Sign: {moon_sign}\n"
+    "Moon Nakshatra: {moon_nakshatra} (Pada {moon_pada})\n"
+).format
+_TEXT_TABLE_HEAD = (
+    f"{'Planet':<10} {'Sign':<12} {'House':>5} {'Degree':>8} "
+    f"{'Nakshatra':<16} {'Dignity':<12} {'R':>2}\n" + "-" * 72
+)
+_TEXT_ROW = (
+    "{planet:<10} {sign:<12} {house:>5} {degree:>7.1f}  "
+    "{nakshatra:<16} {dignity:<12} {retro:>2}"
+).format
+
+_WA_HEADER = "*Chart for {name}* (ID: {id})\n_Born {dob} at {tob}, {place}_".format
+_WA_LAGNA = "Lagna: *{lagna_sign}* ({lagna_degree:.1f}°)".format
+_WA_LUMINARIES = (
+    "Sun: *{sun_sign}*  |  Moon: *{moon_sign}*\n"
+    "Moon Nakshatra: {moon_nakshatra} (Pada {moon_pada})\n"
+).format
+_WA_ROW = "{planet:<8}{sign:<12}{house:>3} {degree:>5.1f} {retro}".format
+
+_HTML_HEADER = (
+    '<h2>Chart for {name} <small>(ID: {id})</small></h2>\n'
+    '<p class="born">Born: {dob} at {tob}, {place}</p>'
+).format
+_HTML_LAGNA = '<p class="lagna">Lagna: {lagna_sign} ({lagna_degree:.1f}&deg;)</p>'.format
+_HTML_LUMINARIES = (
+    '<p class="luminaries">Sun Sign: {sun_sign} | Moon Sign: {moon_sign}<br>\n'
+    'Moon Nakshatra: {moon_nakshatra} (Pada {moon_pada})</p>'
+).format
+_HTML_TABLE_HEAD = (
+    '<table class="planets">\n<thead><tr><th>Planet</th><th>Sign</th><th>House</th>'
+    '<th>Degree</th><th>Nakshatra</th><th>Dignity</th><th>R</th></tr></thead>\n<tbody>'
+)
+_HTML_ROW = (
+    "<tr><td>{planet}</td><td>{sign}</td><td>{house}</td><td>{degree:.1f}</td>"
+    "<td>{nakshatra}</td><td>{dignity}</td><td>{retro}</td></tr>"
+).format
+
+_NO_PLANETS = "No planetary data computed yet."
+
+
+def _planet_row(p):
+    """Display values for one natal_planet row (missing fields blank)."""
+    return {
+        "planet": p["planet"],
+        "sign": p["sign"] or "",
+        "house": p["house"] or "",
+        "degree": p["degree_in_sign"] or 0,
+        "nakshatra": p["nakshatra"] or "",
+        "dignity": p.get("dignity") or "",
+        "retro": "R" if p["is_retrograde"] else "",
+    }
+
+
+# ── Chart ─────────────────────────────────────────────────────────────────
+
+class Chart:
+    """One person's natal chart, renderable in every FORMATS format."""
+
+    def __init__(self, person, planets, version=None):
+        self.person = dict(person)
+        self.planets = [dict(p) for p in planets]
+        self.by_planet = {p["planet"]: p for p in self.planets}
+        self.version = version
+        self._rows = None
+        self._rendered = {}
+        self._lock = threading.Lock()
+
+    @property
+    def person_id(self):
+        return self.person.get("id")
+
+    @property
+    def sun(self):
+        return self.by_planet.get("Sun")
+
+    @property
+    def moon(self):
+        return self.by_planet.get("Moon")
+
+    @classmethod
+    def from_computed(cls, person_id, person_data, lagna_sign, lagna_degree, planets):
+        """Chart for create_kundali output (before or without a database read)."""
+        person = {
+            "id": person_id,
+            "name": person_data["name"],
+            "dob": person_data["dob"],
+            "tob": person_data["tob"],
+            "place_name": person_data.get("place", ""),
+            "lagna_sign": lagna_sign,
+            "lagna_degree": lagna_degree,
+        }
+        return cls(person, planets)
+
+    # ── Rendering ─────────────────────────────────────────────────────────
+
+    def render(self, fmt="text", header=True):
+        """
+        The chart as a string. header=False drops the name/birth lines
+        (callers that print their own heading). Results are memoized.
+        """
+        key = (fmt, header)
+        out = self._rendered.get(key)
+        if out is None:
+            try:
+                renderer = _RENDERERS[fmt]
+            except KeyError:
+                raise ValueError(f"Unknown chart format {fmt!r}, expected one of {FORMATS}")
+            out = renderer(self, header)
+            with self._lock:
+                self._rendered[key] = out
+        return out
+
+    def rows(self):
+        if self._rows is None:
+            self._rows = [_planet_row(p) for p in self.planets]
+        return self._rows
+
+    def _fields(self, escape=None):
+        e = escape or (lambda v: v)
+        person, sun, moon = self.person, self.sun, self.moon
+        fields = {
+            "id": person.get("id"),
+            "name": e(person.get("name") or ""),
+            "dob": e(person.get("dob") or ""),
+            "tob": e(person.get("tob") or ""),
+            "place": e(person.get("place_name") or ""),
+            "lagna_sign": e(person.get("lagna_sign") or "N/A"),
+            "lagna_degree": person.get("lagna_degree") or 0,
+        }
+        if sun and moon:
+            fields.update(
+                sun_sign=e(sun["sign"]),
+                moon_sign=e(moon["sign"]),
+                moon_nakshatra=e(moon["nakshatra"] or "N/A"),
+                moon_pada=moon["nakshatra_pada"] or "?",
+            )
+        return fields
+
+    def as_dict(self):
+        person = self.person
+        return {
+            "person_id": person.get("id"),
+            "name": person.get("name"),
+            "dob": person.get("dob"),
+            "tob": person.get("tob"),
+            "place": person.get("place_name"),
+            "lagna": {"sign": person.get("lagna_sign"), "degree": person.get("lagna_degree")},
+            "planets": [
+                {k: p.get(k) for k in (
+                    "planet", "sign", "house", "sidereal_longitude", "degree_in_sign",
+                    "nakshatra", "nakshatra_pada", "dignity", "is_retrograde", "is_combust",
+                )}
+                for p in self.planets
+            ],
+        }
+
+
+def _render_text(chart, header):
+    f = chart._fields()
+    parts = [_TEXT_HEADER(**f)] if header else []
+    parts += [_TEXT_LAGNA(**f), ""]
+    if not chart.planets:
+        parts.append(_NO_PLANETS)
+        return "\n".join(parts)
+    if "sun_sign" in f:
+        parts.append(_TEXT_LUMINARIES(**f))
+    parts.append(_TEXT_TABLE_HEAD)
+    parts.extend(_TEXT_ROW(**r) for r in chart.rows())
+    return "\n".join(parts)
+
+
+def _render_whatsapp(chart, header):
+    f = chart._fields()
+    parts = [_WA_HEADER(**f)] if header else []
+    parts += [_WA_LAGNA(**f), ""]
+    if not chart.planets:
+        parts.append(_NO_PLANETS)
+        return "\n".join(parts)
+    if "sun_sign" in f:
+        parts.append(_WA_LUMINARIES(**f))
+    # Monospace block keeps the columns aligned on phones
+    parts.append("```\n" + "\n".join(_WA_ROW(**r) for r in chart.rows()) + "\n```")
+    return "\n".join(parts)
+
+
+def _render_json(chart, header):
+    data = chart.as_dict()
+    if not header:
+        for key in ("name", "dob", "tob", "place"):
+            del data[key]
+    return json.dumps(data, ensure_ascii=False)
+
+
+def _render_html(chart, header):
+    f = chart._fields(escape=html.escape)
+    parts = ['<section class="chart">']
+    if header:
+        parts.append(_HTML_HEADER(**f))
+    parts.append(_HTML_LAGNA(**f))
+    if not chart.planets:
+        parts.append(f"<p>{_NO_PLANETS}</p>")
+    else:
+        if "sun_sign" in f:
+            parts.append(_HTML_LUMINARIES(**f))
+        parts.append(_HTML_TABLE_HEAD)
+        parts.extend(
+            _HTML_ROW(**{k: html.escape(v) if isinstance(v, str) else v for k, v in r.items()})
+            for r in chart.rows()
+        )
+        parts.append("</tbody>\n</table>")
+    parts.append("</section>")
+    return "\n".join(parts)
+
+
+_RENDERERS = {
+    "text": _render_text,
+    "whatsapp": _render_whatsapp,
+    "json": _render_json,
+    "html": _render_html,
+}
+
+
+# ── Cache ─────────────────────────────────────────────────────────────────
+
+PERSON_SQL = """SELECT p.*, COALESCE(v.version, 0) AS chart_version
+                FROM person p
+                LEFT JOIN data_version v ON v.person_id = p.id AND v.kind = 'chart'"""
+
+
+class ChartCache:
+    """LRU of Chart objects keyed by (person_id, chart version)."""
+
+    def __init__(self, max_size=DEFAULT_MAX_CHARTS):
+        self.max_size = max_size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, conn, person):
+        """
+        Chart for a person row selected with PERSON_SQL (it carries
+        chart_version); natal_planet is read only on a miss.
+        """
+        key = (person["id"], person["chart_version"])
+        with self._lock:
+            chart = self._data.get(key)
+            if chart is not None:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return chart
+            self.misses += 1
+        planets = conn.execute(
+            "SELECT * FROM natal_planet WHERE person_id = ? ORDER BY sidereal_longitude",
+            (person["id"],),
+        ).fetchall()
+        chart = Chart(
+            {k: person[k] for k in person.keys() if k != "chart_version"},
+            planets, person["chart_version"],
+        )
+        with self._lock:
+            self._data[key] = chart
+            # Older versions of this person can never be hit again
+            for stale in [k for k in self._data if k[0] == key[0] and k != key]:
+                del self._data[stale]
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+        return chart
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def metrics(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+_cache = ChartCache()
+
+
+def get_chart_cache():
+    return _cache
+
+
+def find_person(conn, person_id=None, name=None):
+    """
+    Person row (with chart_version) by id, or the clear best name match
+    (core/database/person_search.py); None if nothing matches or several
+    people match equally well.
+    """
+    if name:
+        match = best_match(search_persons(conn, name))
+        if not match:
+            return None
+        person_id = match["id"]
+    return conn.execute(PERSON_SQL + " WHERE p.id = ?", (person_id,)).fetchone()
+
+
+def get_chart(person_id, conn=None):
+    """Cached Chart for a person_id, or None if there is no such person."""
+    if conn is None:
+        with pooled_connection() as conn:
+            return get_chart(person_id, conn)
+    person = find_person(conn, person_id)
+    return _cache.get(conn, person) if person else None
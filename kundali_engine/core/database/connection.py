@@ -1,4 +1,24 @@
+"""
+SQLite connections for the v2 database.
+
+get_connection() opens a fresh connection (scripts, seeders, batch jobs
+that own their connection). Request-path code checks connections out of
+a process-wide pool instead:
+
+    with pooled_connection() as conn:
+        conn.execute(...)
+
+Pooled connections are opened once with the configured pragmas and
+reused. Checkout is re-entrant per thread: a function that checks out a
+connection while its caller already holds one gets the caller's
+connection, so nested helpers never wait on the pool (or deadlock it).
+"""
+import os
+import queue
 import sqlite3
+import threading
+import time
+from contextlib import contextmanager
 from pathlib import Path
 
 DB_PATH = Path(__file__).resolve().parents[3] / "astro_v2.db"
@@ -6,8 +26,160 @@ DB_PATH = Path(__file__).resolve().parents[3] / "astro_v2.db"
 # Keep v1 path for migration reference
 V1_DB_PATH = Path(__file__).resolve().parents[3] / "astro.db"
 
+# Applied to every pooled connection. WAL lets readers proceed while a
+# writer commits; synchronous=NORMAL is durable across application
+# crashes in WAL mode and avoids an fsync per commit.
+DEFAULT_PRAGMAS = {
+    "foreign_keys": "ON",
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": 5000,              # ms to wait on a locked database
+    "cache_size": -16000,              # KiB when negative → 16 MB page cache
+    "mmap_size": 256 * 1024 * 1024,    # bytes of the file to memory-map
+    "temp_store": "MEMORY",
+}
+DEFAULT_POOL_SIZE = 8
+
+
 def get_connection():
     conn = sqlite3.connect(DB_PATH)
     conn.execute("PRAGMA foreign_keys = ON")
     conn.row_factory = sqlite3.Row
     return conn
+
+
+class ConnectionPool:
+    """
+    Bounded pool of SQLite connections.
+
+    Connections are created lazily up to `size`; when all are checked
+    out, acquire() waits up to `timeout` seconds for one to be returned.
+    """
+
+    def __init__(self, db_path=None, size=DEFAULT_POOL_SIZE, pragmas=None, timeout=30.0):
+        self.db_path = Path(db_path or DB_PATH)
+        self.size = size
+        self.pragmas = dict(DEFAULT_PRAGMAS if pragmas is None else pragmas)
+        self.timeout = timeout
+        self.pid = os.getpid()
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._created = 0
+        self._all = []
+        self.stats = {"checkouts": 0, "reused": 0, "created": 0, "waits": 0, "wait_time": 0.0}
+
+    def _open(self):
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def acquire(self):
+        """Check out a connection (the thread's current one if it holds one)."""
+        held = getattr(self._local, "conn", None)
+        if held is not None:
+            self._local.depth += 1
+            self.stats["reused"] += 1
+            return held
+
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = self._open_if_room() or self._wait()
+
+        self._local.conn = conn
+        self._local.depth = 1
+        self.stats["checkouts"] += 1
+        return conn
+
+    def _open_if_room(self):
+        with self._lock:
+            if self._created >= self.size:
+                return None
+            self._created += 1
+        try:
+            conn = self._open()
+        except Exception:
+            with self._lock:
+                self._created -= 1
+            raise
+        with self._lock:
+            self._all.append(conn)
+        self.stats["created"] += 1
+        return conn
+
+    def _wait(self):
+        started = time.perf_counter()
+        try:
+            conn = self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise TimeoutError(f"No pooled connection free after {self.timeout}s")
+        self.stats["waits"] += 1
+        self.stats["wait_time"] += time.perf_counter() - started
+        return conn
+
+    def release(self, conn):
+        """Return a connection checked out with acquire()."""
+        if getattr(self._local, "conn", None) is not conn:
+            raise ValueError("Connection was not checked out by this thread")
+        self._local.depth -= 1
+        if self._local.depth:
+            return
+        self._local.conn = None
+        if conn.in_transaction:
+            conn.rollback()          # never hand out someone else's open transaction
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close(self):
+        """Close every connection the pool has opened."""
+        with self._lock:
+            for conn in self._all:
+                try:
+                    conn.close()
+                except sqlite3.ProgrammingError:
+                    pass
+            self._all = []
+            self._created = 0
+            self._idle = queue.LifoQueue()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """The process-wide pool, (re)created after fork or a DB_PATH change."""
+    global _pool
+    pool = _pool
+    if pool is None or pool.pid != os.getpid() or pool.db_path != Path(DB_PATH):
+        with _pool_lock:
+            if _pool is None or _pool.pid != os.getpid() or _pool.db_path != Path(DB_PATH):
+                # Inherited connections belong to the parent process: drop, don't close.
+                _pool = ConnectionPool()
+            pool = _pool
+    return pool
+
+
+def configure_pool(size=DEFAULT_POOL_SIZE, pragmas=None, timeout=30.0):
+    """Replace the process-wide pool (e.g. at service start-up)."""
+    global _pool
+    with _pool_lock:
+        old, _pool = _pool, ConnectionPool(size=size, pragmas=pragmas, timeout=timeout)
+    if old is not None and old.pid == os.getpid():
+        old.close()
+    return _pool
+
+
+def pooled_connection():
+    """Context manager: `with pooled_connection() as conn: ...`"""
+    return get_pool().connection()
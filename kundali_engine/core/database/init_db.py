@@ -10,8 +10,26 @@ def initialize_database():
     with open(schema_path, "r") as f:
         schema_sql = f.read()
 
+    # Only takes effect on a new, empty database; lets retention hand freed
+    # pages back with PRAGMA incremental_vacuum instead of a full VACUUM
+    cur.execute("PRAGMA auto_vacuum = INCREMENTAL")
     cur.executescript(schema_sql)
     conn.commit()
+
+    # Backfill aggregates added after the event tables (no-op on a fresh DB)
+    if not conn.execute("SELECT 1 FROM variant_stats LIMIT 1").fetchone():
+        from kundali_engine.agent.event_store import rebuild_variant_stats
+        rebuild_variant_stats(conn)
+    if not conn.execute("SELECT 1 FROM session_state LIMIT 1").fetchone():
+        conn.execute(
+            """INSERT INTO session_state (session_id, last_event_id, updated_at)
+               SELECT session_id, MAX(id), CAST(strftime('%s', MAX(timestamp)) AS REAL)
+               FROM event_log GROUP BY session_id"""
+        )
+        conn.commit()
+    if not conn.execute("SELECT 1 FROM person_fts LIMIT 1").fetchone():
+        conn.execute("INSERT INTO person_fts (rowid, name) SELECT id, name FROM person")
+        conn.commit()
     conn.close()
 
     # Seed reference data after schema creation
@@ -0,0 +1,142 @@
+"""
+Person name search over the person_fts trigram index.
+
+    search_persons(conn, "priyanka")      # ranked candidates (dicts)
+    best_match(search_persons(conn, q))   # the one clear winner, or None
+
+person_fts (schema_v2.sql) is an FTS5 table with the trigram tokenizer,
+rowid = person.id, kept in sync by triggers on person. A lookup takes
+candidates from, in order:
+
+  1. an exact name (NOCASE index) plus up to CANDIDATES substring matches
+     (every trigram of the query present); no bm25 ordering, so a name
+     shared by many rows costs no more than a rare one
+  2. if that finds nothing, a fuzzy pass: each word of three or more
+     letters becomes its two halves as phrases ("priynka" → "pri" OR
+     "ynka"), so one typo per word still leaves a half that matches.
+     Words are ANDed, then ORed if that finds nothing; the best bm25
+     rows are kept
+
+Queries shorter than three characters use a prefix match on the NOCASE
+name index.
+
+Candidates are ranked in Python:
+
+    1.0   the whole name          0.9   a word or the name starts with it
+    0.95  a whole word            0.8   substring anywhere
+    below that, difflib similarity to the name or its closest word
+
+Ties go to the shorter name, then the lower id.
+"""
+import difflib
+import re
+
+DEFAULT_LIMIT = 5
+CANDIDATES = 50          # FTS rows reranked per query
+MIN_SCORE = 0.55         # weaker fuzzy matches are not returned
+
+_WORD = re.compile(r"\w+")
+
+
+def _normalize(text):
+    return " ".join(_WORD.findall((text or "").lower()))
+
+
+def _quote(term):
+    return '"' + term.replace('"', '""') + '"'
+
+
+def _halves(word):
+    """Two phrases of a word such that a one-character typo leaves one intact."""
+    if len(word) < 6:
+        return {word[:3], word[-3:]}
+    mid = len(word) // 2
+    return {word[:mid], word[mid:]}
+
+
+def score_name(query, name):
+    """How well `name` matches a normalized query (0..1, see the table above)."""
+    name = _normalize(name)
+    if not query or not name:
+        return 0.0
+    if name == query:
+        return 1.0
+    words = name.split()
+    if query in words:
+        return 0.95
+    if name.startswith(query) or any(w.startswith(query) for w in words):
+        return 0.9
+    if query in name:
+        return 0.8
+    # Typo-level similarity to the full name or the closest single word
+    ratio = max(difflib.SequenceMatcher(None, query, c).ratio() for c in [name, *words])
+    return round(0.75 * ratio, 4)
+
+
+def _fuzzy_match(query, all_words):
+    groups = ["(" + " OR ".join(_quote(h) for h in sorted(_halves(w))) + ")"
+              for w in query.split() if len(w) >= 3]
+    return (" AND " if all_words else " OR ").join(groups)
+
+
+def _candidates(conn, query):
+    rows = conn.execute(
+        "SELECT id, name FROM person WHERE name = ? COLLATE NOCASE LIMIT ?",
+        (query, CANDIDATES),
+    ).fetchall()
+    rows += conn.execute(
+        "SELECT rowid, name FROM person_fts WHERE person_fts MATCH ? LIMIT ?",
+        (_quote(query), CANDIDATES),
+    ).fetchall()
+    if rows:
+        return rows
+    for all_words in (True, False):
+        match = _fuzzy_match(query, all_words)
+        if not match:
+            break
+        rows = conn.execute(
+            "SELECT rowid, name FROM person_fts WHERE person_fts MATCH ? ORDER BY rank LIMIT ?",
+            (match, CANDIDATES),
+        ).fetchall()
+        if rows or query.count(" ") == 0:
+            break
+    return rows
+
+
+def search_persons(conn, query, limit=DEFAULT_LIMIT, min_score=MIN_SCORE):
+    """Ranked [{"id", "name", "score"}] for a name query (best first)."""
+    q = _normalize(query)
+    if not q:
+        return []
+    if len(q) < 3:
+        rows = conn.execute(
+            "SELECT id, name FROM person WHERE name LIKE ? ORDER BY name COLLATE NOCASE LIMIT ?",
+            (q.replace("%", "").replace("_", "") + "%", CANDIDATES),
+        ).fetchall()
+    else:
+        rows = _candidates(conn, q)
+
+    ranked, seen = [], set()
+    for person_id, name in rows:
+        if person_id in seen:
+            continue
+        seen.add(person_id)
+        s = score_name(q, name)
+        if s >= min_score:
+            ranked.append({"id": person_id, "name": name, "score": s})
+    ranked.sort(key=lambda c: (-c["score"], len(c["name"]), c["id"]))
+    return ranked[:limit]
+
+
+def best_match(candidates):
+    """
+    The top candidate when it is a clear winner (no other candidate has
+    the same score). None when empty or ambiguous, e.g. two people with
+    the same name.
+    """
+    if not candidates:
+        return None
+    top = candidates[0]
+    if len(candidates) == 1 or candidates[1]["score"] < top["score"]:
+        return top
+    return None
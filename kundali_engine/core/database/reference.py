@@ -0,0 +1,169 @@
+"""
+In-memory copy of the static ref_* tables.
+
+    ref = get_reference_data()
+    ref.planets["Saturn"]["dasha_years"]
+    ref.planet_house_meaning.get(("Saturn", 10, 2))
+
+Every ref_* table is read once per process into read-only row mappings
+(JSON columns decoded) and indexed by the keys handlers and the
+interpreter look them up by. The cached copy is reused until the
+database's reference version changes:
+
+  - PRAGMA user_version, bumped by the seeders (bump_reference_version)
+  - PRAGMA schema_version, bumped by SQLite on any schema change
+
+The version is re-read at most every VERSION_CHECK_INTERVAL seconds, so
+lookups stay in memory; invalidate() forces a reload on next access.
+"""
+import json
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from types import MappingProxyType
+
+from . import connection
+from .connection import pooled_connection
+
+VERSION_CHECK_INTERVAL = 5.0     # seconds between reference-version checks
+
+# Columns stored as JSON text
+JSON_COLUMNS = {
+    "ref_nakshatra": ("signs",),
+    "ref_ashtakavarga_rule": ("bindu_houses",),
+    "ref_strategy_class": ("favorable_planets", "unfavorable_planets"),
+    "ref_life_theme": ("relevant_planets", "relevant_houses"),
+}
+
+
+def read_version(conn):
+    """(schema_version, user_version) of the database behind `conn`."""
+    schema = conn.execute("PRAGMA schema_version").fetchone()[0]
+    user = conn.execute("PRAGMA user_version").fetchone()[0]
+    return schema, user
+
+
+def bump_reference_version(conn):
+    """Mark reference data as changed; call before committing a (re)seed."""
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    conn.execute(f"PRAGMA user_version = {int(version) + 1}")
+
+
+def _load_tables(conn):
+    names = [r[0] for r in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE 'ref\\_%' ESCAPE '\\'"
+    )]
+    tables = {}
+    for name in names:
+        json_cols = JSON_COLUMNS.get(name, ())
+        rows = []
+        for r in conn.execute(f"SELECT * FROM {name} ORDER BY rowid"):
+            row = dict(r)
+            for col in json_cols:
+                if row.get(col) is not None:
+                    row[col] = json.loads(row[col])
+            rows.append(MappingProxyType(row))
+        tables[name] = tuple(rows)
+    return tables
+
+
+def _group(rows, key):
+    groups = defaultdict(list)
+    for r in rows:
+        groups[r[key]].append(r)
+    return {k: tuple(v) for k, v in groups.items()}
+
+
+class ReferenceData:
+    """All ref_* tables, as row tuples (`tables`) and keyed indexes."""
+
+    def __init__(self, tables, version=None, db_path=None):
+        self.tables = tables
+        self.version = version
+        self.db_path = db_path
+        t = lambda name: tables.get(name, ())
+
+        self.signs = {r["name"]: r for r in t("ref_sign")}
+        self.planets = {r["name"]: r for r in t("ref_planet")}
+        self.nakshatras = {r["name"]: r for r in t("ref_nakshatra")}
+        self.houses = {r["house_number"]: r for r in t("ref_house")}
+        self.dignities = _group(t("ref_dignity"), "planet")
+        self.relationships = _group(t("ref_natural_relationship"), "planet")
+        self.planet_sectors = _group(t("ref_planet_sector"), "planet")
+        self.planet_commodities = _group(t("ref_planet_commodity"), "planet")
+        self.commodities = {}
+        for r in t("ref_planet_commodity"):
+            self.commodities.setdefault(r["commodity"], r)
+        self.strategy_classes = {r["name"]: r for r in t("ref_strategy_class")}
+
+        self.life_themes = {r["theme"]: r for r in t("ref_life_theme")}
+        self.rahu_ketu_axis = {
+            (r["rahu_house"], r["variant_id"]): r for r in t("ref_rahu_ketu_axis")
+        }
+        self.planet_house_meaning = {
+            (r["planet"], r["house"], r["variant_id"]): r for r in t("ref_planet_house_meaning")
+        }
+        self.planet_theme_meaning = {
+            (r["planet"], r["theme"], r["variant_id"]): r for r in t("ref_planet_theme_meaning")
+        }
+
+        # Text variants available per (key_type, planet, key), as used by
+        # the variant bandit (agent/bandit.py)
+        variants = defaultdict(set)
+        for planet, house, vid in self.planet_house_meaning:
+            variants[("house", planet, str(house))].add(vid)
+        for planet, theme, vid in self.planet_theme_meaning:
+            variants[("theme", planet, theme)].add(vid)
+        for house, vid in self.rahu_ketu_axis:
+            variants[("rahu_ketu", "Rahu", str(house))].add(vid)
+        self.variants = {k: tuple(sorted(v)) for k, v in variants.items()}
+
+    def variant_ids(self, key_type, planet, key):
+        """Variant ids with text for e.g. ("house", "Saturn", 10); () if none."""
+        return self.variants.get((key_type, planet, str(key)), ())
+
+    @classmethod
+    def load(cls, conn, db_path=None):
+        return cls(_load_tables(conn), read_version(conn), db_path)
+
+
+_reference = None
+_checked_at = 0.0
+_lock = threading.Lock()
+
+
+def get_reference_data(conn=None):
+    """
+    The process-wide ReferenceData, loaded on first use and reloaded when
+    the reference version changes. `conn` is used for the version check
+    or load if given; otherwise a pooled connection is checked out.
+    """
+    global _checked_at
+    ref = _reference
+    db_path = Path(connection.DB_PATH)
+    if ref is not None and ref.db_path == db_path \
+            and time.monotonic() - _checked_at < VERSION_CHECK_INTERVAL:
+        return ref
+
+    if conn is None:
+        with pooled_connection() as conn:
+            return _refresh(conn, db_path)
+    return _refresh(conn, db_path)
+
+
+def _refresh(conn, db_path):
+    global _reference, _checked_at
+    with _lock:
+        version = read_version(conn)
+        if _reference is None or _reference.db_path != db_path or _reference.version != version:
+            _reference = ReferenceData.load(conn, db_path)
+        _checked_at = time.monotonic()
+        return _reference
+
+
+def invalidate():
+    """Drop the cached reference data; the next access reloads it."""
+    global _reference
+    with _lock:
+        _reference = None
@@ -170,6 +170,33 @@ CREATE TABLE IF NOT EXISTS person (
     lagna_degree    REAL
 );
 
+-- person_fts: trigram full-text index over person.name for name lookups
+-- (core/database/person_search.py); rowid = person.id, kept in sync by the
+-- triggers below. The BEFORE INSERT trigger covers INSERT OR REPLACE,
+-- which replaces a row without firing delete triggers
+CREATE VIRTUAL TABLE IF NOT EXISTS person_fts USING fts5(name, tokenize = 'trigram');
+
+CREATE TRIGGER IF NOT EXISTS trg_person_fts_replace BEFORE INSERT ON person
+BEGIN
+    DELETE FROM person_fts WHERE rowid = NEW.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_person_fts_insert AFTER INSERT ON person
+BEGIN
+    INSERT INTO person_fts (rowid, name) VALUES (NEW.id, NEW.name);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_person_fts_update AFTER UPDATE OF id, name ON person
+BEGIN
+    DELETE FROM person_fts WHERE rowid = OLD.id;
+    INSERT INTO person_fts (rowid, name) VALUES (NEW.id, NEW.name);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_person_fts_delete AFTER DELETE ON person
+BEGIN
+    DELETE FROM person_fts WHERE rowid = OLD.id;
+END;
+
 -- 2. natal_planet (enhanced from v1)
 CREATE TABLE IF NOT EXISTS natal_planet (
     person_id           INTEGER NOT NULL,
@@ -352,7 +379,7 @@ CREATE TABLE IF NOT EXISTS sade_sati_period (
 );
 
 -- =============================================
--- CATEGORY 4: OUTPUT / CACHE (2 tables)
+-- CATEGORY 4: OUTPUT / CACHE (3 tables)
 -- =============================================
 
 -- 1. astro_regime_snapshot (enhanced from v1)
@@ -385,6 +412,102 @@ CREATE TABLE IF NOT EXISTS daily_recommendation (
     FOREIGN KEY (person_id) REFERENCES person(id)
 );
 
+-- 3. data_version: per-person change counters for in-process caches.
+-- Bumped by the triggers below and by the bulk writers of guidance and
+-- transit positions (per chunk rather than per row); a cache keyed by (person_id, version)
+-- never serves a stale chart (chart/render.py) or agent response
+-- (agent/response_cache.py)
+CREATE TABLE IF NOT EXISTS data_version (
+    person_id       INTEGER NOT NULL,
+    kind            TEXT NOT NULL,       -- 'chart': person + natal_planet; 'dasha';
+                                         -- 'guidance' (daily_batch.write_chunk);
+                                         -- 'transit' (person_id 0, TransitTable.store)
+    version         INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (person_id, kind)
+) WITHOUT ROWID;
+
+CREATE TRIGGER IF NOT EXISTS trg_natal_planet_insert_version AFTER INSERT ON natal_planet
+BEGIN
+    INSERT INTO data_version (person_id, kind, version) VALUES (NEW.person_id, 'chart', 1)
+    ON CONFLICT(person_id, kind) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_natal_planet_update_version AFTER UPDATE ON natal_planet
+BEGIN
+    INSERT INTO data_version (person_id, kind, version) VALUES (NEW.person_id, 'chart', 1)
+    ON CONFLICT(person_id, kind) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_natal_planet_delete_version AFTER DELETE ON natal_planet
+BEGIN
+    INSERT INTO data_version (person_id, kind, version) VALUES (OLD.person_id, 'chart', 1)
+    ON CONFLICT(person_id, kind) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_person_update_version AFTER UPDATE ON person
+BEGIN
+    INSERT INTO data_version (person_id, kind, version) VALUES (NEW.id, 'chart', 1)
+    ON CONFLICT(person_id, kind) DO UPDATE SET version = version + 1;
+END;
+
+-- Kept on delete: a reused person id continues from the old version
+CREATE TRIGGER IF NOT EXISTS trg_person_delete_version AFTER DELETE ON person
+BEGIN
+    INSERT INTO data_version (person_id, kind, version) VALUES (OLD.id, 'chart', 1)
+    ON CONFLICT(person_id, kind) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_dasha_insert_version AFTER INSERT ON dasha
+BEGIN
+    INSERT INTO data_version (person_id, kind, version) VALUES (NEW.person_id, 'dasha', 1)
+    ON CONFLICT(person_id, kind) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_dasha_update_version AFTER UPDATE ON dasha
+BEGIN
+    INSERT INTO data_version (person_id, kind, version) VALUES (NEW.person_id, 'dasha', 1)
+    ON CONFLICT(person_id, kind) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_dasha_delete_version AFTER DELETE ON dasha
+BEGIN
+    INSERT INTO data_version (person_id, kind, version) VALUES (OLD.person_id, 'dasha', 1)
+    ON CONFLICT(person_id, kind) DO UPDATE SET version = version + 1;
+END;
+
+-- Regime snapshots are derived from the dasha periods and natal houses;
+-- drop a person's snapshots when either is rewritten so get_astro_regime
+-- recomputes them instead of serving the old ones
+CREATE TRIGGER IF NOT EXISTS trg_dasha_insert_regime AFTER INSERT ON dasha
+BEGIN
+    DELETE FROM astro_regime_snapshot WHERE person_id = NEW.person_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_dasha_update_regime AFTER UPDATE ON dasha
+BEGIN
+    DELETE FROM astro_regime_snapshot WHERE person_id IN (OLD.person_id, NEW.person_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_dasha_delete_regime AFTER DELETE ON dasha
+BEGIN
+    DELETE FROM astro_regime_snapshot WHERE person_id = OLD.person_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_natal_planet_insert_regime AFTER INSERT ON natal_planet
+BEGIN
+    DELETE FROM astro_regime_snapshot WHERE person_id = NEW.person_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_natal_planet_update_regime AFTER UPDATE ON natal_planet
+BEGIN
+    DELETE FROM astro_regime_snapshot WHERE person_id IN (OLD.person_id, NEW.person_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_natal_planet_delete_regime AFTER DELETE ON natal_planet
+BEGIN
+    DELETE FROM astro_regime_snapshot WHERE person_id = OLD.person_id;
+END;
+
 -- =============================================
 -- CATEGORY 5: ENTITY / FINANCIAL (2 tables)
 -- =============================================
@@ -421,9 +544,13 @@ CREATE TABLE IF NOT EXISTS entity_natal_planet (
 );
 
 -- =============================================
--- INDEXES (14 indexes on common query patterns)
+-- INDEXES (16 indexes on common query patterns)
 -- =============================================
 
+-- Name prefix lookups (LIKE 'x%' can use a NOCASE index)
+CREATE INDEX IF NOT EXISTS idx_person_name
+    ON person(name COLLATE NOCASE);
+
 -- Dasha lookups by person + date range
 CREATE INDEX IF NOT EXISTS idx_dasha_person_dates
     ON dasha(person_id, start_date, end_date);
@@ -436,6 +563,10 @@ CREATE INDEX IF NOT EXISTS idx_dasha_parent
 CREATE INDEX IF NOT EXISTS idx_dasha_level
     ON dasha(person_id, level);
 
+-- Periods starting in a date window, across all persons (notifications)
+CREATE INDEX IF NOT EXISTS idx_dasha_start
+    ON dasha(start_date, level);
+
 -- Transit position by date
 CREATE INDEX IF NOT EXISTS idx_transit_position_date
     ON transit_position(date);
@@ -481,8 +612,9 @@ CREATE INDEX IF NOT EXISTS idx_planet_sector
     ON ref_planet_sector(planet);
 
 -- =============================================
--- CATEGORY 6: INTERPRETATION ENGINE (4 ref tables)
--- Life themes, karmic axis, planet-house & planet-theme meanings
+-- CATEGORY 6: INTERPRETATION ENGINE (5 ref tables)
+-- Life themes, karmic axis, planet-house & planet-theme meanings,
+-- declarative scoring rules
 -- =============================================
 
 -- 16. ref_life_theme: theme → planet/house mapping for interpretation
@@ -529,8 +661,18 @@ CREATE TABLE IF NOT EXISTS ref_planet_theme_meaning (
     FOREIGN KEY (theme)  REFERENCES ref_life_theme(theme)
 );
 
+-- 20. ref_rule: declarative scoring rules (syntax: rules/dsl.py)
+CREATE TABLE IF NOT EXISTS ref_rule (
+    rule_set    TEXT NOT NULL,         -- 'career', 'trading', ...
+    rule_id     TEXT NOT NULL,
+    expression  TEXT NOT NULL,         -- "Saturn in house 10 and dignity in (own, exalted) -> 0.8"
+    description TEXT,
+    is_active   INTEGER NOT NULL DEFAULT 1,
+    PRIMARY KEY (rule_set, rule_id)
+);
+
 -- =============================================
--- CATEGORY 7: EVENT SOURCING (2 tables)
+-- CATEGORY 7: EVENT SOURCING (4 tables)
 -- Immutable event log + user feedback for RL
 -- =============================================
 
@@ -553,7 +695,8 @@ CREATE TABLE IF NOT EXISTS event_log (
 
 CREATE INDEX IF NOT EXISTS idx_event_log_person ON event_log(person_id);
 CREATE INDEX IF NOT EXISTS idx_event_log_session ON event_log(session_id);
-CREATE INDEX IF NOT EXISTS idx_event_log_theme ON event_log(detected_themes);
+-- detected_themes is a JSON blob no query filters on: its index only cost writes
+DROP INDEX IF EXISTS idx_event_log_theme;
 CREATE INDEX IF NOT EXISTS idx_event_log_timestamp ON event_log(timestamp);
 
 -- event_feedback: user ratings (separate from log for clean separation)
@@ -567,3 +710,60 @@ CREATE TABLE IF NOT EXISTS event_feedback (
 );
 
 CREATE INDEX IF NOT EXISTS idx_event_feedback_event ON event_feedback(event_id);
+
+-- variant_stats: feedback aggregated per interpretation variant, maintained
+-- by event_store.log_feedback (rebuild: event_store.rebuild_variant_stats)
+CREATE TABLE IF NOT EXISTS variant_stats (
+    planet      TEXT NOT NULL,
+    key_type    TEXT NOT NULL,          -- 'house', 'theme', 'rahu_ketu'
+    key         TEXT NOT NULL,          -- house number or theme, as text
+    variant_id  INTEGER NOT NULL,
+    sum_rating  REAL NOT NULL DEFAULT 0,
+    n           INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (planet, key_type, key, variant_id)
+) WITHOUT ROWID;
+
+-- event_daily_rollup: per-day aggregates of events aged out of event_log
+-- (agent/retention.py); raw rows move to compressed NDJSON segments
+CREATE TABLE IF NOT EXISTS event_daily_rollup (
+    day             TEXT NOT NULL,      -- YYYY-MM-DD (UTC, from event_log.timestamp)
+    detected_intent TEXT NOT NULL,      -- 'unknown' when the event had none
+    events          INTEGER NOT NULL,
+    sessions        INTEGER NOT NULL,   -- distinct session_id
+    persons         INTEGER NOT NULL,   -- distinct person_id
+    rated_events    INTEGER NOT NULL,   -- events with at least one rating
+    ratings         INTEGER NOT NULL,
+    sum_rating      REAL NOT NULL,
+    PRIMARY KEY (day, detected_intent)
+) WITHOUT ROWID;
+
+-- =============================================
+-- CATEGORY 8: AGENT STATE (3 tables)
+-- Conversation sessions persisted across restarts
+-- =============================================
+
+-- agent_session: serialized session dict per transport session_id
+CREATE TABLE IF NOT EXISTS agent_session (
+    session_id  TEXT PRIMARY KEY,
+    data        TEXT NOT NULL,          -- JSON: session dict (see agent._make_session)
+    updated_at  REAL NOT NULL           -- unix time of last access
+);
+
+CREATE INDEX IF NOT EXISTS idx_agent_session_updated ON agent_session(updated_at);
+
+-- session_state: newest event_log id per session, written in the same
+-- transaction as the events (event_store.write_events); restores a
+-- session's rating target after a restart
+CREATE TABLE IF NOT EXISTS session_state (
+    session_id    TEXT PRIMARY KEY,
+    last_event_id INTEGER NOT NULL,
+    updated_at    REAL NOT NULL         -- unix time of that event's write
+) WITHOUT ROWID;
+
+-- notification_watermark: last date each notification source has been
+-- scanned through (engine.notifications); a run resumes after it
+CREATE TABLE IF NOT EXISTS notification_watermark (
+    source          TEXT PRIMARY KEY,   -- 'dasha' | 'transit_event'
+    scanned_through TEXT NOT NULL,      -- YYYY-MM-DD, inclusive
+    updated_at      REAL NOT NULL       -- unix time of the run
+) WITHOUT ROWID;
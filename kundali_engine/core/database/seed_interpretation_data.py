@@ -1,11 +1,12 @@
 """
 Seed interpretation tables: ref_life_theme, ref_rahu_ketu_axis,
-ref_planet_house_meaning, ref_planet_theme_meaning.
+ref_planet_house_meaning, ref_planet_theme_meaning, ref_rule.
 
 Source: VEDIC_ASTROLOGY.md + classical Jyotish texts.
 """
 import json
 from .connection import get_connection
+from .reference import bump_reference_version
 
 
 def seed_interpretation_tables():
@@ -16,10 +17,12 @@ def seed_interpretation_tables():
     _seed_ref_rahu_ketu_axis(cur)
     _seed_ref_planet_house_meaning(cur)
     _seed_ref_planet_theme_meaning(cur)
+    _seed_ref_rule(cur)
 
+    bump_reference_version(conn)
     conn.commit()
     conn.close()
-    print("Seeded 4 interpretation tables")
+    print("Seeded 5 interpretation tables")
 
 
 # ─── 1. ref_life_theme (~40 rows) ────────────────────────────────────────────
@@ -2071,12 +2074,67 @@ def _seed_ref_planet_theme_meaning(cur):
     )
 
 
+# ─── 5. ref_rule (declarative scoring rules, syntax in rules/dsl.py) ─────────
+
+def _seed_ref_rule(cur):
+    rules = [
+        # (rule_set, rule_id, expression, description)
+
+        # ── CAREER ──
+        ("career", "saturn_10th",
+         "Saturn in house 10 -> 0.8",
+         "Saturn in the 10th: career built through discipline and persistence"),
+        ("career", "saturn_10th_strong",
+         "Saturn in house 10 and dignity in (own, exalted, moolatrikona) -> 0.9",
+         "Dignified Saturn in the 10th: lasting authority and structure"),
+        ("career", "sun_10th",
+         "Sun in house 10 and not combust -> 0.8",
+         "Sun in the 10th: recognition and leadership roles"),
+        ("career", "tenth_dusthana_malefic",
+         "Saturn in house (6, 8, 12) and dignity in (debilitated, enemy) -> 0.3",
+         "Weak Saturn in a dusthana: delays and setbacks at work"),
+        ("career", "mercury_strong_kendra",
+         "Mercury in house (1, 4, 7, 10) and dignity in (own, exalted) -> 0.7",
+         "Strong Mercury in a kendra: commerce, analysis, communication"),
+
+        # ── WEALTH ──
+        ("wealth", "jupiter_dhana",
+         "Jupiter in house (2, 5, 9, 11) and dignity != debilitated -> 0.8",
+         "Jupiter in a wealth/fortune house"),
+        ("wealth", "venus_2nd_11th",
+         "Venus in house (2, 11) -> 0.7",
+         "Venus in the 2nd or 11th: income through comforts and relationships"),
+        ("wealth", "rahu_11th",
+         "Rahu in house 11 -> 0.7",
+         "Rahu in the 11th: large, unconventional gains"),
+        ("wealth", "moon_debilitated",
+         "Moon dignity == debilitated -> 0.3",
+         "Debilitated Moon: emotional spending and unstable finances"),
+
+        # ── TRADING ──
+        ("trading", "mars_rahu_upachaya",
+         "Mars in house (3, 6, 10, 11) or Rahu in house (3, 6, 10, 11) -> 0.7",
+         "Mars/Rahu in upachaya houses: appetite for calculated risk"),
+        ("trading", "mercury_retrograde",
+         "Mercury is retrograde -> 0.4",
+         "Retrograde Mercury: second-guessing and reversals"),
+        ("trading", "saturn_8th",
+         "Saturn in house 8 -> 0.3",
+         "Saturn in the 8th: sudden losses, favour capital protection"),
+    ]
+    cur.executemany(
+        "INSERT OR REPLACE INTO ref_rule (rule_set, rule_id, expression, description) "
+        "VALUES (?,?,?,?)",
+        rules,
+    )
+
+
 def print_counts():
     conn = get_connection()
     cur = conn.cursor()
     tables = [
         "ref_life_theme", "ref_rahu_ketu_axis",
-        "ref_planet_house_meaning", "ref_planet_theme_meaning",
+        "ref_planet_house_meaning", "ref_planet_theme_meaning", "ref_rule",
     ]
     for t in tables:
         cur.execute(f"SELECT COUNT(*) FROM {t}")
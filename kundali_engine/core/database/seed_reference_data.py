@@ -4,6 +4,7 @@ Source: VEDIC_ASTROLOGY.md and standard Jyotish texts.
 """
 import json
 from .connection import get_connection
+from .reference import bump_reference_version
 
 
 def seed_all():
@@ -26,6 +27,7 @@ def seed_all():
     _seed_ref_planet_commodity(cur)
     _seed_ref_strategy_class(cur)
 
+    bump_reference_version(conn)
     conn.commit()
     conn.close()
     print("Seeded all 15 reference tables")
@@ -0,0 +1,147 @@
+"""
+Local birth time → UTC with historical offsets from the IANA zone database.
+
+    to_utc(datetime(1942, 3, 1, 6, 10), "Asia/Kolkata")   # war time, +6:30
+    to_utc_batch(local_array, zones)                       # datetime64[s] arrays
+
+Zones are IANA names ("Asia/Kolkata", "America/New_York"), fixed offsets
+("UTC+05:30", "+0545", "GMT-4"), or one of the ALIASES used in older
+chart data. An abbreviation names the region it is used for, so "IST"
+resolves through Asia/Kolkata and includes pre-1947 and war-time offsets,
+and "EST" resolves through America/New_York including DST. GMT and UTC
+stay fixed at +0. Unknown names raise ValueError instead of falling back
+to a default offset.
+
+Single conversions use ZoneInfo.utcoffset on a cached zone. The batch
+path caches a transition table per (zone, year): the local seconds at
+which each offset takes effect, found by sampling the zone weekly and
+bisecting to the second where the offset changes. Every row of a zone is
+then resolved with one searchsorted over its tables, so a million births
+cost a few hundred zone-year tables instead of a million utcoffset calls.
+Two transitions less than a week apart that return to the same offset
+would be missed; the zone database has none for birth dates.
+
+Local times that are skipped or repeated at a transition resolve with
+fold=0, i.e. with the offset in force before the transition.
+"""
+import re
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+import numpy as np
+
+ALIASES = {
+    "IST": "Asia/Kolkata",
+    "UTC": "UTC",
+    "GMT": "UTC",
+    "EST": "America/New_York",
+    "CST": "America/Chicago",
+    "MST": "America/Denver",
+    "PST": "America/Los_Angeles",
+    "CET": "Europe/Berlin",
+    "JST": "Asia/Tokyo",
+    "AEST": "Australia/Sydney",
+    "GST": "Asia/Dubai",
+    "SGT": "Asia/Singapore",
+    "HKT": "Asia/Hong_Kong",
+    "NPT": "Asia/Kathmandu",
+    "PKT": "Asia/Karachi",
+}
+
+YEAR_CACHE_SIZE = 16_384
+SAMPLE_SECONDS = 7 * 86_400   # transition scan step
+
+_FIXED = re.compile(r"^(?:UTC|GMT)?\s*([+-])(\d{1,2})(?::?(\d{2}))?$")
+_EPOCH = datetime(1970, 1, 1)
+_SECOND = timedelta(seconds=1)
+
+
+@lru_cache(maxsize=1024)
+def get_zone(name):
+    """tzinfo for a zone name, fixed offset or alias (ValueError if unknown)."""
+    key = (name or "").strip()
+    key = ALIASES.get(key.upper(), key)
+    m = _FIXED.match(key.upper())
+    if m:
+        sign, hours, minutes = m.group(1), int(m.group(2)), int(m.group(3) or 0)
+        if hours > 14 or minutes > 59:
+            raise ValueError(f"Invalid UTC offset: {name!r}")
+        offset = timedelta(hours=hours, minutes=minutes)
+        return timezone(-offset if sign == "-" else offset)
+    try:
+        return ZoneInfo(key)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValueError(f"Unknown timezone: {name!r}") from None
+
+
+def _offset_at(tz, seconds):
+    """Offset in seconds at a local time given as seconds since 1970-01-01."""
+    return int(tz.utcoffset(_EPOCH + timedelta(seconds=seconds)).total_seconds())
+
+
+@lru_cache(maxsize=YEAR_CACHE_SIZE)
+def _year_table(zone, year):
+    """
+    (starts, offsets) for a local year: offsets[i] is in force from local
+    second starts[i] (seconds since 1970-01-01) until starts[i + 1].
+    """
+    tz = get_zone(zone)
+    lo = (datetime(year, 1, 1) - _EPOCH) // _SECOND
+    last = (datetime(year + 1, 1, 1) - _EPOCH) // _SECOND - 1
+    starts, offsets = [lo], [_offset_at(tz, lo)]
+    t = lo
+    while t < last:
+        probe = min(t + SAMPLE_SECONDS, last)
+        if _offset_at(tz, probe) == offsets[-1]:
+            t = probe
+            continue
+        # Bisect to the first second with a different offset
+        before, after = t, probe
+        while after - before > 1:
+            mid = (before + after) // 2
+            if _offset_at(tz, mid) == offsets[-1]:
+                before = mid
+            else:
+                after = mid
+        starts.append(after)
+        offsets.append(_offset_at(tz, after))
+        t = after
+    return np.array(starts, dtype=np.int64), np.array(offsets, dtype=np.int64)
+
+
+def utc_offset(local, zone):
+    """UTC offset (timedelta) in force at a naive local datetime."""
+    return get_zone(zone).utcoffset(local.replace(tzinfo=None))
+
+
+def to_utc(local, zone):
+    """Naive UTC datetime for a naive local datetime in `zone`."""
+    return local - utc_offset(local, zone)
+
+
+def to_utc_batch(local, zones):
+    """
+    Vectorized to_utc: `local` is a 1-D array of naive local times
+    (anything np.asarray accepts as datetime64), `zones` one zone name for
+    all rows or a sequence with one per row. Returns UTC as datetime64[s].
+    """
+    local = np.asarray(local, dtype="datetime64[s]").ravel()
+    if isinstance(zones, str):
+        names, codes = [zones], np.zeros(len(local), dtype=np.int64)
+    else:
+        index = {}
+        codes = np.fromiter((index.setdefault(z, len(index)) for z in zones),
+                            dtype=np.int64, count=len(local))
+        names = list(index)
+    seconds = local.astype(np.int64)
+    years = local.astype("datetime64[Y]").astype(np.int64) + 1970
+
+    offsets = np.empty(len(local), dtype=np.int64)
+    for code, zone in enumerate(names):
+        rows = np.nonzero(codes == code) if len(names) > 1 else slice(None)
+        tables = [_year_table(zone, y) for y in np.unique(years[rows]).tolist()]
+        starts = np.concatenate([t[0] for t in tables])
+        table = np.concatenate([t[1] for t in tables])
+        offsets[rows] = table[np.searchsorted(starts, seconds[rows], side="right") - 1]
+    return local - offsets.astype("timedelta64[s]")
@@ -18,17 +18,20 @@ Usage:
   people.json can be a single object or an array of objects.
 
 Required JSON fields: name, dob (YYYY-MM-DD), tob (HH:MM), lat, lon
-Optional: place, tz (default "IST")
+Optional: place, tz (default "IST"; an IANA zone such as "Asia/Kolkata",
+an alias from core.timezones.ALIASES, or an offset such as "UTC+05:30")
 """
 import json
 import sys
 import math
-from datetime import datetime, timedelta
+from datetime import datetime
 from pathlib import Path
 
+import numpy as np
 from skyfield.api import load as sky_load
 
-from kundali_engine.core.database.connection import get_connection
+from kundali_engine.core.database.connection import pooled_connection
+from kundali_engine.core.timezones import to_utc
 
 # ---------------------------------------------------------------------------
 # Constants
@@ -98,15 +101,17 @@ COMBUSTION = {
     "Jupiter": (11, 11), "Venus": (10, 8), "Saturn": (15, 15),
 }
 
-TZ_OFFSETS = {
-    "IST": 5.5, "UTC": 0, "EST": -5, "CST": -6, "PST": -8,
-    "GMT": 0, "CET": 1, "JST": 9, "AEST": 10,
-}
-
 # ---------------------------------------------------------------------------
 # Ephemeris computation
 # ---------------------------------------------------------------------------
 
+# Skyfield body names
+BODY_MAP = {
+    "Sun": "sun", "Moon": "moon", "Mars": "mars",
+    "Mercury": "mercury", "Jupiter": "jupiter barycenter",
+    "Venus": "venus", "Saturn": "saturn barycenter",
+}
+
 # Lazy-load skyfield data (cached after first call)
 _ts = None
 _eph = None
@@ -135,12 +140,11 @@ def compute_planetary_positions(dob_str, tob_str, lat, lon, tz_str="IST"):
         planet, sign, house, sidereal_longitude, degree_in_sign,
         nakshatra, nakshatra_pada, is_retrograde, speed, dignity, is_combust
     """
-    ts, eph = _get_ephemeris()
-
-    # Parse date/time and convert to UTC
+    # Parse date/time and convert to UTC (historical offset for the zone)
     dt_local = datetime.fromisoformat(f"{dob_str}T{tob_str}")
-    tz_offset = TZ_OFFSETS.get(tz_str.upper(), 5.5)
-    dt_utc = dt_local - timedelta(hours=tz_offset)
+    dt_utc = to_utc(dt_local, tz_str)
+
+    ts, eph = _get_ephemeris()
 
     t = ts.utc(dt_utc.year, dt_utc.month, dt_utc.day,
                dt_utc.hour, dt_utc.minute, dt_utc.second)
@@ -151,17 +155,10 @@ def compute_planetary_positions(dob_str, tob_str, lat, lon, tz_str="IST"):
 
     earth = eph['earth']
 
-    # Skyfield body names
-    body_map = {
-        "Sun": "sun", "Moon": "moon", "Mars": "mars",
-        "Mercury": "mercury", "Jupiter": "jupiter barycenter",
-        "Venus": "venus", "Saturn": "saturn barycenter",
-    }
-
     # Compute tropical ecliptic longitudes
     tropical = {}
     speeds = {}
-    for planet, body_name in body_map.items():
+    for planet, body_name in BODY_MAP.items():
         body = eph[body_name]
         astrometric = earth.at(t).observe(body)
         _, ecl_lon, _ = astrometric.ecliptic_latlon()
@@ -251,6 +248,37 @@ def compute_planetary_positions(dob_str, tob_str, lat, lon, tz_str="IST"):
     return lagna_sign, round(lagna_degree, 4), planets
 
 
+def sidereal_positions(t):
+    """
+    Sidereal longitude and daily speed of all 9 planets at Skyfield time `t`.
+
+    `t` may be a single Time or a Time array: each body is observed once
+    for the whole array, so thousands of dates cost about as much as one.
+    Returns {planet: (sidereal_longitude, speed)} with values shaped like `t`.
+    """
+    ts, eph = _get_ephemeris()
+    earth = eph['earth']
+    ayanamsa = _lahiri_ayanamsa(t.tt)
+    t_next = ts.tt_jd(t.tt + 1.0)
+
+    result = {}
+    for planet, body_name in BODY_MAP.items():
+        body = eph[body_name]
+        _, ecl_lon, _ = earth.at(t).observe(body).ecliptic_latlon()
+        _, ecl_lon_next, _ = earth.at(t_next).observe(body).ecliptic_latlon()
+        speed = (ecl_lon_next.degrees - ecl_lon.degrees + 180) % 360 - 180
+        result[planet] = ((ecl_lon.degrees - ayanamsa) % 360, speed)
+
+    # Mean lunar nodes (same formula as _compute_lunar_nodes)
+    T = (t.tt - 2451545.0) / 36525.0
+    omega = (125.04452 - 1934.136261 * T + 0.0020708 * T * T) % 360
+    rahu = (omega - ayanamsa) % 360
+    node_speed = np.full_like(rahu, -0.053, dtype=float)
+    result["Rahu"] = (rahu, node_speed)
+    result["Ketu"] = ((rahu + 180) % 360, node_speed)
+    return result
+
+
 def _compute_lunar_nodes(t, jd, ayanamsa, sidereal, speeds):
     """Compute mean Rahu/Ketu using standard formula."""
     # Mean longitude of Rahu (ascending node)
@@ -303,6 +331,23 @@ def _compute_lagna_degree(dt_utc, lat, lon, t):
     return asc
 
 
+def _compute_lagna_degrees(t, lat, lon):
+    """Vectorized _compute_lagna_degree over a Time array and lat/lon arrays."""
+    lst = (t.gmst * 15.0 + lon) % 360
+
+    T = (t.tt - 2451545.0) / 36525.0
+    eps_rad = np.radians(23.4393 - 0.0130 * T)
+    lat_rad = np.radians(lat)
+    lst_rad = np.radians(lst)
+
+    numerator = -np.cos(lst_rad)
+    denominator = np.sin(eps_rad) * np.tan(lat_rad) + np.cos(eps_rad) * np.sin(lst_rad)
+    ratio = np.divide(numerator, denominator,
+                      out=np.zeros_like(numerator), where=denominator != 0)
+    asc = np.degrees(np.arctan(ratio))
+    return np.where(lst >= 180, asc % 180, asc % 180 + 180)
+
+
 def _compute_dignity(planet, sign, deg_in_sign):
     """Determine dignity level of a planet in a sign."""
     # Exaltation
@@ -356,36 +401,35 @@ def _sign_ruler(sign):
 
 def store_kundali(person_data, lagna_sign, lagna_degree, planets):
     """Store person + natal planets in the v2 database."""
-    conn = get_connection()
-    cur = conn.cursor()
-
-    # Insert or update person
-    cur.execute(
-        """INSERT OR REPLACE INTO person
-           (name, dob, tob, latitude, longitude, timezone, place_name, ayanamsa, lagna_sign, lagna_degree)
-           VALUES (?, ?, ?, ?, ?, ?, ?, 'Lahiri', ?, ?)""",
-        (person_data["name"], person_data["dob"], person_data["tob"],
-         person_data["lat"], person_data["lon"],
-         person_data.get("tz", "IST"), person_data.get("place", ""),
-         lagna_sign, lagna_degree),
-    )
-    person_id = cur.lastrowid
+    with pooled_connection() as conn:
+        cur = conn.cursor()
 
-    # Insert natal planets
-    for p in planets:
+        # Insert or update person
         cur.execute(
-            """INSERT OR REPLACE INTO natal_planet
-               (person_id, planet, sign, house, sidereal_longitude, degree_in_sign,
-                nakshatra, nakshatra_pada, is_retrograde, is_combust, dignity, speed, strength)
-               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 1.0)""",
-            (person_id, p["planet"], p["sign"], p["house"],
-             p["sidereal_longitude"], p["degree_in_sign"],
-             p["nakshatra"], p["nakshatra_pada"],
-             p["is_retrograde"], p["is_combust"], p["dignity"], p["speed"]),
+            """INSERT OR REPLACE INTO person
+               (name, dob, tob, latitude, longitude, timezone, place_name, ayanamsa, lagna_sign, lagna_degree)
+               VALUES (?, ?, ?, ?, ?, ?, ?, 'Lahiri', ?, ?)""",
+            (person_data["name"], person_data["dob"], person_data["tob"],
+             person_data["lat"], person_data["lon"],
+             person_data.get("tz", "IST"), person_data.get("place", ""),
+             lagna_sign, lagna_degree),
         )
-
-    conn.commit()
-    conn.close()
+        person_id = cur.lastrowid
+
+        # Insert natal planets
+        for p in planets:
+            cur.execute(
+                """INSERT OR REPLACE INTO natal_planet
+                   (person_id, planet, sign, house, sidereal_longitude, degree_in_sign,
+                    nakshatra, nakshatra_pada, is_retrograde, is_combust, dignity, speed, strength)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 1.0)""",
+                (person_id, p["planet"], p["sign"], p["house"],
+                 p["sidereal_longitude"], p["degree_in_sign"],
+                 p["nakshatra"], p["nakshatra_pada"],
+                 p["is_retrograde"], p["is_combust"], p["dignity"], p["speed"]),
+            )
+
+        conn.commit()
     return person_id
 
 
@@ -1,7 +1,27 @@
+"""
+Astro trading regime per person per day.
+
+Regimes for a whole (person, date-range) are computed in one pass: the
+active maha dasha lord for every date comes from an in-memory
+DashaTimeline, transit houses from a TransitTable, and the regime rules
+are applied as array lookups. Results are written to
+astro_regime_snapshot, and get_astro_regime() serves repeated requests
+for the same person/day from that table. Triggers on dasha and
+natal_planet (schema_v2.sql) delete a person's snapshots whenever either
+is rewritten, so a recomputed chart never meets a stale regime.
+"""
+import json
 import sqlite3
 from datetime import date
 from dataclasses import dataclass
 
+import numpy as np
+
+from kundali_engine.chart.frame import PLANETS, PLANET_INDEX, SIGN_INDEX
+from kundali_engine.core.database.connection import get_connection, pooled_connection
+from kundali_engine.time_engine.dasha import DashaTimeline, DASHA_LEVELS
+from kundali_engine.time_engine.transit import TransitTable
+
 @dataclass
 class AstroRegime:
     directional_bias: str
@@ -30,69 +50,233 @@ PLANET_SECTOR_MAP = {
     "Ketu": ["Pharma", "Research"]
 }
 
-def compute_astro_regime(db="astro.db", person_id=1) -> AstroRegime:
-    conn = sqlite3.connect(db)
-    cur = conn.cursor()
+DIRECTIONS = ["neutral", "bullish", "bearish"]
+VOLATILITIES = ["neutral", "contract", "expand"]
+DUSTHANA = (6, 8, 12)
+
+# Dasha lord → (direction, volatility, risk, reason)
+LORD_BIAS = {
+    "Jupiter": ("bullish", "neutral", 1.2, "Jupiter dasha favors risk-on"),
+    "Mars": ("bullish", "neutral", 1.2, "Mars dasha favors risk-on"),
+    "Saturn": ("neutral", "contract", 0.7, "Saturn dasha → capital protection"),
+    "Rahu": ("neutral", "expand", 1.0, "Rahu dasha → convexity & speculation"),
+}
+NATAL_DUSTHANA_FACTOR = 0.7
+TRANSIT_DUSTHANA_FACTOR = 0.85
+
+
+# ── Vectorized core ───────────────────────────────────────────────────────
+
+# Lookup tables indexed by lord code in PLANETS order; the extra last slot
+# is "no active dasha", so a lord code of -1 lands on it.
+_DIRECTION = np.zeros(len(PLANETS) + 1, dtype=np.int8)
+_VOLATILITY = np.zeros(len(PLANETS) + 1, dtype=np.int8)
+_RISK = np.ones(len(PLANETS) + 1)
+for _planet, (_dir, _vol, _risk, _) in LORD_BIAS.items():
+    _DIRECTION[PLANET_INDEX[_planet]] = DIRECTIONS.index(_dir)
+    _VOLATILITY[PLANET_INDEX[_planet]] = VOLATILITIES.index(_vol)
+    _RISK[PLANET_INDEX[_planet]] = _risk
+
 
-    # Active Mahadasha
-    cur.execute("""
-        SELECT planet FROM dasha
-        WHERE person_id=? AND level='maha'
-    """, (person_id,))
-    dasha_planet = cur.fetchone()[0]
+def lord_codes(lords):
+    """Object array of planet names (or None) → int codes (-1 for none)."""
+    return np.array([PLANET_INDEX.get(p, -1) for p in np.ravel(lords)],
+                    dtype=np.int8).reshape(np.shape(lords))
 
-    # Natal placement
-    cur.execute("""
-        SELECT house, strength FROM natal_planet
-        WHERE person_id=? AND planet=?
-    """, (person_id, dasha_planet))
-    house, strength = cur.fetchone()
 
+def regime_arrays(lord, natal_house, strength, transit_house=None):
+    """
+    Regime for any number of (person, date) cells at once.
+
+    All arguments are same-shaped arrays: maha lord code, natal house of
+    the lord, natal strength of the lord, and (optionally) the house the
+    lord is transiting from the natal lagna (0 = unknown).
+    Returns (direction codes, volatility codes, risk multipliers).
+    """
+    direction = _DIRECTION[lord]
+    volatility = _VOLATILITY[lord]
+    risk = _RISK[lord] * np.where(np.isin(natal_house, DUSTHANA), NATAL_DUSTHANA_FACTOR, 1.0)
+    if transit_house is not None:
+        risk = risk * np.where(np.isin(transit_house, DUSTHANA), TRANSIT_DUSTHANA_FACTOR, 1.0)
+    return direction, volatility, np.round(risk * strength, 2)
+
+
+def strategy_class(directional, vol):
+    if directional == "bullish":
+        return "bullish_defined"
+    if directional == "bearish":
+        return "bearish_defined"
+    if vol == "expand":
+        return "long_vol"
+    return "neutral_income"
+
+
+def strategies_for(directional, vol):
+    return STRATEGY_CLASSES[strategy_class(directional, vol)]
+
+
+def explain_regime(lord, natal_house, transit_house=0):
     explanation = []
-    risk = 1.0
-    directional = "neutral"
-    vol = "neutral"
-
-    # Dasha-based logic
-    if dasha_planet in ("Jupiter", "Mars"):
-        directional = "bullish"
-        risk = 1.2
-        explanation.append(f"{dasha_planet} dasha favors risk-on")
-
-    if dasha_planet == "Saturn":
-        risk = 0.7
-        vol = "contract"
-        explanation.append("Saturn dasha → capital protection")
-
-    if dasha_planet == "Rahu":
-        vol = "expand"
-        explanation.append("Rahu dasha → convexity & speculation")
-
-    # House-based modifier
-    if house in (6, 8, 12):
-        risk *= 0.7
+    if lord in LORD_BIAS:
+        explanation.append(LORD_BIAS[lord][3])
+    if natal_house in DUSTHANA:
         explanation.append("Dasha planet in dusthana → reduce exposure")
+    if transit_house in DUSTHANA:
+        explanation.append(f"{lord} transiting house {transit_house} → trim position size")
+    return explanation
 
-    # Strategy filter
-    if directional == "bullish":
-        strategies = STRATEGY_CLASSES["bullish_defined"]
-    elif directional == "bearish":
-        strategies = STRATEGY_CLASSES["bearish_defined"]
-    elif vol == "expand":
-        strategies = STRATEGY_CLASSES["long_vol"]
-    else:
-        strategies = STRATEGY_CLASSES["neutral_income"]
 
-    # Sector bias
-    sectors = PLANET_SECTOR_MAP.get(dasha_planet, [])
+# ── Range computation ─────────────────────────────────────────────────────
+
+def _natal(conn, person_id):
+    lagna = conn.execute("SELECT lagna_sign FROM person WHERE id = ?", (person_id,)).fetchone()
+    rows = conn.execute(
+        "SELECT planet, house, strength FROM natal_planet WHERE person_id = ?",
+        (person_id,),
+    ).fetchall()
+    house = np.zeros(len(PLANETS) + 1, dtype=np.int8)
+    strength = np.ones(len(PLANETS) + 1)
+    for planet, h, s in rows:
+        j = PLANET_INDEX.get(planet)
+        if j is not None:
+            house[j] = h or 0
+            strength[j] = 1.0 if s is None else s
+    return SIGN_INDEX.get(lagna[0] if lagna else None, -1), house, strength
+
+
+def compute_regime_range(person_id, start, end, conn=None, transits=None, store=True):
+    """
+    Regimes for every day from start to end (inclusive) in one pass.
+
+    Transit positions come from `transits` or the transit_position table;
+    days without transit data simply skip the transit modifier. Days with
+    no active maha dasha are left out. Returns {iso_date: AstroRegime} and,
+    if store is set, upserts the rows into astro_regime_snapshot.
+    """
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
+    try:
+        dates = np.arange(np.datetime64(str(start), "D"), np.datetime64(str(end), "D") + 1)
+        timeline = DashaTimeline.from_db(person_id, conn)
+        lagna, natal_house, strength = _natal(conn, person_id)
+        if transits is None:
+            transits = TransitTable.from_db(start, end, conn)
+
+        maha = timeline.lords(dates, "maha")
+        sub = {level: timeline.lords(dates, level) for level in DASHA_LEVELS[1:]}
+        lord = lord_codes(maha)
+
+        # Transit house of the dasha lord from the natal lagna, per date.
+        tsign = np.full(len(dates), -1, dtype=np.int16)
+        if len(transits) and lagna >= 0:
+            rows = np.searchsorted(transits.dates, dates)
+            found = rows < len(transits)
+            found[found] = transits.dates[rows[found]] == dates[found]
+            has_lord = found & (lord >= 0)
+            tsign[has_lord] = transits.sign[rows[has_lord], lord[has_lord]]
+        transit_house = np.where(tsign >= 0, (tsign - lagna) % 12 + 1, 0)
+
+        direction, volatility, risk = regime_arrays(
+            lord, natal_house[lord], strength[lord], transit_house,
+        )
+
+        result, rows = {}, []
+        for d in np.flatnonzero(lord >= 0):
+            day = str(dates[d])
+            planet = maha[d]
+            directional = DIRECTIONS[direction[d]]
+            vol = VOLATILITIES[volatility[d]]
+            regime = AstroRegime(
+                directional_bias=directional,
+                volatility_bias=vol,
+                risk_multiplier=float(risk[d]),
+                allowed_strategies=strategies_for(directional, vol),
+                favored_sectors=PLANET_SECTOR_MAP.get(planet, []),
+                explanation=explain_regime(planet, natal_house[lord[d]], transit_house[d]),
+            )
+            result[day] = regime
+            dasha_context = {"maha": planet, **{k: v[d] for k, v in sub.items()}}
+            transit_context = {"lord_transit_house": int(transit_house[d]) or None}
+            rows.append((
+                person_id, day, regime.directional_bias, regime.volatility_bias,
+                regime.risk_multiplier, json.dumps(regime.allowed_strategies),
+                json.dumps(regime.favored_sectors), "\n".join(regime.explanation),
+                json.dumps(dasha_context), json.dumps(transit_context),
+            ))
 
-    conn.close()
+        if store and rows:
+            conn.executemany(
+                """INSERT OR REPLACE INTO astro_regime_snapshot
+                   (person_id, date, directional_bias, volatility_bias,
+                    risk_multiplier, allowed_strategies, favored_sectors,
+                    explanation, dasha_context, transit_context)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                rows,
+            )
+            conn.commit()
+        return result
+    finally:
+        if own_conn:
+            conn.close()
 
+
+# ── Single-day access ─────────────────────────────────────────────────────
+
+def _from_snapshot(row):
     return AstroRegime(
-        directional_bias=directional,
-        volatility_bias=vol,
-        risk_multiplier=round(risk * strength, 2),
-        allowed_strategies=strategies,
-        favored_sectors=sectors,
-        explanation=explanation
+        directional_bias=row["directional_bias"],
+        volatility_bias=row["volatility_bias"],
+        risk_multiplier=row["risk_multiplier"],
+        allowed_strategies=json.loads(row["allowed_strategies"] or "[]"),
+        favored_sectors=json.loads(row["favored_sectors"] or "[]"),
+        explanation=[e for e in (row["explanation"] or "").split("\n") if e],
     )
+
+
+def get_astro_regime(person_id, day=None, conn=None):
+    """
+    Regime for one person/day, served from astro_regime_snapshot when
+    present, unless the snapshot lacks the transit modifier and transit
+    positions for the day have since been stored.
+    """
+    day = (day or date.today()).isoformat() if not isinstance(day, str) else day
+    if conn is None:
+        with pooled_connection() as conn:
+            return get_astro_regime(person_id, day, conn)
+
+    row = conn.execute(
+        "SELECT * FROM astro_regime_snapshot WHERE person_id = ? AND date = ?",
+        (person_id, day),
+    ).fetchone()
+    if row and json.loads(row["transit_context"] or "{}").get("lord_transit_house") is None:
+        # Stored before the day's transits were: recompute once they exist
+        if conn.execute("SELECT 1 FROM transit_position WHERE date = ? LIMIT 1", (day,)).fetchone():
+            row = None
+    if row:
+        return _from_snapshot(row)
+    regimes = compute_regime_range(person_id, day, day, conn)
+    if day not in regimes:
+        raise ValueError(f"No active maha dasha for person {person_id} on {day}")
+    return regimes[day]
+
+
+def compute_astro_regime(db=None, person_id=1, day=None) -> AstroRegime:
+    """
+    Compute (without caching) the regime for one person on one day
+    (default today). `db` optionally points at a database file other
+    than the configured one.
+    """
+    if db is None:
+        conn = get_connection()
+    else:
+        conn = sqlite3.connect(db)
+        conn.row_factory = sqlite3.Row
+    try:
+        day = (day or date.today()).isoformat() if not isinstance(day, str) else day
+        regimes = compute_regime_range(person_id, day, day, conn, store=False)
+        if day not in regimes:
+            raise ValueError(f"No active maha dasha for person {person_id} on {day}")
+        return regimes[day]
+    finally:
+        conn.close()
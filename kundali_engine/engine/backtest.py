@@ -0,0 +1,344 @@
+"""
+Backtest astro regimes against local daily market data.
+
+Usage:
+  python -m kundali_engine.engine.backtest --data market/ --person 1
+  python -m kundali_engine.engine.backtest --data market/ --person 1 \\
+      --kinds index commodity --start 1995-01-01 --end 2024-12-31
+
+Market data is one file per ticker in --data: <TICKER>.csv or
+<TICKER>.parquet with a header containing at least `date` and `close`
+(open/high/low/volume are ignored). Tickers default to the `entity` rows
+of the requested kinds; files are streamed one ticker at a time.
+
+Regimes come from astro_regime_snapshot (see astro_regime.
+compute_regime_range) and are joined to bars by date. Each day's regime
+picks a strategy class and a risk multiplier; P&L per class is a
+close-to-close proxy scaled by trailing realized volatility `band`:
+
+  bullish_defined   clip( ret, -band, band)      defined-risk long
+  bearish_defined   clip(-ret, -band, band)      defined-risk short
+  neutral_income    clip(band - |ret|, -2·band, band)   short premium
+  long_vol          clip(|ret| - band, -band, 2·band)   long premium
+
+all multiplied by risk_multiplier. A day is a hit when its P&L is > 0.
+"""
+import argparse
+import csv
+import json
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import numpy as np
+
+from kundali_engine.core.database.connection import get_connection
+from kundali_engine.engine.astro_regime import STRATEGY_CLASSES, strategy_class
+
+STRATEGIES = list(STRATEGY_CLASSES)
+STRATEGY_INDEX = {s: i for i, s in enumerate(STRATEGIES)}
+
+VOL_WINDOW = 20
+TRADING_DAYS = 252
+
+
+# ── Regimes ───────────────────────────────────────────────────────────────
+
+class RegimeSeries:
+    """Daily regimes as sorted arrays: strategy class code and risk multiplier."""
+
+    def __init__(self, dates, strategy, risk):
+        order = np.argsort(np.asarray(dates, dtype="datetime64[D]"), kind="stable")
+        self.dates = np.asarray(dates, dtype="datetime64[D]")[order]
+        self.strategy = np.asarray(strategy, dtype=np.int8)[order]
+        self.risk = np.asarray(risk, dtype=np.float64)[order]
+
+    def __len__(self):
+        return len(self.dates)
+
+    @classmethod
+    def from_snapshot(cls, person_id, start=None, end=None, conn=None):
+        """Load a person's regimes from astro_regime_snapshot."""
+        sql = ("SELECT date, directional_bias, volatility_bias, risk_multiplier "
+               "FROM astro_regime_snapshot WHERE person_id = ?")
+        params = [person_id]
+        if start:
+            sql += " AND date >= ?"
+            params.append(str(start))
+        if end:
+            sql += " AND date <= ?"
+            params.append(str(end))
+
+        own_conn = conn is None
+        if own_conn:
+            conn = get_connection()
+        try:
+            rows = conn.execute(sql + " ORDER BY date", params).fetchall()
+        finally:
+            if own_conn:
+                conn.close()
+
+        return cls(
+            [r[0] for r in rows],
+            [STRATEGY_INDEX[strategy_class(r[1], r[2])] for r in rows],
+            [1.0 if r[3] is None else r[3] for r in rows],
+        )
+
+    @classmethod
+    def from_regimes(cls, regimes):
+        """From a {iso_date: AstroRegime} dict as returned by compute_regime_range."""
+        days = sorted(regimes)
+        return cls(
+            days,
+            [STRATEGY_INDEX[strategy_class(regimes[d].directional_bias,
+                                           regimes[d].volatility_bias)] for d in days],
+            [regimes[d].risk_multiplier for d in days],
+        )
+
+    def align(self, dates):
+        """(strategy, risk) for each date; strategy is -1 where no regime exists."""
+        strategy = np.full(len(dates), -1, dtype=np.int8)
+        risk = np.zeros(len(dates))
+        if not len(self.dates):
+            return strategy, risk
+        idx = np.searchsorted(self.dates, dates)
+        safe = np.minimum(idx, len(self.dates) - 1)
+        hit = self.dates[safe] == dates
+        strategy[hit] = self.strategy[safe[hit]]
+        risk[hit] = self.risk[safe[hit]]
+        return strategy, risk
+
+
+# ── Market data ───────────────────────────────────────────────────────────
+
+def entity_tickers(kinds=("index", "commodity"), conn=None):
+    """Tickers of `entity` rows of the given types."""
+    marks = ",".join("?" * len(kinds))
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
+    try:
+        rows = conn.execute(
+            f"SELECT ticker FROM entity WHERE entity_type IN ({marks}) "
+            "AND ticker IS NOT NULL ORDER BY ticker",
+            list(kinds),
+        ).fetchall()
+    finally:
+        if own_conn:
+            conn.close()
+    return [r[0] for r in rows]
+
+
+def _read_csv(path):
+    with open(path, newline="") as f:
+        reader = csv.reader(f)
+        header = [h.strip().lower() for h in next(reader)]
+        rows = [r for r in reader if r]
+    if "date" not in header or "close" not in header:
+        raise ValueError(f"{path}: needs 'date' and 'close' columns")
+    if not rows:
+        return np.array([], dtype="datetime64[D]"), np.array([])
+    columns = list(zip(*rows))
+    dates = np.array([d[:10] for d in columns[header.index("date")]], dtype="datetime64[D]")
+    close = np.array(columns[header.index("close")], dtype=np.float64)
+    return dates, close
+
+
+def _read_parquet(path):
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("Reading Parquet market data requires pyarrow (pip install pyarrow)")
+    table = pq.read_table(path)
+    names = {n.lower(): n for n in table.column_names}
+    if "date" not in names or "close" not in names:
+        raise ValueError(f"{path}: needs 'date' and 'close' columns")
+    dates = table.column(names["date"]).to_numpy().astype("datetime64[D]")
+    close = table.column(names["close"]).to_numpy().astype(np.float64)
+    return dates, close
+
+
+def read_bars(path):
+    """(dates, close) arrays for one ticker file, sorted by date."""
+    path = Path(path)
+    dates, close = _read_parquet(path) if path.suffix == ".parquet" else _read_csv(path)
+    order = np.argsort(dates, kind="stable")
+    return dates[order], close[order]
+
+
+def iter_bars(data_dir, tickers=None):
+    """Yield (ticker, dates, close) one file at a time."""
+    data_dir = Path(data_dir)
+    files = {}
+    for path in sorted(data_dir.iterdir()):
+        if path.suffix in (".csv", ".parquet"):
+            files.setdefault(path.stem.upper(), path)
+    wanted = sorted(files) if tickers is None else [t.upper() for t in tickers]
+    for ticker in wanted:
+        if ticker in files:
+            yield (ticker, *read_bars(files[ticker]))
+
+
+# ── P&L ───────────────────────────────────────────────────────────────────
+
+def trailing_vol(ret, window=VOL_WINDOW):
+    """Std-dev of the previous `window` returns (NaN until enough history)."""
+    band = np.full(len(ret), np.nan)
+    if len(ret) <= window:
+        return band
+    r = np.nan_to_num(ret)
+    c1 = np.concatenate(([0.0], np.cumsum(r)))
+    c2 = np.concatenate(([0.0], np.cumsum(r * r)))
+    s1 = c1[window:-1] - c1[:-window - 1]
+    s2 = c2[window:-1] - c2[:-window - 1]
+    mean = s1 / window
+    band[window:] = np.sqrt(np.maximum(s2 / window - mean * mean, 0.0))
+    return band
+
+
+def strategy_pnl(close, strategy, risk, window=VOL_WINDOW):
+    """
+    Daily P&L (fraction of notional) of the regime's strategy class.
+    NaN on days without a regime or without enough price history.
+    """
+    ret = np.full(len(close), np.nan)
+    ret[1:] = close[1:] / close[:-1] - 1.0
+    band = trailing_vol(ret, window)
+    a = np.abs(ret)
+    candidates = np.stack([
+        np.clip(ret, -band, band),
+        np.clip(-ret, -band, band),
+        np.clip(band - a, -2 * band, band),
+        np.clip(a - band, -band, 2 * band),
+    ])
+    pnl = candidates[np.maximum(strategy, 0), np.arange(len(close))] * risk
+    pnl[strategy < 0] = np.nan
+    return pnl
+
+
+@dataclass
+class BacktestResult:
+    ticker: str
+    days: int
+    pnl: float
+    hit_rate: float
+    sharpe: float
+    max_drawdown: float
+    by_strategy: dict = field(default_factory=dict)
+
+
+def backtest_ticker(ticker, dates, close, regimes, window=VOL_WINDOW):
+    strategy, risk = regimes.align(dates)
+    pnl = strategy_pnl(close, strategy, risk, window)
+    traded = ~np.isnan(pnl)
+    p = pnl[traded]
+    s = strategy[traded]
+
+    equity = np.cumsum(p)
+    peak = np.maximum.accumulate(np.concatenate(([0.0], equity)))[1:]
+    drawdown = float((peak - equity).max()) if len(p) else 0.0
+    std = p.std() if len(p) > 1 else 0.0
+
+    counts = np.bincount(s, minlength=len(STRATEGIES))
+    totals = np.bincount(s, weights=p, minlength=len(STRATEGIES))
+    hits = np.bincount(s, weights=p > 0, minlength=len(STRATEGIES))
+    by_strategy = {
+        name: {"days": int(counts[k]), "pnl": float(totals[k]),
+               "hit_rate": float(hits[k] / counts[k]) if counts[k] else 0.0}
+        for k, name in enumerate(STRATEGIES)
+    }
+
+    return BacktestResult(
+        ticker=ticker,
+        days=int(len(p)),
+        pnl=float(p.sum()),
+        hit_rate=float((p > 0).mean()) if len(p) else 0.0,
+        sharpe=float(p.mean() / std * np.sqrt(TRADING_DAYS)) if std > 0 else 0.0,
+        max_drawdown=drawdown,
+        by_strategy=by_strategy,
+    )
+
+
+def run_backtest(data_dir, regimes, tickers=None, start=None, end=None, window=VOL_WINDOW):
+    """
+    Backtest every ticker file under data_dir.
+
+    `regimes` is one RegimeSeries applied to all tickers (a person's
+    regime as an overlay), or a {ticker: RegimeSeries} dict for
+    per-entity regimes; tickers without regimes are skipped.
+    """
+    lo = np.datetime64(str(start), "D") if start else None
+    hi = np.datetime64(str(end), "D") if end else None
+    results = []
+    for ticker, dates, close in iter_bars(data_dir, tickers):
+        series = regimes.get(ticker) if isinstance(regimes, dict) else regimes
+        if series is None:
+            continue
+        keep = np.ones(len(dates), dtype=bool)
+        if lo is not None:
+            keep &= dates >= lo
+        if hi is not None:
+            keep &= dates <= hi
+        results.append(backtest_ticker(ticker, dates[keep], close[keep], series, window))
+    return results
+
+
+def summarize(results):
+    """Portfolio-level totals and hit rates across tickers."""
+    days = sum(r.days for r in results)
+    summary = {
+        "tickers": len(results),
+        "days": days,
+        "pnl": sum(r.pnl for r in results),
+        "hit_rate": sum(r.hit_rate * r.days for r in results) / days if days else 0.0,
+        "by_strategy": {},
+    }
+    for name in STRATEGIES:
+        n = sum(r.by_strategy[name]["days"] for r in results)
+        summary["by_strategy"][name] = {
+            "days": n,
+            "pnl": sum(r.by_strategy[name]["pnl"] for r in results),
+            "hit_rate": sum(r.by_strategy[name]["hit_rate"] * r.by_strategy[name]["days"]
+                            for r in results) / n if n else 0.0,
+        }
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest astro regimes on daily bars")
+    parser.add_argument("--data", required=True, help="directory of <TICKER>.csv/.parquet files")
+    parser.add_argument("--person", type=int, required=True, help="person_id whose regimes to use")
+    parser.add_argument("--kinds", nargs="+", default=["index", "commodity"],
+                        help="entity types to include (default: index commodity)")
+    parser.add_argument("--all-files", action="store_true",
+                        help="use every file in --data instead of entity tickers")
+    parser.add_argument("--start")
+    parser.add_argument("--end")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    regimes = RegimeSeries.from_snapshot(args.person, args.start, args.end)
+    if not len(regimes):
+        raise SystemExit(f"No regimes in astro_regime_snapshot for person {args.person}; "
+                         "run compute_regime_range first")
+    tickers = None if args.all_files else entity_tickers(args.kinds)
+    results = run_backtest(args.data, regimes, tickers, args.start, args.end)
+    summary = summarize(results)
+
+    if args.json:
+        print(json.dumps({"summary": summary, "tickers": [r.__dict__ for r in results]}, indent=2))
+        return
+
+    print(f"{'Ticker':<12} {'Days':>6} {'P&L':>9} {'Hit%':>6} {'Sharpe':>7} {'MaxDD':>8}")
+    print("-" * 52)
+    for r in results:
+        print(f"{r.ticker:<12} {r.days:>6} {r.pnl:>9.4f} {r.hit_rate * 100:>5.1f}% "
+              f"{r.sharpe:>7.2f} {r.max_drawdown:>8.4f}")
+    print("-" * 52)
+    print(f"{summary['tickers']} tickers, {summary['days']} trading days, "
+          f"P&L {summary['pnl']:.4f}, hit rate {summary['hit_rate'] * 100:.1f}%")
+    for name, s in summary["by_strategy"].items():
+        print(f"  {name:<16} {s['days']:>7} days  P&L {s['pnl']:>9.4f}  hit {s['hit_rate'] * 100:5.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,442 @@
+"""
+Compatibility engine: Ashtakoota (36 gunas) plus a synastry aspect overlay.
+
+    index = get_compatibility_index()          # everyone, cached per chart data
+    index.compare(1, 2)                         # one pair, koota by koota
+    index.top_k(1, k=10)                        # best matches for person 1
+    index.scores([1, 2, 3], [10, 11, 12])       # N x M cohort matrices
+
+Ashtakoota depends only on the two Moons. Each Moon is reduced to its pada
+(0..107: nakshatra * 4 + pada - 1; the pada also fixes the Moon sign), and
+the eight kootas are precomputed once as 108 x 108 tables, so scoring one
+person against 50k is a single fancy-indexing gather.
+
+Varna, Vashya and Gana are directional (groom's Moon vs bride's). person
+has no gender, so by default each pair is scored as the mean of both
+orientations; pass symmetric=False to treat the first person as the
+groom. Graha Maitri uses the sign rulers and natural relationships from
+the reference data; the other tables are classical constants below.
+
+The overlay adds -4..+4 points from aspects between key planets of the two
+charts (Moon-Moon, Sun-Moon, Venus-Mars, ...): trines, sextiles and benign
+conjunctions add, squares, oppositions and malefic conjunctions subtract.
+Matches rank by total = gunas + overlay.
+
+Run:
+  python -m kundali_engine.engine.compatibility 1 2
+  python -m kundali_engine.engine.compatibility 1 --top 10
+"""
+import argparse
+import threading
+
+import numpy as np
+
+from kundali_engine.chart.frame import ChartFrame, NAKSHATRAS, PLANET_INDEX, SIGNS
+from kundali_engine.core.database.connection import pooled_connection
+from kundali_engine.core.database.reference import get_reference_data
+
+KOOTAS = ("varna", "vashya", "tara", "yoni", "graha_maitri", "gana", "bhakoot", "nadi")
+KOOTA_POINTS = dict(zip(KOOTAS, (1, 2, 3, 4, 5, 6, 7, 8)))
+MAX_GUNAS = 36
+OVERLAY_POINTS = 4.0
+N_PADAS = 108
+PADA_SPAN = 360 / N_PADAS
+BLOCK_CELLS = 4_000_000          # (rows x candidates) per overlay block
+
+# ── Classical tables ──────────────────────────────────────────────────────
+
+# Varna of the Moon sign (by element): Brahmin 3 > Kshatriya 2 > Vaishya 1 > Shudra 0
+_VARNA = {"Water": 3, "Fire": 2, "Earth": 1, "Air": 0}
+
+# Vashya groups; Sagittarius and Capricorn change group at 15 degrees
+CHATUSHPADA, MANAVA, JALACHARA, VANACHARA, KEETA = range(5)
+_VASHYA_SIGN = {
+    "Aries": CHATUSHPADA, "Taurus": CHATUSHPADA, "Gemini": MANAVA, "Cancer": JALACHARA,
+    "Leo": VANACHARA, "Virgo": MANAVA, "Libra": MANAVA, "Scorpio": KEETA,
+    "Sagittarius": (MANAVA, CHATUSHPADA), "Capricorn": (CHATUSHPADA, JALACHARA),
+    "Aquarius": MANAVA, "Pisces": JALACHARA,
+}
+_VASHYA_SCORE = np.array([          # groom group (row) x bride group (column)
+    [2.0, 1.0, 1.0, 0.5, 1.0],
+    [1.0, 2.0, 0.5, 0.0, 1.0],
+    [1.0, 0.5, 2.0, 1.0, 1.0],
+    [0.0, 0.0, 0.0, 2.0, 0.0],
+    [1.0, 1.0, 1.0, 0.0, 2.0],
+])
+
+YONI_ANIMALS = ("Horse", "Elephant", "Sheep", "Serpent", "Dog", "Cat", "Rat",
+                "Cow", "Buffalo", "Tiger", "Deer", "Monkey", "Mongoose", "Lion")
+_YONI_NAKSHATRA = (             # animal index per nakshatra, Ashwini..Revati
+    0, 1, 2, 3, 3, 4, 5, 2, 5, 6, 6, 7, 8, 9, 8, 9, 10, 10, 4, 11, 12, 11, 13, 0, 13, 7, 1,
+)
+_YONI_SCORE = np.array([
+    [4, 2, 2, 3, 2, 2, 2, 1, 0, 1, 3, 3, 2, 1],
+    [2, 4, 3, 3, 2, 2, 2, 2, 3, 1, 2, 3, 2, 0],
+    [2, 3, 4, 2, 1, 2, 1, 3, 3, 1, 2, 0, 3, 1],
+    [3, 3, 2, 4, 2, 1, 1, 1, 1, 2, 2, 2, 0, 2],
+    [2, 2, 1, 2, 4, 2, 1, 2, 2, 1, 0, 2, 1, 1],
+    [2, 2, 2, 1, 2, 4, 0, 2, 2, 1, 3, 3, 2, 1],
+    [2, 2, 1, 1, 1, 0, 4, 2, 2, 2, 2, 2, 1, 2],
+    [1, 2, 3, 1, 2, 2, 2, 4, 3, 0, 3, 2, 2, 1],
+    [0, 3, 3, 1, 2, 2, 2, 3, 4, 1, 2, 2, 2, 1],
+    [1, 1, 1, 2, 1, 1, 2, 0, 1, 4, 1, 1, 2, 1],
+    [3, 2, 2, 2, 0, 3, 2, 3, 2, 1, 4, 2, 2, 1],
+    [3, 3, 0, 2, 2, 3, 2, 2, 2, 1, 2, 4, 3, 2],
+    [2, 2, 3, 0, 1, 2, 1, 2, 2, 2, 2, 3, 4, 2],
+    [1, 0, 1, 2, 1, 1, 2, 1, 1, 1, 1, 2, 2, 4],
+], dtype=np.float64)
+
+# Gana per nakshatra: 0 Deva, 1 Manushya, 2 Rakshasa
+_GANA_NAKSHATRA = (
+    0, 1, 2, 1, 0, 1, 0, 0, 2, 2, 1, 1, 0, 2, 0, 2, 0, 2, 2, 1, 1, 0, 2, 2, 1, 1, 0,
+)
+_GANA_SCORE = np.array([[6, 6, 1], [5, 6, 0], [1, 0, 6]], dtype=np.float64)
+
+# Nadi repeats Adi, Madhya, Antya, Antya, Madhya, Adi along the nakshatras
+_NADI_NAKSHATRA = tuple((0, 1, 2, 2, 1, 0)[n % 6] for n in range(27))
+
+# Tara counts 3 (Vipat), 5 (Pratyak) and 7 (Naidhana) are inauspicious
+_BAD_TARAS = (3, 5, 7)
+# Moon-sign distances (counted inclusively) that break Bhakoot: 2/12, 5/9, 6/8
+_BAD_BHAKOOT = (2, 12, 5, 9, 6, 8)
+
+# Graha Maitri by the two sign lords' mutual natural relationship
+_MAITRI = {
+    ("Friend", "Friend"): 5, ("Friend", "Neutral"): 4, ("Neutral", "Neutral"): 3,
+    ("Friend", "Enemy"): 1, ("Neutral", "Enemy"): 0.5, ("Enemy", "Enemy"): 0,
+}
+
+# Overlay: (planet of one chart, planet of the other, weight, tone of a conjunction)
+OVERLAY_PAIRS = (
+    ("Moon", "Moon", 1.0, 1), ("Sun", "Moon", 1.0, 1), ("Venus", "Mars", 1.0, 1),
+    ("Moon", "Venus", 0.75, 1), ("Venus", "Venus", 0.5, 1), ("Jupiter", "Moon", 0.75, 1),
+    ("Jupiter", "Venus", 0.5, 1), ("Saturn", "Moon", 0.75, -1), ("Saturn", "Venus", 0.75, -1),
+    ("Mars", "Moon", 0.5, -1),
+)
+# (angle, orb, tone); a conjunction takes the pair's tone
+ASPECTS = ((0, 8.0, None), (60, 6.0, 1), (90, 7.0, -1), (120, 8.0, 1), (180, 8.0, -1))
+
+
+def pada_sign(pada):
+    return pada // 9
+
+
+def pada_nakshatra(pada):
+    return pada // 4
+
+
+def verdict(gunas):
+    if gunas >= 32:
+        return "Excellent"
+    if gunas >= 25:
+        return "Good"
+    if gunas >= 18:
+        return "Average"
+    return "Not recommended"
+
+
+# ── Lookup tables ─────────────────────────────────────────────────────────
+
+def build_koota_tables(ref):
+    """
+    (8, 108, 108) float array: points of each koota for a groom's Moon pada
+    (axis 1) and a bride's Moon pada (axis 2), in KOOTAS order.
+    """
+    padas = np.arange(N_PADAS)
+    sign = pada_sign(padas)
+    nak = pada_nakshatra(padas)
+    half = (padas % 9) >= 4                     # pada midpoint in the second 15 degrees
+
+    varna = np.array([_VARNA[ref.signs[SIGNS[s]]["element"]] for s in sign])
+    vashya = np.array([
+        g[int(h)] if isinstance(g, tuple) else g
+        for g, h in ((_VASHYA_SIGN[SIGNS[s]], h) for s, h in zip(sign, half))
+    ])
+    yoni = np.array(_YONI_NAKSHATRA)[nak]
+    gana = np.array(_GANA_NAKSHATRA)[nak]
+    nadi = np.array(_NADI_NAKSHATRA)[nak]
+
+    lords = [ref.signs[s]["ruler"] for s in SIGNS]
+    relation = {(r["planet"], r["other_planet"]): r["relationship"]
+                for rows in ref.relationships.values() for r in rows}
+    maitri = np.zeros((12, 12))
+    for a in range(12):
+        for b in range(12):
+            la, lb = lords[a], lords[b]
+            if la == lb:
+                maitri[a, b] = 5
+                continue
+            pair = tuple(sorted((relation.get((la, lb), "Neutral"), relation.get((lb, la), "Neutral")),
+                                key=("Friend", "Neutral", "Enemy").index))
+            maitri[a, b] = _MAITRI[pair]
+
+    g, b = np.meshgrid(padas, padas, indexing="ij")
+    sg, sb, ng, nb = sign[g], sign[b], nak[g], nak[b]
+    tara_gb = ((nb - ng) % 27) % 9 + 1          # count from groom's to bride's, mod 9
+    tara_bg = ((ng - nb) % 27) % 9 + 1
+    distance = (sb - sg) % 12 + 1
+
+    tables = np.stack([
+        (varna[g] >= varna[b]).astype(float),
+        _VASHYA_SCORE[vashya[g], vashya[b]],
+        1.5 * ~np.isin(tara_gb, _BAD_TARAS) + 1.5 * ~np.isin(tara_bg, _BAD_TARAS),
+        _YONI_SCORE[yoni[g], yoni[b]],
+        maitri[sg, sb],
+        _GANA_SCORE[gana[g], gana[b]],
+        7.0 * ~np.isin(distance, _BAD_BHAKOOT),
+        8.0 * (nadi[g] != nadi[b]),
+    ])
+    return tables
+
+
+_tables = {}                     # reference version → (kootas, total, symmetric total)
+_tables_lock = threading.Lock()
+
+
+def koota_tables(ref=None):
+    """(per-koota tables, total table, symmetric total table) for the reference data."""
+    ref = ref or get_reference_data()
+    with _tables_lock:
+        cached = _tables.get(ref.version)
+        if cached is None:
+            kootas = build_koota_tables(ref)
+            total = kootas.sum(axis=0)
+            cached = (kootas, total, (total + total.T) / 2)
+            _tables.clear()
+            _tables[ref.version] = cached
+        return cached
+
+
+# ── Vectorized scoring ────────────────────────────────────────────────────
+
+def guna_scores(padas_a, padas_b, symmetric=True, ref=None):
+    """(len(a), len(b)) Ashtakoota totals; NaN where either Moon is unknown."""
+    _, total, sym = koota_tables(ref)
+    table = sym if symmetric else total
+    a = np.asarray(padas_a, dtype=np.int64)
+    b = np.asarray(padas_b, dtype=np.int64)
+    scores = table[np.clip(a, 0, None)[:, None], np.clip(b, 0, None)[None, :]]
+    scores[(a < 0)[:, None] | (b < 0)[None, :]] = np.nan
+    return scores
+
+
+def _overlay_table(weight, conjunction):
+    """Points of one overlay pair by separation in hundredths of a degree (0..180)."""
+    sep = np.arange(18001) / 100
+    points = np.zeros(len(sep), dtype=np.float32)
+    for angle, orb, tone in ASPECTS:
+        points[np.abs(sep - angle) <= orb] += weight * (conjunction if tone is None else tone)
+    return points
+
+
+# (column in chart a, column in chart b, points by separation); both
+# directions of a pair of different planets
+_OVERLAY = [
+    (PLANET_INDEX[x], PLANET_INDEX[y], _overlay_table(weight, conjunction))
+    for pa, pb, weight, conjunction in OVERLAY_PAIRS
+    for x, y in ([(pa, pb)] if pa == pb else [(pa, pb), (pb, pa)])
+]
+_OVERLAY_WEIGHT = sum(w * (1 if pa == pb else 2) for pa, pb, w, _ in OVERLAY_PAIRS)
+
+
+def overlay_scores(lon_a, lon_b):
+    """
+    (len(a), len(b)) aspect overlay in -OVERLAY_POINTS..+OVERLAY_POINTS from
+    (n, 9) sidereal longitudes. Pairs with a missing planet count as no aspect.
+    Separations are looked up per pair at 0.01 degree resolution, so a
+    separation within 0.005 degrees of an orb edge may round either way.
+    """
+    lon_a = np.asarray(lon_a, dtype=np.float32)
+    lon_b = np.asarray(lon_b, dtype=np.float32)
+    raw = np.zeros((len(lon_a), len(lon_b)), dtype=np.float32)
+    for x, y, points in _OVERLAY:
+        sep = np.abs(lon_a[:, x, None] - lon_b[None, :, y])
+        sep = np.minimum(sep, 360 - sep)
+        steps = np.nan_to_num(np.rint(sep * 100), nan=-1).astype(np.int16)
+        raw += np.where(steps >= 0, points[steps.clip(0, 18000)], 0)
+    return OVERLAY_POINTS * raw / _OVERLAY_WEIGHT
+
+
+# ── Population index ──────────────────────────────────────────────────────
+
+class CompatibilityIndex:
+    """Moon padas and planet longitudes of a population, for batch matching."""
+
+    def __init__(self, person_ids, longitude, names=None, version=None):
+        self.person_ids = np.asarray(person_ids, dtype=np.int64)
+        self.longitude = np.asarray(longitude, dtype=np.float32)            # (n, 9)
+        moon = self.longitude[:, PLANET_INDEX["Moon"]]
+        self.pada = np.where(np.isnan(moon), -1,
+                             (np.nan_to_num(moon) // PADA_SPAN).clip(0, N_PADAS - 1)).astype(np.int16)
+        self.names = names or {}
+        self.version = version
+        self._row = {int(p): i for i, p in enumerate(self.person_ids)}
+
+    def __len__(self):
+        return len(self.person_ids)
+
+    @classmethod
+    def from_frame(cls, frame, names=None, version=None):
+        return cls(frame.person_ids, frame.sign * 30.0 + frame.degree, names, version)
+
+    @classmethod
+    def from_db(cls, person_ids=None, conn=None):
+        if conn is None:
+            with pooled_connection() as conn:
+                return cls.from_db(person_ids, conn)
+        frame = ChartFrame.from_db(person_ids, conn)
+        frame.degree[frame.sign < 0] = np.nan
+        names = dict(conn.execute("SELECT id, name FROM person").fetchall())
+        return cls.from_frame(frame, names, _chart_fingerprint(conn))
+
+    def rows(self, person_ids):
+        """Row indices for person ids (raises KeyError for unknown ids)."""
+        return np.array([self._row[int(p)] for p in np.atleast_1d(person_ids)], dtype=np.int64)
+
+    # ── Scoring ───────────────────────────────────────────────────────────
+
+    def scores(self, ids_a, ids_b=None, symmetric=True):
+        """
+        {"gunas", "overlay", "total"} (N, M) matrices for two cohorts
+        (ids_b defaults to everyone), plus the row and column person ids.
+        """
+        ra = self.rows(ids_a)
+        rb = np.arange(len(self)) if ids_b is None else self.rows(ids_b)
+        gunas = guna_scores(self.pada[ra], self.pada[rb], symmetric)
+        overlay = np.empty_like(gunas, dtype=np.float32)
+        step = max(1, BLOCK_CELLS // max(len(rb), 1))
+        for k in range(0, len(ra), step):
+            overlay[k:k + step] = overlay_scores(self.longitude[ra[k:k + step]], self.longitude[rb])
+        return {"person_ids": self.person_ids[ra], "candidate_ids": self.person_ids[rb],
+                "gunas": gunas, "overlay": overlay, "total": gunas + overlay}
+
+    def top_k(self, person_ids, k=10, among=None, symmetric=True):
+        """
+        Best k matches by total for one person (list of dicts) or for each
+        of several (dict of person_id → list). `among` limits the
+        candidates (default everyone); a person is never their own match.
+        """
+        single = np.isscalar(person_ids)
+        ra = self.rows(person_ids)
+        rb = np.arange(len(self)) if among is None else self.rows(among)
+        results = {}
+        step = max(1, BLOCK_CELLS // max(len(rb), 1))
+        for s in range(0, len(ra), step):
+            block = ra[s:s + step]
+            gunas = guna_scores(self.pada[block], self.pada[rb], symmetric)
+            total = gunas + overlay_scores(self.longitude[block], self.longitude[rb])
+            total[block[:, None] == rb[None, :]] = np.nan
+            total = np.where(np.isnan(total), -np.inf, total)
+            kk = min(k, len(rb))
+            if kk <= 0:
+                break
+            best = np.argpartition(-total, kk - 1, axis=1)[:, :kk]
+            order = np.argsort(-np.take_along_axis(total, best, axis=1), axis=1, kind="stable")
+            best = np.take_along_axis(best, order, axis=1)
+            for i, row in enumerate(block):
+                matches = []
+                for j in best[i]:
+                    if total[i, j] == -np.inf:
+                        continue
+                    pid = int(self.person_ids[rb[j]])
+                    g = float(gunas[i, j])
+                    matches.append({"person_id": pid, "name": self.names.get(pid),
+                                    "gunas": g, "overlay": round(float(total[i, j]) - g, 2),
+                                    "total": round(float(total[i, j]), 2), "verdict": verdict(g)})
+                results[int(self.person_ids[row])] = matches
+        return results[int(np.atleast_1d(person_ids)[0])] if single else results
+
+    def compare(self, person_a, person_b, symmetric=True):
+        """Koota-by-koota breakdown, overlay aspects and verdict for one pair."""
+        a, b = self.rows([person_a, person_b])
+        pa, pb = int(self.pada[a]), int(self.pada[b])
+        if pa < 0 or pb < 0:
+            raise ValueError("both charts need a computed Moon")
+        kootas, _, _ = koota_tables()
+        points = kootas[:, pa, pb]
+        if symmetric:
+            points = (points + kootas[:, pb, pa]) / 2
+        breakdown = {name: float(p) for name, p in zip(KOOTAS, points)}
+        gunas = float(points.sum())
+        overlay = float(overlay_scores(self.longitude[[a]], self.longitude[[b]])[0, 0])
+        return {
+            "person_a": int(person_a), "person_b": int(person_b),
+            "moon_a": _moon_label(pa), "moon_b": _moon_label(pb),
+            "kootas": breakdown, "gunas": gunas, "overlay": round(overlay, 2),
+            "total": round(gunas + overlay, 2), "verdict": verdict(gunas),
+            "doshas": [name for name in ("bhakoot", "nadi") if breakdown[name] == 0],
+            "aspects": _pair_aspects(self.longitude[a], self.longitude[b]),
+        }
+
+
+def _moon_label(pada):
+    return {"sign": SIGNS[pada_sign(pada)], "nakshatra": NAKSHATRAS[pada_nakshatra(pada)],
+            "pada": pada % 4 + 1}
+
+
+_ASPECT_NAMES = {0: "conjunct", 60: "sextile", 90: "square", 120: "trine", 180: "opposite"}
+
+
+def _pair_aspects(lon_a, lon_b):
+    """[(planet of A, aspect, planet of B, tone)] for the overlay pairs that aspect."""
+    found = []
+    for pa, pb, _, conjunction in OVERLAY_PAIRS:
+        for x, y in ([(pa, pb)] if pa == pb else [(pa, pb), (pb, pa)]):
+            sep = abs(float(lon_a[PLANET_INDEX[x]]) - float(lon_b[PLANET_INDEX[y]]))
+            sep = min(sep, 360 - sep)
+            for angle, orb, tone in ASPECTS:
+                if abs(sep - angle) <= orb:
+                    found.append((x, _ASPECT_NAMES[angle], y, conjunction if tone is None else tone))
+    return found
+
+
+# ── Process-wide index ────────────────────────────────────────────────────
+
+def _chart_fingerprint(conn):
+    """Changes whenever any chart is written (data_version 'chart' counters)."""
+    return tuple(conn.execute(
+        "SELECT COUNT(*), COALESCE(SUM(version), 0) FROM data_version WHERE kind = 'chart'"
+    ).fetchone())
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_compatibility_index(conn=None):
+    """The process-wide CompatibilityIndex, rebuilt when any chart changes."""
+    global _index
+    if conn is None:
+        with pooled_connection() as conn:
+            return get_compatibility_index(conn)
+    fingerprint = _chart_fingerprint(conn)
+    with _index_lock:
+        if _index is None or _index.version != fingerprint:
+            _index = CompatibilityIndex.from_db(conn=conn)
+        return _index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ashtakoota compatibility")
+    parser.add_argument("person", type=int)
+    parser.add_argument("other", type=int, nargs="?")
+    parser.add_argument("--top", type=int, default=10, help="best matches when no other person is given")
+    parser.add_argument("--directional", action="store_true", help="score the first person as groom")
+    args = parser.parse_args()
+
+    index = get_compatibility_index()
+    symmetric = not args.directional
+    if args.other is not None:
+        r = index.compare(args.person, args.other, symmetric)
+        print(f"{index.names.get(r['person_a'])} x {index.names.get(r['person_b'])}: "
+              f"{r['gunas']:.1f}/{MAX_GUNAS} gunas ({r['verdict']}), overlay {r['overlay']:+.1f}")
+        for name in KOOTAS:
+            print(f"  {name:<13} {r['kootas'][name]:>4.1f} / {KOOTA_POINTS[name]}")
+        return
+    for m in index.top_k(args.person, args.top, symmetric=symmetric):
+        print(f"  {m['person_id']:>7}  {m['name'] or '':<25} {m['gunas']:>5.1f} gunas  "
+              f"overlay {m['overlay']:+5.1f}  total {m['total']:>5.1f}")
+
+
+if __name__ == "__main__":
+    main()
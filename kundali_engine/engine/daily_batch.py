@@ -0,0 +1,406 @@
+"""
+Nightly batch: daily guidance and trading regime for every person.
+
+For each person and each of the next N days it computes, population-wide
+with array operations:
+
+  - the dasha chain (maha / antar / pratyantar lords) from a DashaTable
+  - transit scores: each transiting planet's house from the natal Moon
+    (classical gochara), weighted into a composite score of -10 to +10
+  - the trading regime (astro_regime.regime_arrays)
+  - do / avoid recommendations for the period lord
+
+and bulk-writes astro_regime_snapshot and daily_recommendation, one
+transaction per chunk of persons. The agent then answers "how's today?"
+with one indexed read (get_daily_guidance), computing a single person's
+day on the spot only if the batch has not covered it.
+
+Run:
+  python -m kundali_engine.engine.daily_batch                 # today + 6 days
+  python -m kundali_engine.engine.daily_batch --days 14 --start 2026-03-01
+  python -m kundali_engine.engine.daily_batch --compute-transits
+
+Transit positions come from transit_position; --compute-transits fills
+missing dates from the ephemeris first. Days without transit data get
+regimes and recommendations without the transit modifier or score.
+"""
+import argparse
+import json
+import time
+from datetime import date, timedelta
+
+import numpy as np
+
+from kundali_engine.chart.frame import ChartFrame, DIGNITIES, DIGNITY_INDEX, PLANETS, PLANET_INDEX
+from kundali_engine.core.database.connection import get_connection, pooled_connection
+from kundali_engine.engine.astro_regime import (
+    DIRECTIONS, PLANET_SECTOR_MAP, VOLATILITIES,
+    explain_regime, regime_arrays, strategies_for,
+)
+from kundali_engine.time_engine.dasha import DASHA_LEVELS, DashaTable
+from kundali_engine.time_engine.transit import TransitTable, load_or_compute
+
+DEFAULT_DAYS = 7
+CHUNK_SIZE = 5000            # persons per transaction
+
+# Period lord → guidance
+GUIDANCE = {
+    "Sun": {
+        "theme": "Authority, career, government matters, father",
+        "do": "Take leadership roles, pursue recognition, deal with authorities",
+        "avoid": "Ego conflicts, unnecessary confrontations with bosses",
+        "health": "Watch heart, eyes, bones — stay hydrated",
+    },
+    "Moon": {
+        "theme": "Mind, emotions, mother, public dealings",
+        "do": "Trust intuition, nurture relationships, connect with people",
+        "avoid": "Emotional decisions, overthinking, irregular sleep",
+        "health": "Watch stress, water intake, mental peace",
+    },
+    "Mars": {
+        "theme": "Energy, action, property, siblings, courage",
+        "do": "Physical exercise, bold initiatives, technical work",
+        "avoid": "Arguments, haste, risky driving, anger",
+        "health": "Watch blood pressure, injuries, inflammation",
+    },
+    "Mercury": {
+        "theme": "Communication, intellect, business, learning",
+        "do": "Study, write, negotiate, learn new skills, analyse data",
+        "avoid": "Miscommunication, signing without reading, gossip",
+        "health": "Watch skin, nervous system, digestion",
+    },
+    "Jupiter": {
+        "theme": "Wisdom, expansion, teaching, finance, spirituality",
+        "do": "Learn, teach, invest wisely, spiritual practice, charity",
+        "avoid": "Overcommitment, overindulgence, blind optimism",
+        "health": "Watch liver, weight, sugar levels",
+    },
+    "Venus": {
+        "theme": "Relationships, luxury, arts, vehicles, comfort",
+        "do": "Enjoy beauty, strengthen relationships, creative pursuits",
+        "avoid": "Overspending, overindulgence, relationship drama",
+        "health": "Watch kidneys, reproductive health, diabetes",
+    },
+    "Saturn": {
+        "theme": "Discipline, karma, hard work, delays, structure",
+        "do": "Be patient, work systematically, serve others, build slowly",
+        "avoid": "Shortcuts, laziness, ignoring responsibilities",
+        "health": "Watch joints, teeth, chronic conditions — regular checkups",
+    },
+    "Rahu": {
+        "theme": "Ambition, unconventional paths, foreign connections, technology",
+        "do": "Explore new opportunities, technology, foreign dealings",
+        "avoid": "Deception, addictions, get-rich-quick schemes, confusion",
+        "health": "Watch mental health, mysterious ailments, toxins",
+    },
+    "Ketu": {
+        "theme": "Spirituality, detachment, research, past-life karma",
+        "do": "Meditate, research deeply, let go of attachments",
+        "avoid": "Confusion, aimlessness, ignoring practical matters",
+        "health": "Watch infections, allergies, unexplained symptoms",
+    },
+}
+
+STRONG_DIGNITIES = ("exalted", "moolatrikona", "own")
+WEAK_DIGNITIES = ("debilitated", "enemy")
+
+# Gochara: houses from the natal Moon where each transiting planet gives
+# good results; elsewhere it counts against the day
+GOCHARA_FAVORABLE = {
+    "Sun": (3, 6, 10, 11),
+    "Moon": (1, 3, 6, 7, 10, 11),
+    "Mars": (3, 6, 11),
+    "Mercury": (2, 4, 6, 8, 10, 11),
+    "Jupiter": (2, 5, 7, 9, 11),
+    "Venus": (1, 2, 3, 4, 5, 8, 9, 11, 12),
+    "Saturn": (3, 6, 11),
+    "Rahu": (3, 6, 11),
+    "Ketu": (3, 6, 11),
+}
+TRANSIT_WEIGHTS = {"Jupiter": 2.0, "Saturn": 2.0, "Rahu": 1.5, "Ketu": 1.5}
+
+# (9 planets, 13 houses) → +1 favorable / -1 not; house 0 (unknown) scores 0
+_GOCHARA = np.zeros((len(PLANETS), 13), dtype=np.int8)
+for _planet, _houses in GOCHARA_FAVORABLE.items():
+    _GOCHARA[PLANET_INDEX[_planet], 1:] = -1
+    _GOCHARA[PLANET_INDEX[_planet], list(_houses)] = 1
+_WEIGHTS = np.array([TRANSIT_WEIGHTS.get(p, 1.0) for p in PLANETS])
+
+# Indexed by dignity code; the last slot is "unknown" (code -1)
+_STRONG = np.isin(np.arange(len(DIGNITIES) + 1), [DIGNITY_INDEX[d] for d in STRONG_DIGNITIES])
+_WEAK = np.isin(np.arange(len(DIGNITIES) + 1), [DIGNITY_INDEX[d] for d in WEAK_DIGNITIES])
+
+
+# ── Vectorized pieces ─────────────────────────────────────────────────────
+
+def transit_houses(moon_sign, transit_sign):
+    """
+    House of each transiting planet from each person's natal Moon:
+    (n_persons,) Moon sign codes × (n_dates, 9) transit signs →
+    (n_persons, n_dates, 9), 0 where either sign is unknown.
+    """
+    moon = np.asarray(moon_sign, dtype=np.int16)[:, None, None]
+    sign = np.asarray(transit_sign, dtype=np.int16)[None, :, :]
+    return np.where((moon >= 0) & (sign >= 0), (sign - moon) % 12 + 1, 0).astype(np.int8)
+
+
+def transit_scores(houses):
+    """Composite gochara score per (person, date) on a -10..+10 scale (NaN if no data)."""
+    good = _GOCHARA[np.arange(len(PLANETS)), houses]          # (P, D, 9)
+    known = houses > 0
+    weight = np.where(known, _WEIGHTS, 0.0)
+    total = weight.sum(axis=2)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        score = 10.0 * (good * weight).sum(axis=2) / total
+    return np.where(total > 0, np.round(score, 1), np.nan)
+
+
+def _transit_rows(transits, dates):
+    """(n_dates, 9) transit sign codes for `dates`, -1 where a date is missing."""
+    signs = np.full((len(dates), len(PLANETS)), -1, dtype=np.int8)
+    if transits is not None and len(transits):
+        rows = np.searchsorted(transits.dates, dates)
+        found = rows < len(transits)
+        found[found] = transits.dates[rows[found]] == dates[found]
+        signs[found] = transits.sign[rows[found]]
+    return signs
+
+
+def _strength(conn, person_ids):
+    """(n_persons, 10) natal strength per planet, 1.0 when unset; last column = no lord."""
+    ids = [int(p) for p in person_ids]
+    strength = np.ones((len(ids), len(PLANETS) + 1))
+    if not ids:
+        return strength
+    row_of = {pid: i for i, pid in enumerate(ids)}
+    marks = ",".join("?" * len(ids))
+    for pid, planet, s in conn.execute(
+        f"SELECT person_id, planet, strength FROM natal_planet "
+        f"WHERE person_id IN ({marks}) AND strength IS NOT NULL",
+        ids,
+    ):
+        j = PLANET_INDEX.get(planet)
+        if j is not None:
+            strength[row_of[pid], j] = s
+    return strength
+
+
+def _confidence(strong, weak, score):
+    base = 0.6 + np.where(strong, 0.2, 0.0) - np.where(weak, 0.2, 0.0)
+    return np.round(np.clip(base + 0.02 * np.nan_to_num(score), 0.1, 0.95), 2)
+
+
+# ── Batch ─────────────────────────────────────────────────────────────────
+
+# Per-lord / per-regime text that every cell shares, serialized once
+_SECTORS_JSON = {p: json.dumps(PLANET_SECTOR_MAP.get(p, [])) for p in PLANETS}
+_STRATEGIES_JSON = {(d, v): json.dumps(strategies_for(d, v))
+                    for d in DIRECTIONS for v in VOLATILITIES}
+
+
+def compute_chunk(person_ids, dates, transits, conn):
+    """
+    Snapshot and recommendation rows for a chunk of persons over `dates`
+    (datetime64[D] array). Returns (snapshot_rows, recommendation_rows).
+    """
+    frame = ChartFrame.from_db(person_ids, conn)
+    dashas = DashaTable.from_db(frame.person_ids, conn)
+    strength = _strength(conn, frame.person_ids)
+    n, rows_idx = len(frame), np.arange(len(frame))[:, None]
+
+    chain = {level: dashas.lords(dates, level) for level in DASHA_LEVELS}
+    lord = chain["maha"].astype(np.intp)                       # (P, D), -1 = none
+
+    # Natal facts of the lord; column -1 (no lord) reads the padding column
+    house = np.concatenate([frame.house, np.zeros((n, 1), np.int8)], axis=1)
+    dignity = np.concatenate([frame.dignity, np.full((n, 1), -1, np.int8)], axis=1)
+    natal_house = house[rows_idx, lord]
+    lord_dignity = dignity[rows_idx, lord]
+
+    tsign = _transit_rows(transits, dates)                     # (D, 9)
+    moon = frame.sign[:, PLANET_INDEX["Moon"]]
+    score = transit_scores(transit_houses(moon, tsign))       # (P, D)
+
+    # Transit house of the lord from the natal lagna (0 = unknown)
+    lord_tsign = np.where(lord >= 0, tsign[np.arange(len(dates))[None, :], np.clip(lord, 0, None)], -1)
+    lagna = frame.lagna.astype(np.int16)[:, None]
+    transit_house = np.where((lord_tsign >= 0) & (lagna >= 0), (lord_tsign - lagna) % 12 + 1, 0)
+
+    direction, volatility, risk = regime_arrays(
+        lord, natal_house, strength[rows_idx, lord], transit_house,
+    )
+    strong, weak = _STRONG[lord_dignity], _WEAK[lord_dignity]
+    confidence = _confidence(strong, weak, score)
+
+    days = dates.astype(str)
+    explain_cache, snapshots, recommendations = {}, [], []
+    for i, j in zip(*np.nonzero(lord >= 0)):
+        pid, day = int(frame.person_ids[i]), days[j]
+        planet = PLANETS[lord[i, j]]
+        dir_, vol = DIRECTIONS[direction[i, j]], VOLATILITIES[volatility[i, j]]
+        th = int(transit_house[i, j])
+        key = (planet, int(natal_house[i, j]), th)
+        explanation = explain_cache.get(key)
+        if explanation is None:
+            explanation = explain_cache[key] = "\n".join(explain_regime(*key))
+        sub = {level: PLANETS[chain[level][i, j]] if chain[level][i, j] >= 0 else None
+               for level in DASHA_LEVELS[1:]}
+        s = None if np.isnan(score[i, j]) else float(score[i, j])
+
+        snapshots.append((
+            pid, day, dir_, vol, float(risk[i, j]), _STRATEGIES_JSON[dir_, vol],
+            _SECTORS_JSON[planet], explanation,
+            json.dumps({"maha": planet, **sub}),
+            json.dumps({"lord_transit_house": th or None, "transit_score": s}),
+            s,
+        ))
+
+        d = int(lord_dignity[i, j])
+        factors = json.dumps({
+            "maha": planet, **sub,
+            "dignity": DIGNITIES[d] if d >= 0 else None,
+            "transit_score": s,
+        })
+        info, c = GUIDANCE[planet], float(confidence[i, j])
+        recommendations += [
+            (pid, day, "general", "do", info["do"], c, factors),
+            (pid, day, "general", "avoid", info["avoid"], c, factors),
+            (pid, day, "health", "avoid", info["health"], c, factors),
+            (pid, day, "trading", "do", "Favor " + ", ".join(strategies_for(dir_, vol)), c, factors),
+        ]
+    return snapshots, recommendations
+
+
+def write_chunk(conn, person_ids, dates, snapshots, recommendations):
+    """Replace the chunk's rows for the date range, in one transaction."""
+    first, last = str(dates[0]), str(dates[-1])
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        # Per person: the chunk's ids need not be contiguous
+        conn.executemany(
+            "DELETE FROM daily_recommendation "
+            "WHERE person_id = ? AND date BETWEEN ? AND ?",
+            [(int(pid), first, last) for pid in person_ids],
+        )
+        conn.executemany(
+            """INSERT OR REPLACE INTO astro_regime_snapshot
+               (person_id, date, directional_bias, volatility_bias,
+                risk_multiplier, allowed_strategies, favored_sectors,
+                explanation, dasha_context, transit_context, composite_score)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            snapshots,
+        )
+        conn.executemany(
+            """INSERT INTO daily_recommendation
+               (person_id, date, category, action_type, recommendation,
+                confidence, source_factors)
+               VALUES (?, ?, ?, ?, ?, ?, ?)""",
+            recommendations,
+        )
+        # Agent responses cached under the old guidance version miss from now on
+        conn.executemany(
+            """INSERT INTO data_version (person_id, kind, version) VALUES (?, 'guidance', 1)
+               ON CONFLICT(person_id, kind) DO UPDATE SET version = version + 1""",
+            [(int(pid),) for pid in person_ids],
+        )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def run_daily_batch(start=None, days=DEFAULT_DAYS, person_ids=None, chunk_size=CHUNK_SIZE,
+                    transits=None, conn=None, progress=None):
+    """
+    Compute and store `days` days from `start` (default today) for the
+    given persons (default everyone). Returns a summary dict.
+    """
+    start = date.fromisoformat(str(start)) if start else date.today()
+    dates = np.arange(np.datetime64(start, "D"), np.datetime64(start, "D") + days)
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
+    try:
+        if person_ids is None:
+            person_ids = [r[0] for r in conn.execute("SELECT id FROM person ORDER BY id")]
+        else:
+            person_ids = sorted({int(p) for p in person_ids})
+        if transits is None:
+            transits = TransitTable.from_db(str(dates[0]), str(dates[-1]), conn)
+
+        t0 = time.perf_counter()
+        totals = {"persons": len(person_ids), "days": days, "snapshots": 0, "recommendations": 0}
+        for k in range(0, len(person_ids), chunk_size):
+            chunk = person_ids[k:k + chunk_size]
+            snapshots, recommendations = compute_chunk(chunk, dates, transits, conn)
+            write_chunk(conn, chunk, dates, snapshots, recommendations)
+            totals["snapshots"] += len(snapshots)
+            totals["recommendations"] += len(recommendations)
+            if progress:
+                progress(k + len(chunk), len(person_ids))
+        totals["seconds"] = round(time.perf_counter() - t0, 2)
+        return totals
+    finally:
+        if own_conn:
+            conn.close()
+
+
+# ── Request path ──────────────────────────────────────────────────────────
+
+def get_daily_guidance(person_id, day=None, conn=None):
+    """
+    daily_recommendation rows for one person/day (one indexed read),
+    computing and storing that single day first if the batch missed it
+    or stored it before that day's transit positions were available.
+    Returns [] when the person has no active dasha on that day.
+    """
+    day = (day or date.today()).isoformat() if not isinstance(day, str) else day
+    if conn is None:
+        with pooled_connection() as conn:
+            return get_daily_guidance(person_id, day, conn)
+
+    sql = ("SELECT category, action_type, recommendation, confidence, source_factors "
+           "FROM daily_recommendation WHERE person_id = ? AND date = ? ORDER BY id")
+    rows = conn.execute(sql, (person_id, day)).fetchall()
+    if rows and json.loads(rows[0]["source_factors"] or "{}").get("transit_score") is None:
+        # Stored before the day's transits were: recompute once they exist
+        if conn.execute("SELECT 1 FROM transit_position WHERE date = ? LIMIT 1", (day,)).fetchone():
+            rows = []
+    if not rows:
+        dates = np.array([day], dtype="datetime64[D]")
+        transits = TransitTable.from_db(day, day, conn)
+        snapshots, recommendations = compute_chunk([person_id], dates, transits, conn)
+        if recommendations:
+            write_chunk(conn, [person_id], dates, snapshots, recommendations)
+            rows = conn.execute(sql, (person_id, day)).fetchall()
+    return [dict(r) | {"source_factors": json.loads(r["source_factors"] or "{}")} for r in rows]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Nightly daily-guidance and regime batch")
+    parser.add_argument("--start", help="first date (YYYY-MM-DD), default today")
+    parser.add_argument("--days", type=int, default=DEFAULT_DAYS)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--compute-transits", action="store_true",
+                        help="fill missing transit_position dates from the ephemeris first")
+    args = parser.parse_args()
+
+    transits = None
+    if args.compute_transits:
+        start = date.fromisoformat(args.start) if args.start else date.today()
+        end = start + timedelta(days=args.days - 1)
+        transits = load_or_compute(start.isoformat(), end.isoformat())
+
+    def progress(done, total):
+        print(f"\r  {done}/{total} persons", end="", flush=True)
+
+    r = run_daily_batch(args.start, args.days, chunk_size=args.chunk_size,
+                        transits=transits, progress=progress)
+    print()
+    rate = r["persons"] / r["seconds"] if r["seconds"] else 0
+    print(f"{r['persons']} persons x {r['days']} days in {r['seconds']}s ({rate:.0f} persons/s): "
+          f"{r['snapshots']} regime snapshots, {r['recommendations']} recommendations")
+
+
+if __name__ == "__main__":
+    main()
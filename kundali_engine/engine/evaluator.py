@@ -1,3 +1,10 @@
+import numpy as np
+
+from kundali_engine.chart.frame import ChartFrame
+from kundali_engine.rules.dsl import CompiledRule, EvalContext
+from kundali_engine.time_engine.transit import load_or_compute
+
+
 class Evaluator:
     def __init__(self, rules):
         self.rules = rules
@@ -8,3 +15,39 @@ class Evaluator:
             if rule.applies(kundali, time):
                 scores.append(rule.score(kundali, time))
         return sum(scores) / len(scores) if scores else 0
+
+    def evaluate_series(self, kundali, start, end, transits=None):
+        """
+        Score one chart on every date from start to end (inclusive).
+
+        Returns (dates, scores) as datetime64[D] and float arrays. DSL rules
+        are evaluated for all dates at once against the transit table, with
+        transit features computed once per date; other rules fall back to
+        one applies() call per date with the date as time context. Without
+        `transits`, dates missing from transit_position are computed from
+        the ephemeris and stored first.
+        """
+        if transits is None:
+            transits = load_or_compute(start, end)
+        else:
+            transits = transits.between(start, end)
+
+        ctx = EvalContext(ChartFrame.from_kundali(kundali), transits)
+        total = np.zeros(len(transits))
+        count = np.zeros(len(transits), dtype=np.int32)
+        days = None
+        for rule in self.rules:
+            if isinstance(rule, CompiledRule):
+                mask = np.broadcast_to(rule.node.mask(ctx), ctx.shape)[:, 0]
+                total += rule.weight * mask
+                count += mask
+                continue
+            if days is None:
+                days = transits.dates.tolist()
+            for d, day in enumerate(days):
+                if rule.applies(kundali, day):
+                    total[d] += rule.score(kundali, day)
+                    count[d] += 1
+
+        scores = np.divide(total, count, out=np.zeros(len(transits)), where=count > 0)
+        return transits.dates, scores
@@ -0,0 +1,349 @@
+"""
+Push-notification scheduler for dasha and transit transitions.
+
+Each run scans two sources with date-range queries, not per-user polling:
+
+  - dasha: periods starting in the window (idx_dasha_start), one
+    notification to the person
+  - transit_event: ingresses and retrograde stations of the slow planets
+    and eclipses in the window, fanned out to every person with the
+    house of the event from their natal Moon
+
+Notifications go into a heap ordered by (deliver_at, person_id) and are
+handed to a sink in that order, in batches. deliver_at is lead_days before
+the event. Each source keeps a watermark in notification_watermark (the
+last event date scanned); a run covers (watermark, until + lead_days] and
+advances the watermark only after the sink has accepted every batch, so a
+failed run is repeated, not skipped. Consumers dedupe on the `key` field.
+The first run starts from today rather than scanning history.
+
+Before scanning, a run derives the window's ingress and station events
+from transit_position (TransitTable.store_events), so positions filled by
+any job (daily_batch, load_or_compute) produce events. The transit
+watermark stops at the last date in transit_position, so days filled
+later are scanned by a later run.
+
+Run:
+  python -m kundali_engine.engine.notifications                  # due through today
+  python -m kundali_engine.engine.notifications --lead-days 3 --out /data/outbox.ndjson
+  python -m kundali_engine.engine.notifications --compute-transits --dry-run
+
+Sinks take send(list_of_notifications): FileSink appends NDJSON lines,
+QueueSink puts onto a queue.Queue (stand-in for a push service).
+"""
+import argparse
+import heapq
+import itertools
+import json
+import os
+import queue
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+import numpy as np
+
+from kundali_engine.chart.frame import SIGN_INDEX
+from kundali_engine.core.database import connection
+from kundali_engine.core.database.connection import get_connection
+from kundali_engine.engine.daily_batch import GOCHARA_FAVORABLE, GUIDANCE
+from kundali_engine.time_engine.transit import TransitTable, load_or_compute
+
+LEAD_DAYS = 1                          # notify this many days before the event
+DEFAULT_LEVELS = ("maha", "antar")     # pratyantar changes every few weeks
+BATCH_SIZE = 1000                      # notifications per sink.send()
+SOURCES = ("dasha", "transit_event")
+
+# Transit events every user hears about; faster planets change too often
+BROADCAST_PLANETS = ("Jupiter", "Saturn", "Rahu", "Ketu")
+SADE_SATI_PHASES = {12: 1, 1: 2, 2: 3}     # Saturn's house from the Moon → phase
+
+_LEVEL_NAMES = {"maha": "Mahadasha", "antar": "Antardasha", "pratyantar": "Pratyantar dasha"}
+_ORDINAL = {1: "1st", 2: "2nd", 3: "3rd"}
+
+
+def _ordinal(n):
+    return _ORDINAL.get(n, f"{n}th")
+
+
+def default_outbox():
+    return Path(connection.DB_PATH).parent / "notifications" / "outbox.ndjson"
+
+
+# ── Queue ─────────────────────────────────────────────────────────────────
+
+class NotificationQueue:
+    """Min-heap of notifications ordered by (deliver_at, person_id, arrival)."""
+
+    def __init__(self):
+        self._heap = []
+        self._seq = itertools.count()
+
+    def __len__(self):
+        return len(self._heap)
+
+    def push(self, notification):
+        heapq.heappush(self._heap, (
+            notification["deliver_at"], notification["person_id"], next(self._seq), notification,
+        ))
+
+    def extend(self, notifications):
+        for n in notifications:
+            self.push(n)
+
+    def pop(self):
+        return heapq.heappop(self._heap)[-1]
+
+    def drain(self, batch_size=BATCH_SIZE):
+        """Yield lists of up to batch_size notifications in delivery order."""
+        while self._heap:
+            yield [self.pop() for _ in range(min(batch_size, len(self._heap)))]
+
+
+# ── Sinks ─────────────────────────────────────────────────────────────────
+
+class FileSink:
+    """Appends notifications to an NDJSON file, fsynced per batch."""
+
+    def __init__(self, path=None):
+        self.path = Path(path or default_outbox())
+
+    def send(self, notifications):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.writelines(json.dumps(n, ensure_ascii=False) + "\n" for n in notifications)
+            f.flush()
+            os.fsync(f.fileno())
+
+
+class QueueSink:
+    """Puts each notification on a queue.Queue for an in-process consumer."""
+
+    def __init__(self, q=None):
+        self.queue = q if q is not None else queue.Queue()
+
+    def send(self, notifications):
+        for n in notifications:
+            self.queue.put(n)
+
+
+# ── Watermarks ────────────────────────────────────────────────────────────
+
+def read_watermarks(conn):
+    """{source: date} of the last event date each source was scanned through."""
+    return {
+        source: date.fromisoformat(day)
+        for source, day in conn.execute("SELECT source, scanned_through FROM notification_watermark")
+    }
+
+
+def write_watermarks(conn, marks):
+    conn.executemany(
+        """INSERT INTO notification_watermark (source, scanned_through, updated_at)
+           VALUES (?, ?, ?)
+           ON CONFLICT(source) DO UPDATE SET
+               scanned_through = MAX(scanned_through, excluded.scanned_through),
+               updated_at = excluded.updated_at""",
+        [(source, day.isoformat(), time.time()) for source, day in marks.items()],
+    )
+    conn.commit()
+
+
+# ── Sources ───────────────────────────────────────────────────────────────
+
+def _deliver_at(event_day, lead_days):
+    return (date.fromisoformat(event_day) - timedelta(days=lead_days)).isoformat()
+
+
+def dasha_notifications(conn, after, through, levels=DEFAULT_LEVELS, lead_days=LEAD_DAYS):
+    """One notification per dasha period starting in (after, through]."""
+    marks = ",".join("?" * len(levels))
+    rows = conn.execute(
+        f"""SELECT d.id, d.person_id, d.level, d.planet, d.start_date, d.end_date,
+                   parent.planet AS parent_planet
+            FROM dasha d
+            LEFT JOIN dasha parent ON parent.id = d.parent_dasha_id
+            WHERE d.start_date > ? AND d.start_date <= ? AND d.level IN ({marks})
+            ORDER BY d.start_date, d.id""",
+        (after.isoformat(), through.isoformat(), *levels),
+    )
+    for dasha_id, person_id, level, planet, start, end, parent in rows:
+        name = _LEVEL_NAMES[level]
+        theme = GUIDANCE.get(planet, {}).get("theme", "")
+        if level == "maha" or not parent:
+            title = f"New {name}: {planet}"
+            body = f"Your {planet} {name} begins on {start} and runs until {end}."
+        else:
+            title = f"New {name}: {parent}–{planet}"
+            parent_name = _LEVEL_NAMES["maha" if level == "antar" else "antar"]
+            body = f"Your {planet} {name} within the {parent} {parent_name} begins on {start} (until {end})."
+        if theme:
+            body += f" Focus: {theme}."
+        yield {
+            "key": f"dasha:{dasha_id}",
+            "person_id": person_id,
+            "deliver_at": _deliver_at(start, lead_days),
+            "event_date": start,
+            "kind": "dasha",
+            "title": title,
+            "body": body,
+            "data": {"level": level, "planet": planet, "parent": parent, "end_date": end},
+        }
+
+
+def _moon_signs(conn):
+    """(person_ids, Moon sign codes) for every person with a natal Moon."""
+    rows = conn.execute("SELECT person_id, sign FROM natal_planet WHERE planet = 'Moon'").fetchall()
+    ids = np.array([r[0] for r in rows], dtype=np.int64)
+    signs = np.array([SIGN_INDEX.get(r[1], -1) for r in rows], dtype=np.int8)
+    return ids[signs >= 0], signs[signs >= 0]
+
+
+def _transit_message(event, house):
+    """(title, body) of one transit event for a Moon `house` away (None = unknown)."""
+    day, event_type, planet, description = event[1], event[2], event[3], event[4]
+    title = description or f"{planet} {event_type.replace('_', ' ')}"
+    body = f"{title} on {day}."
+    if house is None:
+        return title, body
+    if event_type == "ingress":
+        tone = "supportive" if house in GOCHARA_FAVORABLE.get(planet, ()) else "testing"
+        body += f" That is your {_ordinal(house)} house from the Moon — a {tone} transit."
+        if planet == "Saturn" and house in SADE_SATI_PHASES:
+            body += f" Sade Sati phase {SADE_SATI_PHASES[house]} begins."
+    else:
+        body += f" It falls in your {_ordinal(house)} house from the Moon."
+    return title, body
+
+
+def transit_notifications(conn, after, through, lead_days=LEAD_DAYS):
+    """
+    Fan transit_event rows in (after, through] out to every person with a
+    natal Moon. Only BROADCAST_PLANETS events and eclipses are sent.
+    """
+    events = conn.execute(
+        """SELECT id, date, event_type, planet, description, from_sign, to_sign
+           FROM transit_event WHERE date > ? AND date <= ? ORDER BY date, id""",
+        (after.isoformat(), through.isoformat()),
+    ).fetchall()
+    events = [e for e in events
+              if e[3] in BROADCAST_PLANETS or e[2].startswith("eclipse")]
+    if not events:
+        return
+    person_ids, moon = _moon_signs(conn)
+
+    for event in events:
+        day, event_type, planet = event[1], event[2], event[3]
+        # The house of the event sign from each Moon sign; 12 messages cover everyone
+        sign = event[6]
+        if event_type != "ingress":
+            row = conn.execute("SELECT sign FROM transit_position WHERE date = ? AND planet = ?",
+                               (day, planet)).fetchone()
+            sign = row[0] if row else None
+        messages = {}
+        for p, m in zip(person_ids.tolist(), moon.tolist()):
+            house = (SIGN_INDEX[sign] - m) % 12 + 1 if sign in SIGN_INDEX else None
+            if house not in messages:
+                messages[house] = _transit_message(event, house)
+            title, body = messages[house]
+            yield {
+                "key": f"transit:{day}:{event_type}:{planet}:{p}",
+                "person_id": p,
+                "deliver_at": _deliver_at(day, lead_days),
+                "event_date": day,
+                "kind": "transit",
+                "title": title,
+                "body": body,
+                "data": {"event_type": event_type, "planet": planet, "sign": sign,
+                         "house_from_moon": house},
+            }
+
+
+# ── Driver ────────────────────────────────────────────────────────────────
+
+def run_scheduler(until=None, lead_days=LEAD_DAYS, sink=None, levels=DEFAULT_LEVELS,
+                  batch_size=BATCH_SIZE, dry_run=False, conn=None):
+    """
+    Queue and send every notification due through `until` (default today)
+    that earlier runs have not sent. Returns a summary dict.
+    """
+    today = date.today()
+    until = date.fromisoformat(str(until)) if until else today
+    horizon = until + timedelta(days=lead_days)        # last event date covered
+    sink = sink or FileSink()
+
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
+    try:
+        marks = read_watermarks(conn)
+        start = {s: marks.get(s, today - timedelta(days=1)) for s in SOURCES}
+        last_position = conn.execute("SELECT MAX(date) FROM transit_position").fetchone()[0]
+        through = {
+            "dasha": horizon,
+            "transit_event": min(horizon, date.fromisoformat(last_position)) if last_position else None,
+        }
+
+        if through["transit_event"] and through["transit_event"] > start["transit_event"]:
+            # Positions may have been filled without events; derive them from
+            # the day before the window so an ingress on its first day is seen
+            TransitTable.from_db(start["transit_event"], through["transit_event"], conn).store_events(conn)
+
+        pending = NotificationQueue()
+        if through["dasha"] > start["dasha"]:
+            pending.extend(dasha_notifications(conn, start["dasha"], through["dasha"], levels, lead_days))
+        if through["transit_event"] and through["transit_event"] > start["transit_event"]:
+            pending.extend(transit_notifications(
+                conn, start["transit_event"], through["transit_event"], lead_days))
+
+        summary = {"queued": len(pending), "sent": 0,
+                   "windows": {s: (start[s].isoformat(), through[s].isoformat() if through[s] else None)
+                               for s in SOURCES}}
+        if dry_run:
+            return summary
+        for batch in pending.drain(batch_size):
+            sink.send(batch)
+            summary["sent"] += len(batch)
+        write_watermarks(conn, {s: d for s, d in through.items() if d and d > start[s]})
+        return summary
+    finally:
+        if own_conn:
+            conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dasha and transit notification scheduler")
+    parser.add_argument("--until", help="send notifications due through this date (default today)")
+    parser.add_argument("--lead-days", type=int, default=LEAD_DAYS)
+    parser.add_argument("--levels", default=",".join(DEFAULT_LEVELS),
+                        help="dasha levels to announce (maha,antar,pratyantar)")
+    parser.add_argument("--out", type=Path, help=f"NDJSON outbox (default {default_outbox()})")
+    parser.add_argument("--compute-transits", action="store_true",
+                        help="fill transit_position for the window first")
+    parser.add_argument("--dry-run", action="store_true", help="count without sending or moving watermarks")
+    args = parser.parse_args()
+
+    if args.compute_transits:
+        conn = get_connection()
+        try:
+            marks = read_watermarks(conn)
+        finally:
+            conn.close()
+        today = date.today()
+        start = marks.get("transit_event", today - timedelta(days=1))
+        until = date.fromisoformat(args.until) if args.until else today
+        table = load_or_compute(start.isoformat(), (until + timedelta(days=args.lead_days)).isoformat())
+        print(f"transit_position: {len(table)} days")
+
+    levels = tuple(level.strip() for level in args.levels.split(",") if level.strip())
+    r = run_scheduler(args.until, args.lead_days, FileSink(args.out), levels, dry_run=args.dry_run)
+    for source, (after, through) in r["windows"].items():
+        print(f"  {source:<14} after {after} through {through or '-'}")
+    if args.dry_run:
+        print(f"{r['queued']} notifications due (dry run, nothing sent)")
+    else:
+        print(f"{r['sent']} notifications sent to {args.out or default_outbox()}")
+
+
+if __name__ == "__main__":
+    main()
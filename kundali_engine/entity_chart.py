@@ -0,0 +1,241 @@
+"""
+CLI tool to compute and store natal charts for entities
+(companies, indices, commodities, nations, currencies).
+
+Usage:
+  python -m kundali_engine.entity_chart companies.csv
+  python -m kundali_engine.entity_chart companies.csv --type company
+
+CSV columns (header row required; only ticker and incorporation_date
+are mandatory):
+
+  ticker, name, entity_type, incorporation_date (YYYY-MM-DD),
+  incorporation_time (HH:MM), latitude, longitude, timezone, place_name
+
+Rows are upserted into `entity` by ticker. All charts are then computed
+with one vectorized ephemeris call and bulk-written to
+`entity_natal_planet`.
+
+Incorporation time is usually unknown: such charts are cast for local
+noon and get no lagna, so `house` is stored as NULL. The same applies
+when the location is unknown. The timezone (IANA name, alias or offset,
+see core/timezones.py) gives the historical offset for the date. A row
+with an unknown zone, or a date or time that does not parse, is skipped
+with a warning naming its ticker. Without a timezone, local mean time
+from the longitude is used (UTC when that is unknown too).
+"""
+import csv
+import sys
+from datetime import datetime
+
+import numpy as np
+
+from kundali_engine.chart.frame import PLANETS
+from kundali_engine.core.database.connection import get_connection
+from kundali_engine.core.timezones import get_zone, to_utc_batch
+from kundali_engine.create_kundali import (
+    SIGNS, NAKSHATRAS,
+    _get_ephemeris, _lahiri_ayanamsa, _compute_dignity, _compute_lagna_degrees,
+    sidereal_positions,
+)
+
+ENTITY_TYPES = ("company", "index", "commodity", "nation", "currency")
+DEFAULT_TIME = "12:00"
+
+
+# ---------------------------------------------------------------------------
+# Loading
+# ---------------------------------------------------------------------------
+
+def _float_or_none(value):
+    value = (value or "").strip()
+    return float(value) if value else None
+
+
+def _iso_date(value):
+    """'2001-1-2' or '2001-01-02T09:30' → '2001-01-02' (ValueError if invalid)."""
+    try:
+        return datetime.strptime(value.replace("T", " ").split()[0], "%Y-%m-%d").date().isoformat()
+    except ValueError:
+        raise ValueError(f"Bad incorporation_date {value!r}, expected YYYY-MM-DD") from None
+
+
+def _iso_time(value):
+    """'9:30' → '09:30', '9:30:15' → '09:30:15'; None for an empty value."""
+    if not value:
+        return None
+    for fmt, out in (("%H:%M", "%H:%M"), ("%H:%M:%S", "%H:%M:%S")):
+        try:
+            return datetime.strptime(value, fmt).strftime(out)
+        except ValueError:
+            pass
+    raise ValueError(f"Bad incorporation_time {value!r}, expected HH:MM")
+
+
+def load_entities_csv(path, entity_type="company"):
+    """Read entity rows from a CSV file into dicts matching the entity table."""
+    entities = []
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            row = {k.strip().lower(): (v or "").strip() for k, v in row.items() if k}
+            ticker = row.get("ticker")
+            if not ticker or not row.get("incorporation_date"):
+                continue
+            kind = (row.get("entity_type") or entity_type).lower()
+            if kind not in ENTITY_TYPES:
+                raise ValueError(f"{ticker}: unknown entity_type {kind!r}")
+            # A bad row is reported and skipped; the rest of the file loads
+            try:
+                if row.get("timezone"):
+                    get_zone(row["timezone"])
+                entity = {
+                    "ticker": ticker.upper(),
+                    "name": row.get("name") or ticker.upper(),
+                    "entity_type": kind,
+                    "incorporation_date": _iso_date(row["incorporation_date"]),
+                    "incorporation_time": _iso_time(row.get("incorporation_time")),
+                    "latitude": _float_or_none(row.get("latitude")),
+                    "longitude": _float_or_none(row.get("longitude")),
+                    "timezone": row.get("timezone") or None,
+                    "place_name": row.get("place_name") or None,
+                }
+            except ValueError as e:
+                print(f"Skipping {ticker.upper()}: {e}", file=sys.stderr)
+                continue
+            entities.append(entity)
+    return entities
+
+
+def upsert_entities(entities, conn):
+    """Insert or update entities by ticker; sets entity["id"] on each dict."""
+    existing = dict(conn.execute(
+        "SELECT ticker, id FROM entity WHERE ticker IS NOT NULL"
+    ).fetchall())
+    next_id = (conn.execute("SELECT MAX(id) FROM entity").fetchone()[0] or 0) + 1
+    for e in entities:
+        e["id"] = existing.get(e["ticker"])
+        if e["id"] is None:
+            e["id"] = existing[e["ticker"]] = next_id
+            next_id += 1
+
+    conn.executemany(
+        """INSERT INTO entity
+           (id, name, entity_type, ticker, incorporation_date, incorporation_time,
+            latitude, longitude, timezone, place_name)
+           VALUES (:id, :name, :entity_type, :ticker, :incorporation_date,
+                   :incorporation_time, :latitude, :longitude, :timezone, :place_name)
+           ON CONFLICT(id) DO UPDATE SET
+               name = excluded.name, entity_type = excluded.entity_type,
+               incorporation_date = excluded.incorporation_date,
+               incorporation_time = excluded.incorporation_time,
+               latitude = excluded.latitude, longitude = excluded.longitude,
+               timezone = excluded.timezone, place_name = excluded.place_name""",
+        entities,
+    )
+
+
+# ---------------------------------------------------------------------------
+# Chart computation
+# ---------------------------------------------------------------------------
+
+def _utc_minutes(entities):
+    """Minutes since 1970-01-01 UTC of each entity's (local) birth moment."""
+    local = np.array(
+        [f"{e['incorporation_date']}T{e['incorporation_time'] or DEFAULT_TIME}" for e in entities],
+        dtype="datetime64[s]",
+    )
+    utc = local.copy()
+    zoned = np.array([bool(e["timezone"]) for e in entities])
+    if zoned.any():
+        utc[zoned] = to_utc_batch(local[zoned], [e["timezone"] for e in entities if e["timezone"]])
+    # No timezone: local mean time (4 minutes per degree of longitude)
+    longitude = np.array([np.nan if e["longitude"] is None else e["longitude"] for e in entities])
+    lmt = ~zoned & ~np.isnan(longitude)
+    utc[lmt] = local[lmt] - np.round(longitude[lmt] * 240).astype(np.int64).astype("timedelta64[s]")
+    return utc.astype(np.int64) / 60.0
+
+
+def compute_entity_charts(entities):
+    """
+    Compute natal planets for all entities in one ephemeris pass.
+
+    Returns a list of entity_natal_planet row tuples:
+    (entity_id, planet, sign, house, sidereal_longitude, degree_in_sign,
+     nakshatra, nakshatra_pada, is_retrograde, dignity)
+    """
+    if not entities:
+        return []
+    ts, _ = _get_ephemeris()
+    t = ts.utc(1970, 1, 1, 0, _utc_minutes(entities))
+    positions = sidereal_positions(t)
+
+    # Lagna only where both the time and the place are known
+    lat = np.array([e["latitude"] if e["latitude"] is not None else np.nan for e in entities])
+    lon = np.array([e["longitude"] if e["longitude"] is not None else np.nan for e in entities])
+    timed = np.array([bool(e["incorporation_time"]) for e in entities])
+    has_lagna = timed & ~np.isnan(lat) & ~np.isnan(lon)
+    lagna_tropical = _compute_lagna_degrees(t, np.nan_to_num(lat), np.nan_to_num(lon))
+    lagna_sign = (((lagna_tropical - _lahiri_ayanamsa(t.tt)) % 360) // 30).astype(int)
+
+    span = 360 / 27
+    rows = []
+    for planet in PLANETS:
+        lon_sid, speed = positions[planet]
+        sign_idx = (lon_sid // 30).astype(int)
+        house = (sign_idx - lagna_sign) % 12 + 1
+        nak_idx = (lon_sid / span).astype(int)
+        pada = ((lon_sid % span) / (360 / 108)).astype(int) + 1
+        for i, e in enumerate(entities):
+            sign = SIGNS[sign_idx[i]]
+            deg = float(lon_sid[i] % 30)
+            rows.append((
+                e["id"], planet, sign,
+                int(house[i]) if has_lagna[i] else None,
+                round(float(lon_sid[i]), 4), round(deg, 4),
+                NAKSHATRAS[nak_idx[i]][0], int(pada[i]),
+                int(speed[i] < 0),
+                _compute_dignity(planet, sign, deg),
+            ))
+    return rows
+
+
+def store_entity_charts(rows, conn):
+    conn.executemany(
+        """INSERT OR REPLACE INTO entity_natal_planet
+           (entity_id, planet, sign, house, sidereal_longitude, degree_in_sign,
+            nakshatra, nakshatra_pada, is_retrograde, dignity)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+        rows,
+    )
+
+
+def build_entity_charts(path, entity_type="company"):
+    """Load a CSV, upsert its entities and (re)compute all their charts."""
+    entities = load_entities_csv(path, entity_type)
+
+    conn = get_connection()
+    try:
+        upsert_entities(entities, conn)
+        rows = compute_entity_charts(entities)
+        store_entity_charts(rows, conn)
+        conn.commit()
+    finally:
+        conn.close()
+    return len(entities), len(rows)
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+
+    entity_type = "company"
+    if "--type" in sys.argv:
+        entity_type = sys.argv[sys.argv.index("--type") + 1]
+
+    n_entities, n_rows = build_entity_charts(sys.argv[1], entity_type)
+    print(f"Stored charts for {n_entities} entities ({n_rows} planet rows)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,529 @@
+"""
+Declarative rule DSL compiled to vectorized NumPy predicates.
+
+A rule is one line of text:
+
+    Saturn in house 10 and dignity in (own, exalted) -> 0.8
+
+Grammar (keywords are case-insensitive):
+
+    rule      := expr ('->' | '→') NUMBER
+    expr      := term ('or' term)*
+    term      := factor ('and' factor)*
+    factor    := 'not' factor | '(' expr ')' | predicate
+    predicate := [PLANET | 'lagna'] condition
+    condition := 'in' 'house' values          -- Saturn in house (1, 4, 7)
+               | 'in' values                  -- Saturn in Libra / in (Libra, Aries)
+               | FIELD 'in' values            -- dignity in (own, exalted)
+               | FIELD OP value               -- house >= 7, degree < 5
+               | ['is'] ('retrograde' | 'combust')
+               | 'transit' PLANET tcondition
+    tcondition := 'in' 'house' values ['from' ('lagna' | 'moon')]
+               | 'in' values                  -- transit Jupiter in Cancer
+               | ['is'] 'retrograde'
+    FIELD     := house | sign | dignity | nakshatra | degree
+    OP        := == | != | < | <= | > | >=
+
+A predicate without a planet refers to the last planet named, so
+"Saturn in house 10 and dignity in (own, exalted)" tests Saturn twice.
+
+Transit conditions ("transit Saturn in house (12, 1, 2) from moon") need
+a time_engine.transit.TransitTable; houses are counted from the natal
+lagna unless 'from moon' is given. Natal conditions give one value per
+person and broadcast across dates.
+
+Rules live in the `ref_rule` table, grouped by rule_set. A RuleSet scores
+a whole ChartFrame in one call: each person's score is the mean weight of
+the rules that apply to them (0 when none apply) — the same aggregation
+as engine.evaluator.Evaluator.
+"""
+import operator
+import re
+
+import numpy as np
+
+from kundali_engine.chart.frame import (
+    ChartFrame, PLANETS, SIGNS, DIGNITIES, NAKSHATRAS,
+    PLANET_INDEX, SIGN_INDEX, DIGNITY_INDEX, NAKSHATRA_INDEX,
+)
+from kundali_engine.core.database.connection import get_connection
+from kundali_engine.rules.base import Rule
+
+
+class RuleSyntaxError(ValueError):
+    """Raised when a rule expression cannot be parsed."""
+
+
+_TOKEN = re.compile(
+    r"\s*(?:(?P<num>-?\d+(?:\.\d+)?)"
+    r"|(?P<arrow>->|→)"
+    r"|(?P<op>==|!=|<=|>=|<|>|=)"
+    r"|(?P<punct>[(),])"
+    r"|(?P<word>[A-Za-z_][A-Za-z_']*))"
+)
+
+_OPS = {
+    "==": operator.eq, "=": operator.eq, "!=": operator.ne,
+    "<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge,
+}
+
+_PLANETS_LOWER = {p.lower(): p for p in PLANETS}
+_SIGNS_LOWER = {s.lower(): s for s in SIGNS}
+_NAKSHATRAS_LOWER = {n.lower(): n for n in NAKSHATRAS}
+
+# field -> (frame attribute, name -> code lookup, decode list)
+_FIELDS = {
+    "house":     ("house", None, None),
+    "sign":      ("sign", _SIGNS_LOWER, SIGNS),
+    "dignity":   ("dignity", {d: d for d in DIGNITIES}, DIGNITIES),
+    "nakshatra": ("nakshatra", _NAKSHATRAS_LOWER, NAKSHATRAS),
+    "degree":    ("degree", None, None),
+}
+_CODES = {"sign": SIGN_INDEX, "dignity": DIGNITY_INDEX, "nakshatra": NAKSHATRA_INDEX}
+_FLAGS = ("retrograde", "combust")
+
+
+# ── Evaluation context ────────────────────────────────────────────────────
+
+class EvalContext:
+    """
+    Natal frame plus optional transit table for one evaluation pass.
+
+    Derived transit features (e.g. transit house of Saturn from each
+    person's Moon) are computed once here and shared by every rule,
+    rather than once per rule.
+    """
+
+    def __init__(self, frame, transits=None):
+        self.frame = frame
+        self.transits = transits
+        self._cache = {}
+
+    @property
+    def shape(self):
+        if self.transits is None:
+            return (len(self.frame),)
+        return (len(self.transits), len(self.frame))
+
+    def _require_transits(self):
+        if self.transits is None:
+            raise ValueError("Rule has transit conditions but no transit table was given")
+        return self.transits
+
+    def transit_sign(self, j):
+        """(n_dates, 1) sign codes of planet j."""
+        return self._require_transits().sign[:, j, None]
+
+    def transit_retrograde(self, j):
+        return self._require_transits().retrograde[:, j, None]
+
+    def transit_house(self, j, ref):
+        """(n_dates, n_persons) house of transiting planet j from lagna/Moon."""
+        key = ("house", j, ref)
+        if key not in self._cache:
+            tsign = self.transit_sign(j).astype(np.int16)
+            if ref == "moon":
+                base = self.frame.sign[:, PLANET_INDEX["Moon"]]
+            else:
+                base = self.frame.lagna
+            base = base.astype(np.int16)[None, :]
+            house = (tsign - base) % 12 + 1
+            self._cache[key] = np.where((tsign < 0) | (base < 0), 0, house).astype(np.int8)
+        return self._cache[key]
+
+
+# ── AST nodes ─────────────────────────────────────────────────────────────
+
+class _Field:
+    """Leaf predicate on one planet (or the lagna) column."""
+
+    def __init__(self, subject, field, op, values, text):
+        self.subject = subject      # planet name or 'Lagna'
+        self.field = field
+        self.op = op                # 'in', 'flag' or a key of _OPS
+        self.values = values
+        self.text = text
+
+    def column(self, ctx):
+        if self.subject == "Lagna":
+            return ctx.frame.lagna
+        return getattr(ctx.frame, _FIELDS.get(self.field, (self.field,))[0])[:, PLANET_INDEX[self.subject]]
+
+    def mask(self, ctx):
+        col = self.column(ctx)
+        if self.op == "flag":
+            return col.astype(bool)
+        if self.op == "in":
+            return np.isin(col, self.values)
+        return _OPS[self.op](col, self.values[0])
+
+    def explain(self, ctx, i, d=None):
+        return [(self.text, bool(self.mask(ctx)[i]), self._actual(self.column(ctx)[i]))]
+
+    def _actual(self, value):
+        if self.op == "flag":
+            return "yes" if value else "no"
+        decode = _FIELDS[self.field][2]
+        if decode is not None:
+            return decode[value] if value >= 0 else "unknown"
+        if self.field == "house" and not value:
+            return "unknown"
+        return f"{value:g}" if self.field == "degree" else str(int(value))
+
+
+class _Transit(_Field):
+    """Leaf predicate on a transiting planet; yields (n_dates, ...) masks."""
+
+    def __init__(self, subject, field, op, values, text, ref="lagna"):
+        super().__init__(subject, field, op, values, text)
+        self.ref = ref
+
+    def column(self, ctx):
+        j = PLANET_INDEX[self.subject]
+        if self.field == "house":
+            return ctx.transit_house(j, self.ref)
+        if self.field == "sign":
+            return ctx.transit_sign(j)
+        return ctx.transit_retrograde(j)
+
+    def explain(self, ctx, i, d=None):
+        if d is None:
+            raise ValueError("Explaining a transit condition needs a date")
+        col = self.column(ctx)
+        value = col[d, i if col.shape[1] > 1 else 0]
+        ok = bool(np.broadcast_to(self.mask(ctx), ctx.shape)[d, i])
+        return [(self.text, ok, self._actual(value))]
+
+
+class _Not:
+    def __init__(self, node):
+        self.node = node
+
+    def mask(self, ctx):
+        return ~self.node.mask(ctx)
+
+    def explain(self, ctx, i, d=None):
+        return [(f"not ({text})", not ok, actual)
+                for text, ok, actual in self.node.explain(ctx, i, d)]
+
+
+class _BoolOp:
+    def __init__(self, combine, nodes):
+        self.combine = combine      # np.logical_and / np.logical_or
+        self.nodes = nodes
+
+    def mask(self, ctx):
+        result = self.nodes[0].mask(ctx)
+        for node in self.nodes[1:]:
+            result = self.combine(result, node.mask(ctx))
+        return result
+
+    def explain(self, ctx, i, d=None):
+        return [c for n in self.nodes for c in n.explain(ctx, i, d)]
+
+
+# ── Parser ────────────────────────────────────────────────────────────────
+
+def _tokenize(text):
+    tokens = []
+    pos = 0
+    text = text.strip()
+    while pos < len(text):
+        m = _TOKEN.match(text, pos)
+        if not m or m.end() == pos:
+            raise RuleSyntaxError(f"Unexpected input at {text[pos:]!r}")
+        pos = m.end()
+        kind = m.lastgroup
+        value = m.group(kind)
+        tokens.append((kind, value.lower() if kind == "word" else value))
+    return tokens
+
+
+class _Parser:
+    def __init__(self, text):
+        self.text = text
+        self.tokens = _tokenize(text)
+        self.pos = 0
+        self.subject = None
+
+    def peek(self, offset=0):
+        i = self.pos + offset
+        return self.tokens[i] if i < len(self.tokens) else (None, None)
+
+    def take(self, kind=None, value=None):
+        tok = self.peek()
+        if tok[0] is None or (kind and tok[0] != kind) or (value and tok[1] != value):
+            want = value or kind or "token"
+            raise RuleSyntaxError(f"Expected {want!r} in rule: {self.text}")
+        self.pos += 1
+        return tok[1]
+
+    def accept(self, kind, value=None):
+        tok = self.peek()
+        if tok[0] == kind and (value is None or tok[1] == value):
+            self.pos += 1
+            return True
+        return False
+
+    # rule := expr ARROW NUMBER
+    def parse_rule(self):
+        node = self.parse_expr()
+        self.take("arrow")
+        weight = float(self.take("num"))
+        if self.peek()[0] is not None:
+            raise RuleSyntaxError(f"Trailing input after score in rule: {self.text}")
+        return node, weight
+
+    def parse_expr(self):
+        nodes = [self.parse_term()]
+        while self.accept("word", "or"):
+            nodes.append(self.parse_term())
+        return nodes[0] if len(nodes) == 1 else _BoolOp(np.logical_or, nodes)
+
+    def parse_term(self):
+        nodes = [self.parse_factor()]
+        while self.accept("word", "and"):
+            nodes.append(self.parse_factor())
+        return nodes[0] if len(nodes) == 1 else _BoolOp(np.logical_and, nodes)
+
+    def parse_factor(self):
+        if self.accept("word", "not"):
+            return _Not(self.parse_factor())
+        if self.accept("punct", "("):
+            node = self.parse_expr()
+            self.take("punct", ")")
+            return node
+        return self.parse_predicate()
+
+    def parse_predicate(self):
+        if self.accept("word", "transit"):
+            return self.parse_transit()
+
+        kind, word = self.peek()
+        if kind == "word" and (word in _PLANETS_LOWER or word == "lagna"):
+            self.pos += 1
+            self.subject = _PLANETS_LOWER.get(word, "Lagna")
+        if self.subject is None:
+            raise RuleSyntaxError(f"Condition has no planet in rule: {self.text}")
+        subject = self.subject
+
+        self.accept("word", "is")
+        kind, word = self.peek()
+
+        if kind == "word" and word in _FLAGS:
+            self.pos += 1
+            self._lagna_sign_only(subject)
+            return _Field(subject, word, "flag", None, f"{subject} {word}")
+
+        if kind == "word" and word == "in":
+            self.pos += 1
+            if self.accept("word", "house"):
+                self._lagna_sign_only(subject)
+                return self._membership(subject, "house", "in house ")
+            return self._membership(subject, "sign", "in ")
+
+        if kind == "word" and word in _FIELDS:
+            self.pos += 1
+            if word != "sign":
+                self._lagna_sign_only(subject)
+            if self.accept("word", "in"):
+                return self._membership(subject, word, f"{word} in ")
+            op = self.take("op")
+            if word not in ("house", "degree") and op not in ("==", "=", "!="):
+                raise RuleSyntaxError(f"'{word}' only supports ==, != and in: {self.text}")
+            value = self._encode(word, self._value())
+            return _Field(subject, word, op, [value],
+                          f"{subject} {word} {op} {self._display(word, value)}")
+
+        raise RuleSyntaxError(f"Cannot parse condition near {word!r} in rule: {self.text}")
+
+    def _lagna_sign_only(self, subject):
+        if subject == "Lagna":
+            raise RuleSyntaxError(f"Lagna only supports 'sign' in rule: {self.text}")
+
+    def parse_transit(self):
+        kind, word = self.peek()
+        if kind != "word" or word not in _PLANETS_LOWER:
+            raise RuleSyntaxError(f"'transit' must be followed by a planet: {self.text}")
+        self.pos += 1
+        planet = _PLANETS_LOWER[word]
+        self.accept("word", "is")
+
+        if self.accept("word", "retrograde"):
+            return _Transit(planet, "retrograde", "flag", None, f"transit {planet} retrograde")
+
+        self.take("word", "in")
+        if self.accept("word", "house"):
+            node = self._membership(planet, "house", "in house ")
+            ref = "lagna"
+            if self.accept("word", "from"):
+                ref = self.take("word")
+                if ref not in ("lagna", "moon"):
+                    raise RuleSyntaxError(f"Houses count 'from lagna' or 'from moon': {self.text}")
+            text = f"transit {node.text}" + (" from Moon" if ref == "moon" else "")
+            return _Transit(planet, "house", "in", node.values, text, ref)
+
+        node = self._membership(planet, "sign", "in ")
+        return _Transit(planet, "sign", "in", node.values, f"transit {node.text}")
+
+    def _membership(self, subject, field, label):
+        if self.accept("punct", "("):
+            raw = [self._value()]
+            while self.accept("punct", ","):
+                raw.append(self._value())
+            self.take("punct", ")")
+        else:
+            raw = [self._value()]
+        values = [self._encode(field, v) for v in raw]
+        shown = [self._display(field, v) for v in values]
+        shown = shown[0] if len(shown) == 1 else "(" + ", ".join(shown) + ")"
+        return _Field(subject, field, "in", values, f"{subject} {label}{shown}")
+
+    def _value(self):
+        kind, value = self.peek()
+        if kind == "num":
+            self.pos += 1
+            return value
+        if kind != "word":
+            raise RuleSyntaxError(f"Expected a value in rule: {self.text}")
+        words = [self.take("word")]
+        while self.peek()[0] == "word" and self.peek()[1] not in ("and", "or", "from"):
+            words.append(self.take("word"))
+        return " ".join(words)
+
+    @staticmethod
+    def _display(field, value):
+        decode = _FIELDS[field][2]
+        return decode[value] if decode is not None else f"{value:g}"
+
+    def _encode(self, field, raw):
+        if field in ("house", "degree"):
+            try:
+                return float(raw) if field == "degree" else int(raw)
+            except ValueError:
+                raise RuleSyntaxError(f"'{field}' needs a number, got {raw!r}: {self.text}")
+        name = _FIELDS[field][1].get(raw.lower())
+        if name is None:
+            raise RuleSyntaxError(f"Unknown {field} {raw!r} in rule: {self.text}")
+        return _CODES[field][name]
+
+
+# ── Compiled rules ────────────────────────────────────────────────────────
+
+class CompiledRule(Rule):
+    """A parsed DSL rule. Also usable as a classic Rule in Evaluator."""
+
+    def __init__(self, expression, rule_id=None, description=None):
+        self.expression = expression
+        self.rule_id = rule_id or expression
+        self.description = description
+        self.node, self.weight = _Parser(expression).parse_rule()
+
+    def mask(self, frame, transits=None):
+        """
+        Boolean array: does the rule apply to each person in the frame?
+        Shape (n_persons,), or (n_dates, n_persons) when transits are given.
+        """
+        ctx = frame if isinstance(frame, EvalContext) else EvalContext(frame, transits)
+        return np.broadcast_to(self.node.mask(ctx), ctx.shape)
+
+    def explain(self, frame, i, transits=None, d=None):
+        """(clause, held, actual) tuples for row i (and date row d)."""
+        ctx = frame if isinstance(frame, EvalContext) else EvalContext(frame, transits)
+        return self.node.explain(ctx, i, d)
+
+    # Rule interface (single chart)
+    def applies(self, kundali, time_context):
+        return bool(self.mask(ChartFrame.from_kundali(kundali))[0])
+
+    def score(self, kundali, time_context):
+        return self.weight
+
+
+def compile_rule(expression, rule_id=None, description=None):
+    return CompiledRule(expression, rule_id, description)
+
+
+class RuleSet:
+    """A named group of compiled rules scored together."""
+
+    def __init__(self, rules, name=None):
+        self.name = name
+        self.rules = list(rules)
+        self.weights = np.array([r.weight for r in self.rules], dtype=np.float64)
+
+    @classmethod
+    def from_expressions(cls, expressions, name=None):
+        return cls([compile_rule(e) for e in expressions], name)
+
+    @classmethod
+    def from_db(cls, rule_set, conn=None):
+        """Load active rules of one rule_set from ref_rule."""
+        own_conn = conn is None
+        if own_conn:
+            conn = get_connection()
+        try:
+            rows = conn.execute(
+                "SELECT rule_id, expression, description FROM ref_rule "
+                "WHERE rule_set = ? AND is_active = 1 ORDER BY rule_id",
+                (rule_set,),
+            ).fetchall()
+        finally:
+            if own_conn:
+                conn.close()
+        return cls(
+            [compile_rule(r["expression"], r["rule_id"], r["description"]) for r in rows],
+            rule_set,
+        )
+
+    def masks(self, frame):
+        """(n_rules, n_persons) boolean matrix of rule applicability."""
+        if not self.rules:
+            return np.zeros((0, len(frame)), dtype=bool)
+        ctx = EvalContext(frame)
+        return np.vstack([r.mask(ctx) for r in self.rules])
+
+    def score(self, frame):
+        """Mean weight of applicable rules per person (0 where none apply)."""
+        masks = self.masks(frame)
+        total = self.weights @ masks
+        count = masks.sum(axis=0)
+        return np.divide(total, count, out=np.zeros(len(frame)), where=count > 0)
+
+    def score_series(self, frame, transits):
+        """
+        (n_dates, n_persons) scores over a transit table.
+
+        Natal-only rules are evaluated once and broadcast across dates;
+        transit features are shared across rules through one EvalContext.
+        """
+        ctx = EvalContext(frame, transits)
+        total = np.zeros(ctx.shape)
+        count = np.zeros(ctx.shape, dtype=np.int32)
+        for rule in self.rules:
+            mask = rule.node.mask(ctx)
+            total += rule.weight * mask
+            count += mask
+        return np.divide(total, count, out=np.zeros(ctx.shape), where=count > 0)
+
+    def explain(self, frame, person_id, transits=None, day=None):
+        """
+        Per-rule breakdown for one person: which clauses held and why.
+        Rules with transit conditions need `transits` and the `day` to explain.
+        """
+        ctx = EvalContext(frame, transits)
+        i = frame.row(person_id)
+        d = transits.index_of(day) if transits is not None and day is not None else None
+        result = []
+        for rule in self.rules:
+            clauses = rule.node.explain(ctx, i, d)
+            applies = rule.mask(ctx)
+            result.append({
+                "rule_id": rule.rule_id,
+                "expression": rule.expression,
+                "description": rule.description,
+                "weight": rule.weight,
+                "applies": bool(applies[i] if d is None else applies[d, i]),
+                "clauses": clauses,
+            })
+        return result
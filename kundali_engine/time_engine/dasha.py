@@ -1,5 +1,137 @@
+import numpy as np
+
+from kundali_engine.chart.frame import PLANET_INDEX
+from kundali_engine.core.database.connection import get_connection
+
+DASHA_LEVELS = ("maha", "antar", "pratyantar")
+
+
 class DashaPeriod:
     def __init__(self, planet, start, end):
         self.planet = planet
         self.start = start
         self.end = end
+
+
+class DashaTimeline:
+    """
+    A person's dasha periods held in memory as sorted date arrays per level,
+    so the active lords for any number of dates come from one searchsorted
+    call per level instead of one query per date.
+    """
+
+    def __init__(self, periods):
+        # periods: {level: [DashaPeriod, ...]}
+        self._levels = {}
+        for level in DASHA_LEVELS:
+            items = sorted(periods.get(level, []), key=lambda p: p.start)
+            self._levels[level] = (
+                np.array([p.start for p in items], dtype="datetime64[D]"),
+                np.array([p.end for p in items], dtype="datetime64[D]"),
+                np.array([p.planet for p in items], dtype=object),
+            )
+
+    @classmethod
+    def from_db(cls, person_id, conn=None):
+        own_conn = conn is None
+        if own_conn:
+            conn = get_connection()
+        try:
+            rows = conn.execute(
+                "SELECT level, planet, start_date, end_date FROM dasha WHERE person_id = ?",
+                (person_id,),
+            ).fetchall()
+        finally:
+            if own_conn:
+                conn.close()
+
+        periods = {}
+        for level, planet, start, end in rows:
+            periods.setdefault(level, []).append(DashaPeriod(planet, start, end))
+        return cls(periods)
+
+    def lords(self, dates, level="maha"):
+        """Active lord per date (object array, None where no period covers the date)."""
+        dates = np.asarray(dates, dtype="datetime64[D]")
+        starts, ends, planets = self._levels[level]
+        result = np.full(dates.shape, None, dtype=object)
+        if not len(starts):
+            return result
+        idx = np.searchsorted(starts, dates, side="right") - 1
+        safe = np.clip(idx, 0, None)
+        active = (idx >= 0) & (dates <= ends[safe])
+        result[active] = planets[safe[active]]
+        return result
+
+    def at(self, day):
+        """{level: planet} for a single date."""
+        return {level: self.lords([day], level)[0] for level in DASHA_LEVELS}
+
+
+class DashaTable:
+    """
+    Dasha periods of a whole population as flat arrays, one set per level,
+    sorted by (person, start). lords() answers "active lord per person
+    per date" for every (person, date) cell with one searchsorted per
+    level, the population counterpart of DashaTimeline.
+    """
+
+    def __init__(self, person_ids, rows):
+        # rows: (person_id, level, planet, start_date, end_date)
+        self.person_ids = np.asarray(person_ids, dtype=np.int64)
+        row_of = {int(pid): i for i, pid in enumerate(self.person_ids)}
+        by_level = {level: [] for level in DASHA_LEVELS}
+        for pid, level, planet, start, end in rows:
+            i = row_of.get(pid)
+            if i is not None and level in by_level:
+                by_level[level].append((i, start, end, PLANET_INDEX.get(planet, -1)))
+
+        self._levels = {}
+        for level, items in by_level.items():
+            person = np.array([r[0] for r in items], dtype=np.int64)
+            start = np.array([r[1] for r in items], dtype="datetime64[D]").astype(np.int64)
+            end = np.array([r[2] for r in items], dtype="datetime64[D]").astype(np.int64)
+            code = np.array([r[3] for r in items], dtype=np.int8)
+            order = np.lexsort((start, person))
+            self._levels[level] = (person[order], start[order], end[order], code[order])
+
+    def __len__(self):
+        return len(self.person_ids)
+
+    @classmethod
+    def from_db(cls, person_ids, conn=None):
+        """Load the dasha rows of the given persons."""
+        ids = sorted({int(p) for p in person_ids})
+        own_conn = conn is None
+        if own_conn:
+            conn = get_connection()
+        try:
+            marks = ",".join("?" * len(ids))
+            rows = conn.execute(
+                "SELECT person_id, level, planet, start_date, end_date FROM dasha "
+                f"WHERE person_id IN ({marks})",
+                ids,
+            ).fetchall() if ids else []
+        finally:
+            if own_conn:
+                conn.close()
+        return cls(ids, rows)
+
+    def lords(self, dates, level="maha"):
+        """(n_persons, n_dates) int8 planet codes (chart.frame.PLANETS order), -1 = none."""
+        days = np.asarray(dates, dtype="datetime64[D]").astype(np.int64)
+        person, start, end, code = self._levels[level]
+        result = np.full((len(self.person_ids), len(days)), -1, dtype=np.int8)
+        if not len(person) or not len(days):
+            return result
+
+        # One sorted key per period: (person << 32) | days from the earliest start
+        base = min(start.min(), days.min())
+        keys = (person << 32) | (start - base)
+        rows = np.arange(len(self.person_ids), dtype=np.int64)[:, None]
+        query = (rows << 32) | (days - base)[None, :]
+        idx = np.searchsorted(keys, query, side="right") - 1
+        safe = np.clip(idx, 0, None)
+        active = (idx >= 0) & (person[safe] == rows) & (end[safe] >= days[None, :])
+        result[active] = code[safe[active]]
+        return result
@@ -0,0 +1,211 @@
+"""
+Columnar transit table: sidereal positions of the 9 planets per date.
+
+Rows are dates (datetime64[D], ascending), columns are planets in
+chart.frame.PLANETS order. Loaded from `transit_position` in one query,
+or computed with one vectorized ephemeris call per planet for the whole
+date range (positions at 00:00 UTC).
+"""
+from datetime import date
+
+import numpy as np
+
+from kundali_engine.chart.frame import PLANETS, SIGNS, NAKSHATRAS, PLANET_INDEX
+from kundali_engine.core.database.connection import get_connection
+
+
+def _day(d):
+    if isinstance(d, date):
+        d = d.isoformat()[:10]
+    return np.datetime64(d, "D")
+
+
+class TransitTable:
+    """Transit positions as (n_dates, 9) arrays."""
+
+    def __init__(self, dates, longitude, speed=None):
+        self.dates = np.asarray(dates, dtype="datetime64[D]")
+        self.longitude = np.asarray(longitude, dtype=np.float64)
+        if speed is None:
+            speed = np.zeros_like(self.longitude)
+        self.speed = np.asarray(speed, dtype=np.float64)
+        known = ~np.isnan(self.longitude)
+        self.sign = np.where(known, np.nan_to_num(self.longitude) // 30, -1).astype(np.int8)
+        self.retrograde = known & (self.speed < 0)
+
+    def __len__(self):
+        return len(self.dates)
+
+    def between(self, start, end):
+        """Sub-table for start <= date <= end."""
+        lo = np.searchsorted(self.dates, _day(start), side="left")
+        hi = np.searchsorted(self.dates, _day(end), side="right")
+        return TransitTable(self.dates[lo:hi], self.longitude[lo:hi], self.speed[lo:hi])
+
+    def index_of(self, day):
+        """Row index of a date (raises KeyError if absent)."""
+        day = _day(day)
+        i = int(np.searchsorted(self.dates, day))
+        if i >= len(self.dates) or self.dates[i] != day:
+            raise KeyError(str(day))
+        return i
+
+    def events(self):
+        """
+        Ingresses and retrograde stations between consecutive dates, as
+        transit_event rows (date, event_type, planet, description,
+        from_sign, to_sign). The first date has no previous day and
+        yields nothing; Rahu and Ketu move retrograde throughout and only
+        report ingresses.
+        """
+        if len(self) < 2:
+            return []
+        consecutive = (np.diff(self.dates).astype(np.int64) == 1)[:, None]
+        before, after = self.sign[:-1], self.sign[1:]
+        known = consecutive & (before >= 0) & (after >= 0)
+        days = self.dates[1:].astype(str).tolist()
+
+        rows = []
+        for i, j in zip(*np.nonzero(known & (before != after))):
+            planet, old, new = PLANETS[j], SIGNS[before[i, j]], SIGNS[after[i, j]]
+            rows.append((days[i], "ingress", planet, f"{planet} enters {new}", old, new))
+
+        station = known & (self.retrograde[1:] != self.retrograde[:-1])
+        station[:, [PLANET_INDEX["Rahu"], PLANET_INDEX["Ketu"]]] = False
+        for i, j in zip(*np.nonzero(station)):
+            planet, sign = PLANETS[j], SIGNS[after[i, j]]
+            if self.retrograde[i + 1, j]:
+                rows.append((days[i], "retrograde_start", planet,
+                             f"{planet} turns retrograde in {sign}", None, None))
+            else:
+                rows.append((days[i], "retrograde_end", planet,
+                             f"{planet} turns direct in {sign}", None, None))
+        rows.sort(key=lambda r: (r[0], PLANET_INDEX[r[2]]))
+        return rows
+
+    # ── Constructors ──────────────────────────────────────────────────────
+
+    @classmethod
+    def from_db(cls, start, end, conn=None):
+        """Load transit_position rows for start <= date <= end."""
+        own_conn = conn is None
+        if own_conn:
+            conn = get_connection()
+        try:
+            rows = conn.execute(
+                "SELECT date, planet, sidereal_longitude, speed FROM transit_position "
+                "WHERE date BETWEEN ? AND ? ORDER BY date",
+                (str(_day(start)), str(_day(end))),
+            ).fetchall()
+        finally:
+            if own_conn:
+                conn.close()
+
+        days = sorted({r[0] for r in rows})
+        row_of = {d: i for i, d in enumerate(days)}
+        longitude = np.full((len(days), len(PLANETS)), np.nan)
+        speed = np.zeros((len(days), len(PLANETS)))
+        for day, planet, lon, spd in rows:
+            j = PLANET_INDEX.get(planet)
+            if j is None:
+                continue
+            longitude[row_of[day], j] = lon
+            speed[row_of[day], j] = spd or 0.0
+        return cls(days, longitude, speed)
+
+    @classmethod
+    def compute(cls, start, end):
+        """Compute daily positions for start <= date <= end from the ephemeris."""
+        from kundali_engine.create_kundali import _get_ephemeris, sidereal_positions
+
+        dates = np.arange(_day(start), _day(end) + 1, dtype="datetime64[D]")
+        ts, _ = _get_ephemeris()
+        first = dates[0].item()
+        offsets = (dates - dates[0]).astype(np.int64)
+        t = ts.utc(first.year, first.month, first.day + offsets)
+
+        positions = sidereal_positions(t)
+        longitude = np.column_stack([positions[p][0] for p in PLANETS])
+        speed = np.column_stack([positions[p][1] for p in PLANETS])
+        return cls(dates, longitude, speed)
+
+    # ── Persistence ───────────────────────────────────────────────────────
+
+    def store(self, conn=None):
+        """Bulk upsert into transit_position; bumps the 'transit' data version."""
+        span = 360 / 27
+        rows = []
+        for i, day in enumerate(self.dates.astype(str)):
+            for j, planet in enumerate(PLANETS):
+                lon = self.longitude[i, j]
+                if np.isnan(lon):
+                    continue
+                rows.append((
+                    day, planet, round(float(lon), 4), SIGNS[self.sign[i, j]],
+                    round(float(lon % 30), 4), NAKSHATRAS[int(lon / span)],
+                    int((lon % span) / (360 / 108)) + 1,
+                    int(self.retrograde[i, j]), round(float(self.speed[i, j]), 4),
+                ))
+
+        own_conn = conn is None
+        if own_conn:
+            conn = get_connection()
+        try:
+            conn.executemany(
+                """INSERT OR REPLACE INTO transit_position
+                   (date, planet, sidereal_longitude, sign, degree_in_sign,
+                    nakshatra, nakshatra_pada, is_retrograde, speed)
+                   VALUES (?,?,?,?,?,?,?,?,?)""",
+                rows,
+            )
+            if rows:
+                # Global counter (person_id 0) in the agent's response-cache key
+                conn.execute(
+                    """INSERT INTO data_version (person_id, kind, version) VALUES (0, 'transit', 1)
+                       ON CONFLICT(person_id, kind) DO UPDATE SET version = version + 1"""
+                )
+            conn.commit()
+        finally:
+            if own_conn:
+                conn.close()
+        return len(rows)
+
+    def store_events(self, conn=None):
+        """
+        Replace the derived transit_event rows (ingresses, retrograde
+        stations) for this table's dates with events(). Returns rows written.
+        """
+        if len(self) < 2:
+            return 0
+        rows = self.events()
+        own_conn = conn is None
+        if own_conn:
+            conn = get_connection()
+        try:
+            conn.execute(
+                """DELETE FROM transit_event WHERE date > ? AND date <= ?
+                   AND event_type IN ('ingress', 'retrograde_start', 'retrograde_end')""",
+                (str(self.dates[0]), str(self.dates[-1])),
+            )
+            conn.executemany(
+                """INSERT INTO transit_event
+                   (date, event_type, planet, description, from_sign, to_sign)
+                   VALUES (?,?,?,?,?,?)""",
+                rows,
+            )
+            conn.commit()
+        finally:
+            if own_conn:
+                conn.close()
+        return len(rows)
+
+
+def load_or_compute(start, end, conn=None):
+    """Transit table for the range, computing and storing any missing dates."""
+    table = TransitTable.from_db(start, end, conn)
+    expected = int((_day(end) - _day(start)).astype(np.int64)) + 1
+    if len(table) == expected and not np.isnan(table.longitude).any():
+        return table
+    table = TransitTable.compute(start, end)
+    table.store(conn)
+    return table